@@ -0,0 +1,222 @@
+import os
+import threading
+import time
+
+# 서버당 기본 동시 요청 수
+DEFAULT_SLOTS = int(os.environ.get("LMSTUDIO_SLOTS", "1"))
+# 다른 정상 서버가 있을 때 비정상 서버를 다시 확인하기까지의 시간 (초)
+HEALTH_RECHECK_SECONDS = 15
+# 정상 서버가 하나도 없을 때의 재확인 간격과, 살아나기를 기다리는 최대 시간 (초)
+EARLY_RECHECK_SECONDS = 1
+UNAVAILABLE_WAIT_SECONDS = 60
+HEALTH_TIMEOUT_SECONDS = 2
+# 이 HTTP 상태 코드는 서버 문제로 보고 다른 서버로 재시도
+FAILOVER_STATUS_CODES = {500, 502, 503, 504}
+# 429는 서버 장애가 아니라 속도 제한이므로 같은 풀에서 기다렸다가 재시도 (Retry-After 우선)
+RATE_LIMIT_RETRIES = 5
+RATE_LIMIT_BACKOFF_SECONDS = 1.0
+MAX_RATE_LIMIT_BACKOFF_SECONDS = 30.0
+# 모든 서버가 한 번씩 실패한 요청을, 서버가 살아난 뒤 처음부터 다시 시도하는 횟수
+FAILOVER_ROUNDS = 2
+
+
+class NoHealthyServer(Exception):
+    """사용 가능한 로컬 서버가 없을 때 발생합니다."""
+
+
+class LocalServer:
+    """OpenAI 호환 로컬 서버 (LMStudio, llama.cpp server, vLLM 등) 하나의 상태입니다."""
+
+    def __init__(self, url, slots=DEFAULT_SLOTS):
+        self.url = url
+        self.slots = max(1, slots)
+        self.in_flight = 0
+        self.healthy = True
+        self.checked_at = 0.0
+        self.served = 0
+        self.failures = 0
+
+    @property
+    def models_url(self):
+        """헬스 체크용 GET /models URL입니다."""
+        base = self.url.rsplit("/chat/completions", 1)[0]
+        return f"{base}/models"
+
+    def load(self):
+        return self.in_flight / self.slots
+
+    def describe(self):
+        return {
+            "url": self.url,
+            "slots": self.slots,
+            "in_flight": self.in_flight,
+            "healthy": self.healthy,
+            "served": self.served,
+            "failures": self.failures,
+        }
+
+
+def parse_server_list(value):
+    """
+    "url#slots,url#slots" 형태의 서버 목록을 LocalServer 목록으로 바꿉니다.
+    slots를 생략하면 DEFAULT_SLOTS를 사용합니다.
+    """
+    servers = []
+    for item in (value or "").replace(" ", ",").split(","):
+        if not item:
+            continue
+        url, _, slots = item.partition("#")
+        servers.append(LocalServer(url, int(slots) if slots.isdigit() else DEFAULT_SLOTS))
+    return servers
+
+
+def rate_limit_delay(response, attempt):
+    """429 응답의 Retry-After(초)를, 없으면 지수 백오프 시간을 반환합니다."""
+    retry_after = response.headers.get("Retry-After", "") if response is not None else ""
+    try:
+        delay = float(retry_after)
+    except ValueError:
+        delay = RATE_LIMIT_BACKOFF_SECONDS * 2 ** attempt
+    return min(max(delay, 0.0), MAX_RATE_LIMIT_BACKOFF_SECONDS)
+
+
+class BackendPool:
+    """
+    여러 로컬 서버에 요청을 분배합니다.
+    가장 한가한(in_flight/slots가 가장 낮은) 정상 서버를 고르며, 모든 슬롯이 차면 빈 슬롯을 기다립니다.
+    연결 실패/타임아웃/5xx 응답을 받은 서버는 비정상으로 표시하고 요청을 다른 서버로 넘깁니다.
+    비정상 서버는 HEALTH_RECHECK_SECONDS마다 GET /models로 다시 확인하며, 정상 서버가 하나도 없으면
+    실패시키지 않고 EARLY_RECHECK_SECONDS마다 확인하면서 최대 UNAVAILABLE_WAIT_SECONDS까지 기다립니다.
+    429 응답은 서버를 비정상으로 표시하지 않고 백오프 후 재시도합니다.
+    """
+
+    def __init__(self, servers):
+        if not servers:
+            raise ValueError("BackendPool needs at least one server")
+        self.servers = servers
+        self._condition = threading.Condition()
+
+    @property
+    def capacity(self):
+        """정상 서버의 슬롯 합계입니다."""
+        return sum(server.slots for server in self.servers if server.healthy) or 1
+
+    def check_health(self, server):
+        """서버의 GET /models 응답으로 상태를 갱신합니다."""
+        import requests
+        try:
+            response = requests.get(server.models_url, timeout=HEALTH_TIMEOUT_SECONDS)
+            healthy = response.status_code == 200
+        except requests.RequestException:
+            healthy = False
+        with self._condition:
+            server.healthy = healthy
+            server.checked_at = time.time()
+            if healthy:
+                self._condition.notify_all()
+        return healthy
+
+    def _recheck_unhealthy(self, exclude, interval=HEALTH_RECHECK_SECONDS):
+        """
+        마지막 확인 후 interval이 지난 비정상 서버를 다시 확인합니다. 살아난 서버가 있으면 True입니다.
+        확인할 서버는 잠금 안에서 확인 시각을 먼저 갱신해, 여러 스레드가 같은 서버를 동시에 확인하지 않게 합니다.
+        """
+        now = time.time()
+        with self._condition:
+            due = [
+                server for server in self.servers
+                if not server.healthy and server not in exclude and now - server.checked_at >= interval
+            ]
+            for server in due:
+                server.checked_at = now
+        return any([self.check_health(server) for server in due])
+
+    def acquire(self, exclude=(), wait_seconds=UNAVAILABLE_WAIT_SECONDS):
+        """
+        가장 한가한 정상 서버의 슬롯을 하나 잡아 서버를 반환합니다.
+        exclude 밖에 정상 서버가 없으면 재확인하며 최대 wait_seconds까지 기다린 뒤 NoHealthyServer를 올립니다.
+        """
+        deadline = time.time() + wait_seconds
+        while True:
+            with self._condition:
+                candidates = [s for s in self.servers if s.healthy and s not in exclude]
+                free = [s for s in candidates if s.in_flight < s.slots]
+                if free:
+                    server = min(free, key=LocalServer.load)
+                    server.in_flight += 1
+                    return server
+                remaining = [s for s in self.servers if s not in exclude]
+            if not remaining:
+                raise NoHealthyServer(f"no untried local server among {[s.url for s in self.servers]}")
+            # 다른 정상 서버가 있으면 주기대로, 없으면 바로 다시 확인
+            if self._recheck_unhealthy(exclude, HEALTH_RECHECK_SECONDS if candidates else EARLY_RECHECK_SECONDS):
+                continue
+            if not candidates and time.time() >= deadline:
+                raise NoHealthyServer(f"no healthy local server among {[s.url for s in self.servers]}")
+            with self._condition:
+                # 슬롯이 비거나 서버가 살아나면 깨어남
+                self._condition.wait(timeout=HEALTH_RECHECK_SECONDS if candidates else EARLY_RECHECK_SECONDS)
+
+    def release(self, server, failed=False):
+        """슬롯을 반납합니다. failed이면 서버를 비정상으로 표시합니다."""
+        with self._condition:
+            server.in_flight -= 1
+            if failed:
+                server.failures += 1
+                server.healthy = False
+                server.checked_at = time.time()
+            else:
+                server.served += 1
+            self._condition.notify_all()
+
+    def run(self, request):
+        """
+        request(url)을 실행합니다. 서버 장애로 실패하면 아직 시도하지 않은 다른 서버로 넘기고,
+        모든 서버가 실패하면 서버가 살아나기를 기다려 FAILOVER_ROUNDS까지 다시 시도합니다.
+        속도 제한(429)은 백오프 후 재시도하고, 요청 자체의 오류(그 밖의 4xx)는 그대로 올립니다.
+        """
+        import requests
+        tried = []
+        last_error = None
+        rate_limited = 0
+        rounds = 1
+        while True:
+            if len(tried) == len(self.servers) and rounds < FAILOVER_ROUNDS:
+                # 모든 서버가 실패함: 살아나는 서버를 기다려 다시 시도 (단일 서버의 일시적 타임아웃 등)
+                tried = []
+                rounds += 1
+            try:
+                server = self.acquire(exclude=tried)
+            except NoHealthyServer:
+                # 서버 장애로 실패한 적이 있으면 그 오류를 올림 (재시도 라운드에서 tried가 비워져도)
+                if last_error is not None:
+                    raise last_error
+                raise
+            try:
+                result = request(server.url)
+            except requests.RequestException as e:
+                status = e.response.status_code if e.response is not None else None
+                if status == 429 and rate_limited < RATE_LIMIT_RETRIES:
+                    self.release(server)
+                    delay = rate_limit_delay(e.response, rate_limited)
+                    rate_limited += 1
+                    print(f"[Pool] {server.url} rate limited, retrying in {delay:.1f}s")
+                    time.sleep(delay)
+                    continue
+                if status is not None and status not in FAILOVER_STATUS_CODES:
+                    self.release(server)
+                    raise
+                print(f"[Pool] {server.url} failed ({e}), failing over")
+                self.release(server, failed=True)
+                tried.append(server)
+                last_error = e
+                continue
+            except Exception:
+                self.release(server)
+                raise
+            self.release(server)
+            return result
+
+    def describe(self):
+        return [server.describe() for server in self.servers]
+
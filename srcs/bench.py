@@ -0,0 +1,172 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import statistics
+import sys
+import tempfile
+
+from mock_llm_server import start_mock_server
+from synth_target import FLAVORS, generate_target
+
+# 이 값보다 작은 단계 시간 차이는 노이즈로 간주 (초)
+REGRESSION_NOISE_FLOOR = 0.005
+
+
+def _reset_run_state(llm, metrics, tokens):
+    """반복 실행 사이에 전역 상태를 초기화합니다."""
+    metrics.METRICS.reset()
+    tokens.LEDGER.reset()
+    llm._ASK_CHATGPT_MESSAGES.clear()
+    llm._ASK_CHATGPT_LAST_TYPE.clear()
+
+
+def run_flavor(flavor, args):
+    """한 flavor의 합성 타겟을 만들고 mock 서버를 상대로 파이프라인을 반복 실행합니다."""
+    workdir = tempfile.mkdtemp(prefix=f"bench-{flavor}-")
+    manifest = generate_target(workdir, flavor, args.files, args.controllers, args.endpoints,
+                               args.body_lines, seed=args.seed)
+    trailing_text = " Explanation:" + " word" * args.trailing_words if args.trailing_words else ""
+    servers = [
+        start_mock_server(manifest["responses"], args.latency, args.jitter, trailing_text=trailing_text)
+        for _ in range(args.servers)
+    ]
+    base_url = servers[0][1]
+    use_local = args.backend == "local"
+    os.environ["LMSTUDIO_API_URL"] = f"{base_url}/chat/completions"
+    pool_urls = ",".join(f"{url}/chat/completions#{args.slots}" for _, url in servers)
+    os.environ["OPENAI_BASE_URL"] = base_url
+    os.environ.setdefault("OPENAI_API_KEY", "mock")
+
+    # 환경 변수를 설정한 뒤에 import해야 llm이 mock 서버를 가리킴
+    import cascade
+    import framework
+    import llm
+    import metrics
+    import tokens
+    llm.LMSTUDIO_API_URL = os.environ["LMSTUDIO_API_URL"]
+    llm.LMSTUDIO_API_URLS = pool_urls
+    llm.STREAM_RESPONSES = args.stream
+    cascade.CASCADE_ENABLED = args.cascade
+
+    runs = []
+    try:
+        for _ in range(args.repeat):
+            _reset_run_state(llm, metrics, tokens)
+            cwd = os.getcwd()
+            os.chdir(workdir)  # 시각화 결과물이 작업 디렉토리에 쓰이도록
+            try:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    service = framework.run_pipeline(manifest["target_root"], use_local, visualize=args.visualize)
+            finally:
+                os.chdir(cwd)
+            report = metrics.METRICS.report()
+            report["endpoints_found"] = len(service.endpoints) if service else 0
+            runs.append(report)
+    finally:
+        for server, _ in servers:
+            server.shutdown()
+
+    stages = {
+        name: statistics.median(run["stages"].get(name, {}).get("wall_seconds", 0.0) for run in runs)
+        for name in runs[0]["stages"]
+    }
+    counters = runs[-1]["counters"]
+    scan_seconds = stages.get("extract_endpoints", 0.0) or 1e-9
+    describe_seconds = stages.get("describe_endpoints", 0.0) or 1e-9
+    found = runs[-1]["endpoints_found"]
+    return {
+        "config": {
+            "flavor": flavor, "files": args.files, "controllers": args.controllers,
+            "endpoints": args.endpoints, "latency": args.latency, "backend": args.backend,
+            "stream": args.stream, "trailing_words": args.trailing_words,
+            "servers": args.servers, "slots": args.slots, "cascade": args.cascade,
+        },
+        "endpoints_expected": len(manifest["routes"]),
+        "endpoints_found": found,
+        "stages": stages,
+        "total_seconds": statistics.median(run["wall_seconds"] for run in runs),
+        "throughput": {
+            "files_per_second": counters.get("files_scanned", 0) / scan_seconds,
+            "bytes_per_second": counters.get("bytes_read", 0) / (sum(stages.values()) or 1e-9),
+            "endpoints_described_per_second": found / describe_seconds,
+        },
+        "llm": runs[-1]["llm"],
+    }
+
+
+def find_regressions(results, baseline, tolerance):
+    """baseline 대비 tolerance 비율 이상 느려진 단계를 찾습니다."""
+    regressions = []
+    for flavor, result in results.items():
+        base = baseline.get(flavor)
+        if not base or base.get("config") != result["config"]:
+            continue
+        for stage, seconds in result["stages"].items():
+            base_seconds = base["stages"].get(stage)
+            if base_seconds is None:
+                continue
+            if seconds > base_seconds * (1 + tolerance) and seconds - base_seconds > REGRESSION_NOISE_FLOOR:
+                regressions.append({
+                    "flavor": flavor, "stage": stage,
+                    "baseline_seconds": base_seconds, "seconds": seconds,
+                    "ratio": seconds / base_seconds if base_seconds else float("inf"),
+                })
+    return regressions
+
+
+def print_results(results, regressions):
+    for flavor, result in results.items():
+        print(f"[Bench] {flavor}: {result['endpoints_found']}/{result['endpoints_expected']} endpoints, "
+              f"{result['total_seconds']:.3f}s total")
+        for stage, seconds in result["stages"].items():
+            print(f"    {stage:<24} {seconds:8.4f}s")
+        for name, value in result["throughput"].items():
+            print(f"    {name:<32} {value:12.1f}")
+    for regression in regressions:
+        print(f"[Regression] {regression['flavor']}/{regression['stage']}: "
+              f"{regression['baseline_seconds']:.4f}s -> {regression['seconds']:.4f}s "
+              f"(x{regression['ratio']:.2f})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline pipeline benchmark against synthetic targets.")
+    parser.add_argument("--flavor", action="append", choices=sorted(FLAVORS),
+                        help="repeatable; defaults to every flavor")
+    parser.add_argument("--files", type=int, default=200)
+    parser.add_argument("--controllers", type=int, default=20)
+    parser.add_argument("--endpoints", type=int, default=5)
+    parser.add_argument("--body-lines", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--latency", type=float, default=0.0, help="mock LLM latency per request (s)")
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--backend", choices=["local", "openai"], default="local")
+    parser.add_argument("--stream", action="store_true", help="stream completions with early stop")
+    parser.add_argument("--cascade", action="store_true", help="local-first cascade with escalation to openai")
+    parser.add_argument("--servers", type=int, default=1, help="number of mock local servers in the pool")
+    parser.add_argument("--slots", type=int, default=1, help="concurrent requests per mock server")
+    parser.add_argument("--trailing-words", type=int, default=0,
+                        help="mock model appends N words of prose after the JSON answer")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--visualize", action="store_true")
+    parser.add_argument("--output", default="bench_result.json")
+    parser.add_argument("--baseline", help="previous bench_result.json to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown ratio per stage")
+    args = parser.parse_args()
+
+    results = {flavor: run_flavor(flavor, args) for flavor in (args.flavor or sorted(FLAVORS))}
+
+    regressions = []
+    if args.baseline and os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            regressions = find_regressions(results, json.load(f)["results"], args.tolerance)
+
+    with open(args.output, "w") as f:
+        json.dump({"results": results, "regressions": regressions}, f, indent=2)
+    print_results(results, regressions)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,165 @@
+import contextvars
+import math
+import os
+import re
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from tokens import TokenLedger, count_tokens, current_ledger, get_budget
+
+# 실행당 LLM 예산 (0이면 제한 없음)
+MAX_TOKENS = int(os.environ.get("LLM_BUDGET_TOKENS", "0"))
+MAX_DOLLARS = float(os.environ.get("LLM_BUDGET_DOLLARS", "0"))
+MAX_SECONDS = float(os.environ.get("LLM_BUDGET_SECONDS", "0"))
+# 비용 추정에 쓰는 기본 OpenAI 모델 (llm.ask_chatgpt 기본값)
+DEFAULT_MODEL = "gpt-4o-mini-2024-07-18"
+
+# 엔드포인트 가치 점수 가중치
+METHOD_VALUES = {"POST": 3.0, "PUT": 3.0, "PATCH": 3.0, "DELETE": 3.0, "GET": 1.0}
+DEFAULT_METHOD_VALUE = 1.0
+SENSITIVE_PATH_VALUE = 3.0
+PARAM_VALUE = 0.5
+MAX_COUNTED_PARAMS = 6
+CODE_SIZE_VALUE = 0.5
+
+# 인증/권한/결제 등 공격 표면으로서 중요한 경로
+_SENSITIVE_PATH = re.compile(
+    r"auth|login|logout|signin|signup|register|passw|token|session|oauth|sso|admin|role|permission|"
+    r"account|secret|apikey|upload|payment|billing|checkout",
+    re.IGNORECASE,
+)
+# 경로 변수 ({id}, <int:id>, :id)
+_PATH_PARAM = re.compile(r"\{[^}]+\}|<[^>]+>|:\w+")
+# 핸들러 코드에서 요청 입력을 읽는 부분
+_REQUEST_INPUT = re.compile(
+    r"@(?:RequestParam|PathVariable|RequestBody|RequestHeader|CookieValue)\b"
+    r"|\breq(?:uest)?\.(?:body|query|params|args|form|json|files|cookies|headers|get_json)\b"
+    r"|\$_(?:GET|POST|REQUEST|COOKIE|FILES)\b"
+)
+
+
+def endpoint_value(endpoint):
+    """
+    엔드포인트를 먼저 설명할 가치를 점수로 추정합니다.
+    상태를 바꾸는 메소드, 인증 관련 경로, 입력 파라미터가 많은 핸들러, 큰 핸들러일수록 높습니다.
+    """
+    value = METHOD_VALUES.get((endpoint.method or "").upper(), DEFAULT_METHOD_VALUE)
+    if _SENSITIVE_PATH.search(endpoint.path or ""):
+        value += SENSITIVE_PATH_VALUE
+    code = endpoint.code or ""
+    params = len(_PATH_PARAM.findall(endpoint.path or "")) + len(_REQUEST_INPUT.findall(code))
+    value += PARAM_VALUE * min(params, MAX_COUNTED_PARAMS)
+    value += CODE_SIZE_VALUE * math.log2(code.count("\n") + 2)
+    return value
+
+
+def rank_endpoints(endpoints, value=endpoint_value):
+    """가치가 높은 순서로 정렬합니다. 점수가 같으면 원래 순서를 유지합니다."""
+    return sorted(endpoints, key=value, reverse=True)
+
+
+def estimate_call(ask_type, prompt, use_local=False, model=DEFAULT_MODEL):
+    """
+    요청 하나의 (토큰, 달러)를 보내기 전에 추정합니다.
+    system 프롬프트 + prompt 토큰에, 출력은 ask_type의 출력 예산만큼 쓴다고 봅니다 (보수적).
+    """
+    from llm import get_system_prompt
+    prompt_tokens = count_tokens(get_system_prompt(ask_type)) + count_tokens(prompt)
+    completion_tokens = get_budget(ask_type, model)["output"]
+    cost = TokenLedger.cost({
+        "backend": "local" if use_local else "openai", "model": model,
+        "prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens, "cached_tokens": 0,
+    })
+    return prompt_tokens + completion_tokens, cost
+
+
+class Budget:
+    """
+    한 실행의 토큰/달러/시간 한도입니다. 사용량은 생성 이후 ledger(기본값: 생성 시점의 tokens.current_ledger)에
+    기록된 호출과 경과 시간으로 계산합니다. 한도가 0이면 그 항목은 제한하지 않습니다.
+    """
+
+    def __init__(self, max_tokens=None, max_dollars=None, max_seconds=None, ledger=None):
+        self.max_tokens = MAX_TOKENS if max_tokens is None else max_tokens
+        self.max_dollars = MAX_DOLLARS if max_dollars is None else max_dollars
+        self.max_seconds = MAX_SECONDS if max_seconds is None else max_seconds
+        self.ledger = ledger or current_ledger()
+        self.started_at = time.time()
+        self._start_total = dict(self.ledger.total)
+
+    @property
+    def limited(self):
+        return bool(self.max_tokens or self.max_dollars or self.max_seconds)
+
+    def spent(self):
+        total, start = self.ledger.total, self._start_total
+        return {
+            "tokens": (total["prompt_tokens"] + total["completion_tokens"]
+                       - start["prompt_tokens"] - start["completion_tokens"]),
+            "dollars": total["cost_usd"] - start["cost_usd"],
+            "seconds": time.time() - self.started_at,
+        }
+
+    def exceeded(self, tokens=0, dollars=0.0, seconds=0.0):
+        """지금까지의 사용량에 주어진 추가량을 더했을 때 넘는 한도 이름을 반환합니다. 넘지 않으면 None입니다."""
+        spent = self.spent()
+        for name, limit, extra in (("tokens", self.max_tokens, tokens), ("dollars", self.max_dollars, dollars),
+                                   ("seconds", self.max_seconds, seconds)):
+            if limit and spent[name] + extra > limit:
+                return name
+        return None
+
+    def describe(self):
+        return {
+            "limits": {"tokens": self.max_tokens, "dollars": self.max_dollars, "seconds": self.max_seconds},
+            "spent": self.spent(),
+        }
+
+
+def run_within_budget(func, items, budget, workers=1, estimate=None, on_result=None):
+    """
+    items를 순서대로 func에 넘기되, 새 작업은 예상 비용을 더해도 예산을 넘지 않을 때만 시작합니다.
+    estimate(item)은 보내기 전의 (토큰, 달러) 추정치이며, 끝난 작업이 생기면 그 실제 평균을 대신 씁니다.
+    진행 중인 작업의 추정치도 합산하고, 시간 한도는 경과 시간 + 작업당 평균 소요 시간으로 판단합니다.
+    on_result(index, 결과)는 작업이 끝나는 순서대로 호출 스레드에서 호출됩니다.
+    func는 호출 스레드의 컨텍스트(실행 장부, stream scope)를 복사해 워커 스레드에서 실행합니다.
+    ({item 인덱스: 결과}, 시작하지 못한 item 목록, 멈춘 한도 이름 또는 None)을 반환합니다.
+    """
+    workers = max(1, workers)
+    results = {}
+    in_flight = {}
+    stop_reason = None
+    completed = 0
+    busy_seconds = 0.0
+    spent_before = budget.spent()
+    index = 0
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while True:
+            while index < len(items) and len(in_flight) < workers:
+                if budget.limited:
+                    spent = budget.spent()
+                    if completed:
+                        tokens = (spent["tokens"] - spent_before["tokens"]) / completed
+                        dollars = (spent["dollars"] - spent_before["dollars"]) / completed
+                    else:
+                        tokens, dollars = estimate(items[index]) if estimate else (0, 0.0)
+                    seconds = busy_seconds / completed if completed else 0.0
+                    concurrent = len(in_flight) + 1
+                    stop_reason = budget.exceeded(tokens * concurrent, dollars * concurrent, seconds)
+                    if stop_reason:
+                        # 진행 중인 작업이 끝나면 실제 사용량으로 다시 판단
+                        break
+                context = contextvars.copy_context()
+                in_flight[executor.submit(context.run, func, items[index])] = (index, time.time())
+                index += 1
+            if not in_flight:
+                break
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                i, started_at = in_flight.pop(future)
+                results[i] = future.result()
+                completed += 1
+                busy_seconds += time.time() - started_at
+                if on_result:
+                    on_result(i, results[i])
+    return results, items[index:], stop_reason if index < len(items) else None
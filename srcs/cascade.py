@@ -0,0 +1,160 @@
+import os
+import re
+
+from llm import ask_chatgpt
+from metrics import METRICS
+from structured import parse_structured
+
+# 티어별 ask_chatgpt 인자 (싼 티어부터)
+TIERS = {
+    "local": {"use_local": True},
+    "mini": {"model": "gpt-4o-mini-2024-07-18"},
+    "large": {"model": "gpt-4o-2024-08-06"},
+}
+
+# ask_type별 시도 순서. 앞 티어의 응답이 검증에 실패하면 다음 티어로 넘어갑니다.
+DEFAULT_POLICY = ["local", "mini"]
+POLICIES = {
+    "identify_main_folder": ["local", "mini"],
+    "identify_main_source": ["local", "mini"],
+    "identify_framework": ["local", "mini"],
+    "identify_service_name": ["local", "mini"],
+    "how_to_reconginize_endpoint": ["local", "mini", "large"],
+    "describe_endpoint": ["local", "mini"],
+    "identify_database_usage": ["local", "mini"],
+}
+
+
+def parse_policies(value):
+    """
+    "describe_endpoint=local,mini;identify_framework=mini" 형태의 설정을 {ask_type: [tier, ...]}로 바꿉니다.
+    "default=..."는 DEFAULT_POLICY를 바꿉니다.
+    """
+    policies = {}
+    for item in (value or "").split(";"):
+        ask_type, _, tiers = item.partition("=")
+        tiers = [tier.strip() for tier in tiers.split(",") if tier.strip()]
+        unknown = [tier for tier in tiers if tier not in TIERS]
+        if unknown:
+            raise ValueError(f"Unknown cascade tier(s) {unknown} for {ask_type}; expected one of {list(TIERS)}")
+        if ask_type.strip() and tiers:
+            policies[ask_type.strip()] = tiers
+    return policies
+
+
+# LLM_CASCADE가 켜짐 값("1", "true" 등)이나 정책 문자열("ask_type=tier,...")이면 cascade 사용
+_CASCADE_SETTING = os.environ.get("LLM_CASCADE", "").strip()
+CASCADE_ENABLED = _CASCADE_SETTING.lower() not in ("", "0", "false", "no", "off")
+if "=" in _CASCADE_SETTING:
+    _overrides = parse_policies(_CASCADE_SETTING)
+    DEFAULT_POLICY = _overrides.pop("default", DEFAULT_POLICY)
+    POLICIES.update(_overrides)
+
+
+def get_policy(ask_type):
+    return POLICIES.get(ask_type, DEFAULT_POLICY)
+
+
+def _non_empty_name(result):
+    if not isinstance(result, str) or not result.strip():
+        return ["empty answer"]
+    if result.strip().lower() in ("unknown", "none", "null") or len(result) > 100:
+        return [f"implausible answer: {result[:40]!r}"]
+    return []
+
+
+def _existing_dir(result):
+    if not isinstance(result, str) or not os.path.isdir(result):
+        return [f"not an existing directory: {str(result)[:80]!r}"]
+    return []
+
+
+def _existing_file(result):
+    if not isinstance(result, str) or not os.path.isfile(result):
+        return [f"not an existing file: {str(result)[:80]!r}"]
+    return []
+
+
+def _compilable_patterns(result):
+    if not isinstance(result, dict) or not result:
+        return ["no patterns"]
+    problems = []
+    for method, pattern in result.items():
+        try:
+            re.compile(pattern)
+        except (re.error, TypeError) as e:
+            problems.append(f"{method} pattern does not compile: {e}")
+    return problems
+
+
+def _endpoint_fields(result):
+    endpoint = result.get("endpoint") if isinstance(result, dict) else None
+    if not isinstance(endpoint, dict):
+        return ["no endpoint"]
+    return [f"endpoint.{field} missing" for field in ("path", "method", "description") if not endpoint.get(field)]
+
+
+# ask_type별 스키마 검증 이후의 추가 검사. 문제 목록을 반환합니다.
+SANITY_CHECKS = {
+    "identify_main_folder": _existing_dir,
+    "identify_main_source": _existing_file,
+    "identify_framework": _non_empty_name,
+    "identify_service_name": _non_empty_name,
+    "how_to_reconginize_endpoint": _compilable_patterns,
+    "describe_endpoint": _endpoint_fields,
+}
+
+
+def check_answer(ask_type, text):
+    """응답을 ask_type 스키마와 SANITY_CHECKS로 검사해 문제 목록을 반환합니다. 빈 목록이면 통과입니다."""
+    result, errors, _ = parse_structured(ask_type, text)
+    if errors:
+        return errors
+    if isinstance(result, str) and result.startswith("Error:"):
+        return [result[:120]]
+    check = SANITY_CHECKS.get(ask_type)
+    return check(result) if check else []
+
+
+def ask_llm(ask_type, prompt, use_local=False, stream_id="default", on_partial=None, **kwargs):
+    """
+    ask_chatgpt의 cascade 버전입니다. cascade가 꺼져 있으면 use_local에 따라 한 백엔드만 사용합니다.
+    켜져 있으면 ask_type 정책의 싼 티어부터 요청하고, 검증에 실패한 경우에만 다음 티어로 올립니다.
+    on_partial에는 채택된 티어의 부분 결과만 전달합니다 (검증에 실패한 응답이 엔드포인트에 반영되지 않도록).
+    마지막 티어까지 실패하면 마지막 응답을, 승격한 티어의 호출 자체가 실패하면 직전 티어의 응답을 반환합니다.
+    """
+    if not CASCADE_ENABLED:
+        return ask_chatgpt(ask_type, prompt, use_local=use_local, stream_id=stream_id, on_partial=on_partial, **kwargs)
+
+    tiers = get_policy(ask_type)
+    METRICS.incr_llm(ask_type, "cascade_requests")
+    content = None
+    for index, tier in enumerate(tiers):
+        # 티어마다 별도 히스토리를 써서 실패한 응답이 다음 티어의 문맥에 섞이지 않게 함
+        options = {**kwargs, **TIERS[tier]}
+        # 마지막 티어가 아니면 부분 결과를 모아 두었다가 검증을 통과한 뒤에 전달
+        buffered = []
+        if on_partial:
+            options["on_partial"] = on_partial if index + 1 == len(tiers) else buffered.append
+        try:
+            answer = ask_chatgpt(ask_type, prompt, stream_id=f"{stream_id}@{tier}", **options)
+        except Exception as e:
+            if content is None:
+                raise
+            # API 키 없음, API 오류, 타임아웃 등으로 승격에 실패하면 이미 받은 응답을 사용
+            METRICS.incr_llm(ask_type, f"cascade_failed_{tier}")
+            print(f"[Cascade] {ask_type}: escalation to {tier} failed ({type(e).__name__}: {e}), "
+                  f"keeping the {tiers[index - 1]} answer")
+            return content
+        content = answer
+        problems = check_answer(ask_type, content)
+        if not problems:
+            METRICS.incr_llm(ask_type, f"cascade_accepted_{tier}")
+            if buffered:
+                on_partial(buffered[-1])
+            return content
+        METRICS.incr_llm(ask_type, f"cascade_rejected_{tier}")
+        if index + 1 < len(tiers):
+            METRICS.incr_llm(ask_type, "cascade_escalations")
+            print(f"[Cascade] {ask_type}: {tier} rejected ({'; '.join(problems[:2])}), escalating to {tiers[index + 1]}")
+    return content
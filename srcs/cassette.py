@@ -0,0 +1,102 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+
+CASSETTE_VERSION = 1
+CASSETTE_MODES = ("record", "replay", "auto")
+
+
+class CassetteMiss(KeyError):
+    """replay 모드에서 요청에 해당하는 응답이 카세트에 없을 때 발생합니다."""
+
+
+def request_key(ask_type, model, messages, temperature):
+    """요청 내용을 정규화해 SHA-256 해시 키를 만듭니다."""
+    payload = json.dumps({
+        "v": CASSETTE_VERSION,
+        "ask_type": ask_type,
+        "model": model,
+        "messages": messages,
+        "temperature": temperature,
+    }, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class Cassette:
+    """
+    LLM 요청/응답 쌍을 gzip JSON Lines 파일에 기록하고 재생합니다.
+    record: 항상 실제 호출 후 기록, replay: 카세트에서만 응답 (없으면 CassetteMiss),
+    auto: 카세트에 있으면 재생하고 없으면 실제 호출 후 기록합니다.
+    """
+
+    def __init__(self, path, mode="auto"):
+        if mode not in CASSETTE_MODES:
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        self.path = path
+        self.mode = mode
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._file = None
+        if mode != "record" and os.path.exists(path):
+            self.load()
+        elif mode == "record" and os.path.exists(path):
+            os.remove(path)  # 새로 녹화
+
+    def load(self):
+        """카세트 파일 전체를 해시 키 기준 dict로 읽어들입니다."""
+        try:
+            with gzip.open(self.path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self.entries[entry["k"]] = entry
+        except (EOFError, json.JSONDecodeError):
+            # 녹화 중 중단된 파일: 마지막까지 flush된 기록만 사용
+            print(f"[Cassette] {self.path} is truncated, loaded {len(self.entries)} entries")
+
+    @property
+    def replays(self):
+        return self.mode in ("replay", "auto")
+
+    @property
+    def records(self):
+        return self.mode in ("record", "auto")
+
+    def lookup(self, key):
+        """키에 해당하는 기록을 반환합니다. replay 모드에서 없으면 CassetteMiss를 발생시킵니다."""
+        entry = self.entries.get(key) if self.replays else None
+        with self._lock:
+            if entry is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+        if entry is None and self.mode == "replay":
+            raise CassetteMiss(key)
+        return entry
+
+    def record(self, key, ask_type, content, usage=None):
+        """응답을 메모리와 파일에 추가합니다. 중단되더라도 기록이 남도록 매번 flush합니다."""
+        if not self.records:
+            return
+        entry = {"k": key, "t": ask_type, "c": content, "u": usage}
+        with self._lock:
+            self.entries[key] = entry
+            if self._file is None:
+                self._file = gzip.open(self.path, "at", encoding="utf-8")
+            self._file.write(json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n")
+            self._file.flush()
+
+    def close(self):
+        """열려 있는 카세트 파일을 닫습니다."""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def stats(self):
+        return {"path": self.path, "mode": self.mode, "entries": len(self.entries),
+                "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,141 @@
+import argparse
+import os
+import sys
+
+# 각 하위 명령은 필요한 모듈만 함수 안에서 import합니다.
+# (diff/visualize는 LLM 클라이언트 없이 실행되고, openai/requests/pyvis는 실제로 쓰일 때만 로드됨)
+
+
+def _configure_llm(args):
+    """LLM을 쓰는 하위 명령(scan, describe)의 백엔드 옵션을 적용합니다."""
+    if args.cassette:
+        import llm
+        llm.use_cassette(args.cassette, args.cassette_mode)
+    if args.cascade:
+        import cascade
+        cascade.CASCADE_ENABLED = True
+        print(f"[Config] Cascade enabled: default policy {' -> '.join(cascade.DEFAULT_POLICY)}")
+
+
+def cmd_scan(args):
+    """엔드포인트/의존성/DB를 스캔만 하고 설명(describe_endpoint)은 하지 않습니다."""
+    _configure_llm(args)
+    import framework
+    service = framework.run_recon(os.path.abspath(args.target), args.local, args.output, describe=False,
+                                  visualize=args.visualize)
+    return 0 if service else 1
+
+
+def cmd_describe(args):
+    """
+    전체 파이프라인을 실행합니다. output의 이전 스냅샷과 비교해 바뀐 엔드포인트만 설명합니다.
+    예산 한도에 닿으면 가치가 낮은 엔드포인트는 pending으로 남고 다음 describe에서 설명됩니다.
+    """
+    _configure_llm(args)
+    import framework
+    from budget import Budget
+    budget = Budget(args.max_tokens, args.max_dollars, args.max_seconds)
+    service = framework.run_recon(os.path.abspath(args.target), args.local, args.output,
+                                  visualize=not args.no_visualize, budget=budget)
+    return 0 if service else 1
+
+
+def cmd_visualize(args):
+    """저장된 스냅샷으로 의존성 그래프를 다시 그립니다 (LLM 호출 없음)."""
+    from framework import GRAPH_HTML_PATH, visualize_dependency_graph
+    from snapshot import Snapshot, SnapshotError
+    try:
+        snapshot = Snapshot(args.snapshot)
+    except SnapshotError as e:
+        print(f"[Error] {e}", file=sys.stderr)
+        return 1
+    with snapshot:
+        output = args.output or os.path.join(os.path.dirname(os.path.abspath(args.snapshot)), GRAPH_HTML_PATH)
+        visualize_dependency_graph(snapshot.load_service(), output)
+    return 0
+
+
+def cmd_diff(args):
+    """두 스냅샷의 엔드포인트/의존성 차이를 출력하고, output이 주어지면 JSON으로 저장합니다."""
+    import json
+    from diff import diff_runs
+    from snapshot import SnapshotError
+    try:
+        run_diff = diff_runs(args.old, args.new)
+    except SnapshotError as e:
+        print(f"[Error] {e}", file=sys.stderr)
+        return 1
+    result = run_diff.to_dict()
+    if args.output:
+        run_diff.write(args.output)
+        print(f"[Diff] {result['summary']} -> {args.output}")
+    else:
+        print(json.dumps(result, indent=2, ensure_ascii=False))
+    return 0
+
+
+def cmd_daemon(args):
+    """작업 큐를 가진 HTTP/JSON daemon을 실행합니다. 작업 사이에 모듈, 클라이언트, 스냅샷을 재사용합니다."""
+    if args.cascade:
+        import cascade
+        cascade.CASCADE_ENABLED = True
+    import daemon
+    return daemon.serve(args.host or daemon.DAEMON_HOST, args.port or daemon.DAEMON_PORT,
+                        args.workers or daemon.DAEMON_WORKERS, args.state_dir or daemon.DAEMON_STATE_DIR,
+                        args.response_cache)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="llm-recon", description="LLM-assisted web service reconnaissance.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    def add_llm_options(command):
+        command.add_argument("target", help="root directory of the service to analyze")
+        command.add_argument("-o", "--output", default=".", help="directory for snapshot, graph and reports")
+        command.add_argument("--local", action="store_true", help="use local OpenAI-compatible servers (LMStudio)")
+        command.add_argument("--cascade", action="store_true", help="local-first cascade with escalation to openai")
+        command.add_argument("--cassette", help="record/replay LLM responses to this file")
+        command.add_argument("--cassette-mode", choices=["record", "replay", "auto"], default="auto")
+
+    scan = commands.add_parser("scan", help="find endpoints, static dependencies and database usage")
+    add_llm_options(scan)
+    scan.add_argument("--visualize", action="store_true", help="also render the dependency graph")
+    scan.set_defaults(func=cmd_scan)
+
+    describe = commands.add_parser("describe", help="scan and describe endpoints changed since the last run")
+    add_llm_options(describe)
+    describe.add_argument("--no-visualize", action="store_true")
+    describe.add_argument("--max-tokens", type=int, help="token budget for the run (default: LLM_BUDGET_TOKENS)")
+    describe.add_argument("--max-dollars", type=float, help="cost budget in USD (default: LLM_BUDGET_DOLLARS)")
+    describe.add_argument("--max-seconds", type=float, help="time budget (default: LLM_BUDGET_SECONDS)")
+    describe.set_defaults(func=cmd_describe)
+
+    visualize = commands.add_parser("visualize", help="render the dependency graph of a saved snapshot")
+    visualize.add_argument("snapshot", help="service_snapshot.db written by scan/describe")
+    visualize.add_argument("-o", "--output", help="HTML path (default: next to the snapshot)")
+    visualize.set_defaults(func=cmd_visualize)
+
+    diff = commands.add_parser("diff", help="compare two snapshots")
+    diff.add_argument("old")
+    diff.add_argument("new")
+    diff.add_argument("-o", "--output", help="write the diff as JSON instead of printing it")
+    diff.set_defaults(func=cmd_diff)
+
+    serve = commands.add_parser("daemon", help="serve a job queue over a local HTTP/JSON API")
+    serve.add_argument("--host", help="default: RECON_DAEMON_HOST or 127.0.0.1")
+    serve.add_argument("--port", type=int, help="default: RECON_DAEMON_PORT or 8765")
+    serve.add_argument("--workers", type=int, help="jobs run concurrently (default: RECON_DAEMON_WORKERS or 2)")
+    serve.add_argument("--state-dir", help="job queue database and per-target snapshots (default: recon_daemon)")
+    serve.add_argument("--response-cache", help="cache LLM responses in this cassette file across jobs")
+    serve.add_argument("--cascade", action="store_true", help="local-first cascade with escalation to openai")
+    serve.set_defaults(func=cmd_daemon)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
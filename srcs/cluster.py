@@ -0,0 +1,219 @@
+import math
+import os
+import random
+import re
+import zlib
+from collections import Counter
+
+from xref import PARAM, normalize_path
+
+# 이 값 이상의 추정 Jaccard 유사도를 가진 엔드포인트를 같은 클러스터로 묶음 (0이면 클러스터링 안 함)
+CLUSTER_THRESHOLD = float(os.environ.get("CLUSTER_THRESHOLD", "0.9"))
+# 클러스터 멤버 중 LLM으로 직접 설명해 템플릿 결과와 비교할 비율
+SPOT_CHECK_RATE = float(os.environ.get("CLUSTER_SPOT_CHECK", "0"))
+
+SHINGLE_SIZE = 4
+# one-permutation MinHash의 bin 수와 LSH 밴드 구성 (SIGNATURE_BINS = BANDS * ROWS)
+SIGNATURE_BINS = 64
+BANDS = 16
+ROWS = 4
+# 검증할 후보 클러스터 수와 후보가 되기 위한 최소 밴드 일치 수
+MAX_CANDIDATES = 8
+MIN_BAND_HITS = 2
+
+# 엔티티 단어 자리표시자
+ENTITY_TOKEN = "§"
+# 파일 이름에서 엔티티 이름을 얻기 위해 떼어내는 접미사
+FILE_SUFFIXES = ("controller", "controllers", "routes", "route", "router", "views", "view", "resource",
+                 "handler", "handlers", "api", "service", "endpoint", "endpoints")
+
+_TOKEN = re.compile(r"[A-Za-z_]\w*|\d+|\"(?:\\.|[^\"\\])*\"|'(?:\\.|[^'\\])*'|\S")
+_WORD = re.compile(r"^[A-Za-z][A-Za-z0-9_-]{2,}$")
+
+
+def _singular(word):
+    lowered = word.lower()
+    return word[:-1] if len(word) > 3 and lowered.endswith("s") and not lowered.endswith(("ss", "us")) else word
+
+
+def _file_entity(file_path):
+    """UserController.java, user_routes.py 같은 파일 이름에서 엔티티 이름을 꺼냅니다."""
+    stem = os.path.splitext(os.path.basename(file_path or ""))[0]
+    lowered = stem.lower()
+    for suffix in FILE_SUFFIXES:
+        if lowered.endswith(suffix) and len(lowered) > len(suffix):
+            stem = stem[:-len(suffix)].rstrip("_-.")
+            break
+    return stem if _WORD.match(stem or "") else None
+
+
+def entity_words(endpoint):
+    """엔드포인트의 엔티티 단어들: 경로의 리터럴 세그먼트와 파일 이름의 엔티티 (순서 유지)."""
+    words = [segment for segment in normalize_path(endpoint.path) if segment != PARAM and _WORD.match(segment)]
+    entity = _file_entity(endpoint.file_path)
+    if entity:
+        words.append(entity)
+    return words
+
+
+def _entity_variants(words):
+    variants = set()
+    for word in words:
+        variants.update({word.lower(), _singular(word).lower()})
+    return sorted((v for v in variants if len(v) > 2), key=len, reverse=True)
+
+
+def normalized_tokens(endpoint):
+    """코드를 토큰화하고 엔티티 단어를 ENTITY_TOKEN으로 바꿉니다. 엔티티 이름만 다른 핸들러는 같은 토큰열이 됩니다."""
+    variants = _entity_variants(entity_words(endpoint))
+    tokens = []
+    for token in _TOKEN.findall(endpoint.code or ""):
+        lowered = token.lower()
+        for variant in variants:
+            if variant in lowered:
+                lowered = lowered.replace(variant, ENTITY_TOKEN)
+        tokens.append(lowered)
+    return tokens
+
+
+def signature(tokens):
+    """
+    토큰 shingle 집합의 one-permutation MinHash 서명을 한 번의 순회로 계산합니다.
+    빈 bin은 None입니다. shingle이 없으면 None을 반환합니다.
+    """
+    shingles = {" ".join(tokens[i:i + SHINGLE_SIZE]) for i in range(max(len(tokens) - SHINGLE_SIZE + 1, 0))}
+    if not shingles:
+        return None
+    bins = [None] * SIGNATURE_BINS
+    for shingle in shingles:
+        value = (zlib.crc32(shingle.encode()) * 0x9E3779B1) & 0xFFFFFFFF
+        index, rank = value % SIGNATURE_BINS, value // SIGNATURE_BINS
+        if bins[index] is None or rank < bins[index]:
+            bins[index] = rank
+    return bins
+
+
+def similarity(a, b):
+    """두 서명의 추정 Jaccard 유사도 (둘 다 빈 bin은 제외)."""
+    used = [(x, y) for x, y in zip(a, b) if x is not None or y is not None]
+    return sum(1 for x, y in used if x == y) / len(used) if used else 0.0
+
+
+class Cluster:
+    """설명할 대표 엔드포인트 하나와 템플릿 치환으로 채울 멤버들입니다."""
+
+    def __init__(self, representative, signature):
+        self.representative = representative
+        self.signature = signature
+        self.members = []
+
+    def __len__(self):
+        return 1 + len(self.members)
+
+
+def cluster_endpoints(endpoints, threshold=None):
+    """
+    거의 같은 핸들러를 LSH 후보 탐색 + 대표 엔드포인트와의 유사도 검증으로 묶습니다.
+    같은 HTTP 메소드끼리만 묶으며, 대표는 먼저 나온 엔드포인트입니다. 모든 엔드포인트가 정확히 한
+    클러스터에 들어간 Cluster 목록을 반환합니다.
+    """
+    threshold = CLUSTER_THRESHOLD if threshold is None else threshold
+    clusters = []
+    buckets = {}
+    for endpoint in endpoints:
+        sig = signature(normalized_tokens(endpoint))
+        if threshold <= 0 or sig is None:
+            clusters.append(Cluster(endpoint, sig))
+            continue
+        method = (endpoint.method or "").upper()
+        keys = [(method, band, tuple(sig[band * ROWS:(band + 1) * ROWS])) for band in range(BANDS)]
+        # 여러 밴드에서 겹친 후보만 검증 (임계값 근처의 쌍은 대부분의 밴드가 겹침)
+        hits = Counter(candidate for key in keys for candidate in buckets.get(key, ()))
+        best, best_score = None, threshold
+        for candidate, count in hits.most_common(MAX_CANDIDATES):
+            if count < MIN_BAND_HITS:
+                break
+            score = similarity(sig, candidate.signature)
+            if score >= best_score:
+                best, best_score = candidate, score
+        if best is not None:
+            best.members.append(endpoint)
+            continue
+        cluster = Cluster(endpoint, sig)
+        clusters.append(cluster)
+        for key in keys:
+            buckets.setdefault(key, []).append(cluster)
+    return clusters
+
+
+def substitution_pairs(source, target):
+    """대표(source)의 엔티티 단어를 멤버(target)의 단어로 바꾸는 (원래 단어, 새 단어) 목록입니다."""
+    pairs = {}
+    source_words, target_words = entity_words(source), entity_words(target)
+    if len(source_words) == len(target_words):
+        for old, new in zip(source_words, target_words):
+            if old.lower() != new.lower():
+                pairs[old.lower()] = new
+                if _singular(old) != old and _singular(new) != new:
+                    pairs[_singular(old).lower()] = _singular(new)
+    return pairs
+
+
+def _match_case(template, word):
+    if template.isupper():
+        return word.upper()
+    if template[:1].isupper():
+        return word[:1].upper() + word[1:]
+    return word[:1].lower() + word[1:]
+
+
+# 식별자 안의 단어 경계: 영숫자가 아닌 문자와의 경계, 또는 camelCase의 소문자/숫자 -> 대문자 전환
+_WORD_START = r"(?:(?<![A-Za-z0-9])|(?<=[a-z0-9])(?=[A-Z]))"
+_WORD_END = r"(?:(?![A-Za-z0-9])|(?<=[a-z0-9])(?=[A-Z]))"
+
+
+def substitute(value, pairs):
+    """
+    문자열/리스트/dict 안의 엔티티 단어를 대소문자를 맞춰 치환합니다.
+    단어 단위로만 바꾸며 camelCase/snake_case의 각 부분은 별도 단어로 봅니다 (userId, user_id는 바꾸고
+    username, superuser는 그대로 둠).
+    """
+    if isinstance(value, str):
+        if not pairs:
+            return value
+        words = "|".join(map(re.escape, sorted(pairs, key=len, reverse=True)))
+        pattern = re.compile(_WORD_START + "(?i:" + words + ")" + _WORD_END)
+        return pattern.sub(lambda m: _match_case(m.group(0), pairs[m.group(0).lower()]), value)
+    if isinstance(value, list):
+        return [substitute(item, pairs) for item in value]
+    if isinstance(value, dict):
+        return {key: substitute(item, pairs) for key, item in value.items()}
+    return value
+
+
+def templated_description(description, representative, member):
+    """대표 엔드포인트의 설명을 멤버 엔드포인트용으로 바꿉니다. path/method는 멤버 자신의 값을 씁니다."""
+    desc = substitute(description, substitution_pairs(representative, member))
+    desc["path"] = member.path
+    desc["method"] = member.method
+    return desc
+
+
+def spot_check_sample(clusters, rate=None, seed=0):
+    """클러스터마다 rate 비율(최소 1개)의 멤버를 골라 LLM으로 직접 설명할 대상을 반환합니다."""
+    rate = SPOT_CHECK_RATE if rate is None else rate
+    if rate <= 0:
+        return []
+    rng = random.Random(seed)
+    sample = []
+    for cluster in clusters:
+        if cluster.members:
+            sample.extend(rng.sample(cluster.members, min(len(cluster.members), math.ceil(rate * len(cluster.members)))))
+    return sample
+
+
+def descriptions_agree(templated, described):
+    """스팟 체크: 템플릿 결과와 실제 설명의 파라미터/응답 타입이 같은지 확인합니다."""
+    def fields(desc):
+        return sorted(map(str, desc.get("params") or [])), (desc.get("response_type") or "").lower()
+    return fields(templated) == fields(described)
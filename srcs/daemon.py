@@ -0,0 +1,401 @@
+import hashlib
+import importlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+DAEMON_HOST = os.environ.get("RECON_DAEMON_HOST", "127.0.0.1")
+DAEMON_PORT = int(os.environ.get("RECON_DAEMON_PORT", "8765"))
+DAEMON_WORKERS = int(os.environ.get("RECON_DAEMON_WORKERS", "2"))
+# 작업 큐 DB와 대상별 결과물(스냅샷)이 저장되는 디렉토리
+DAEMON_STATE_DIR = os.environ.get("RECON_DAEMON_STATE_DIR", "recon_daemon")
+JOBS_DB_NAME = "jobs.db"
+# daemon 시작 시 미리 로드하는 파이프라인 모듈
+WARM_MODULES = ("framework", "cascade", "budget", "cluster", "dbdiscovery", "diff", "snapshot", "xref")
+# 결과 스트림이 새 결과를 기다리는 최대 시간 (초)
+STREAM_POLL_SECONDS = 1.0
+FINISHED_STATUSES = ("done", "failed")
+# 작업 옵션과 그 타입 (제출 시 검증/변환)
+JOB_OPTIONS = {"local": bool, "describe": bool, "max_tokens": int, "max_dollars": float, "max_seconds": float}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT UNIQUE,
+    target TEXT,
+    options TEXT,
+    status TEXT,
+    created_at REAL,
+    started_at REAL,
+    finished_at REAL,
+    summary TEXT,
+    error TEXT
+);
+CREATE TABLE IF NOT EXISTS results (seq INTEGER PRIMARY KEY AUTOINCREMENT, job_id TEXT, data TEXT);
+CREATE INDEX IF NOT EXISTS results_job ON results (job_id, seq);
+"""
+
+
+class JobQueue:
+    """
+    SQLite에 저장되는 작업 큐와 작업별 엔드포인트 결과입니다.
+    daemon이 재시작되면 실행 중이던 작업은 부분 결과를 지우고 다시 대기열로 돌아갑니다.
+    """
+
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.changed = threading.Condition()
+        with self.changed:
+            self.conn.executescript(SCHEMA)
+            interrupted = [row["id"] for row in self.conn.execute("SELECT id FROM jobs WHERE status = 'running'")]
+            self.conn.executemany("DELETE FROM results WHERE job_id = ?", [(job_id,) for job_id in interrupted])
+            self.conn.execute("UPDATE jobs SET status = 'queued', started_at = NULL WHERE status = 'running'")
+            self.conn.commit()
+        if interrupted:
+            print(f"[Daemon] Re-queued {len(interrupted)} interrupted job(s)")
+
+    @staticmethod
+    def _job(row):
+        if row is None:
+            return None
+        job = dict(row)
+        job.pop("seq")
+        job["options"] = json.loads(job["options"])
+        job["summary"] = json.loads(job["summary"]) if job["summary"] else None
+        return job
+
+    def submit(self, target, options):
+        job_id = uuid.uuid4().hex
+        with self.changed:
+            self.conn.execute(
+                "INSERT INTO jobs (id, target, options, status, created_at) VALUES (?, ?, ?, 'queued', ?)",
+                (job_id, target, json.dumps(options), time.time()))
+            self.conn.commit()
+            self.changed.notify_all()
+        return self.get(job_id)
+
+    def claim(self):
+        """가장 오래된 대기 작업을 running으로 바꿔 반환합니다. 없으면 None입니다."""
+        with self.changed:
+            row = self.conn.execute("SELECT id FROM jobs WHERE status = 'queued' ORDER BY seq LIMIT 1").fetchone()
+            if row is None:
+                return None
+            self.conn.execute("UPDATE jobs SET status = 'running', started_at = ? WHERE id = ?",
+                              (time.time(), row["id"]))
+            self.conn.commit()
+        return self.get(row["id"])
+
+    def finish(self, job_id, summary=None, error=None):
+        with self.changed:
+            self.conn.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, summary = ?, error = ? WHERE id = ?",
+                ("failed" if error else "done", time.time(), json.dumps(summary) if summary else None, error, job_id))
+            self.conn.commit()
+            self.changed.notify_all()
+
+    def add_result(self, job_id, data):
+        with self.changed:
+            self.conn.execute("INSERT INTO results (job_id, data) VALUES (?, ?)",
+                              (job_id, json.dumps(data, ensure_ascii=False)))
+            self.conn.commit()
+            self.changed.notify_all()
+
+    def get(self, job_id):
+        with self.changed:
+            return self._job(self.conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone())
+
+    def list(self, limit=50):
+        with self.changed:
+            rows = self.conn.execute("SELECT * FROM jobs ORDER BY seq DESC LIMIT ?", (limit,)).fetchall()
+        return [self._job(row) for row in rows]
+
+    def counts(self):
+        with self.changed:
+            return dict(self.conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+    def results(self, job_id, after=0):
+        """after 이후의 (seq, JSON 문자열) 결과 목록입니다."""
+        with self.changed:
+            return self.conn.execute("SELECT seq, data FROM results WHERE job_id = ? AND seq > ? ORDER BY seq",
+                                     (job_id, after)).fetchall()
+
+    def wait(self, timeout):
+        """작업/결과가 바뀌거나 timeout이 지날 때까지 기다립니다."""
+        with self.changed:
+            self.changed.wait(timeout)
+
+
+def parse_job_options(request):
+    """
+    제출 요청에서 작업 옵션을 검증해 변환합니다. 모르는 키나 잘못된 타입/음수 한도는 ValueError입니다.
+    숫자 문자열("5000")은 받아들이지만, 불리언 자리의 문자열이나 숫자 자리의 불리언은 받지 않습니다.
+    """
+    unknown = sorted(set(request) - set(JOB_OPTIONS) - {"target"})
+    if unknown:
+        raise ValueError(f"unknown option(s) {unknown}; allowed: {sorted(JOB_OPTIONS)}")
+    options = {}
+    for key, kind in JOB_OPTIONS.items():
+        value = request.get(key)
+        if value is None:
+            continue
+        if kind is bool:
+            if not isinstance(value, bool):
+                raise ValueError(f"{key} must be true or false, got {value!r}")
+            options[key] = value
+            continue
+        if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+            raise ValueError(f"{key} must be a number, got {value!r}")
+        try:
+            number = kind(value)
+        except ValueError:
+            raise ValueError(f"{key} must be a number, got {value!r}") from None
+        if number < 0 or number != number:
+            raise ValueError(f"{key} must be a non-negative number, got {value!r}")
+        options[key] = number
+    return options
+
+
+def endpoint_result(endpoint):
+    """스트림으로 내보낼 엔드포인트 결과 (코드 제외)."""
+    return {
+        "id": endpoint.id,
+        "method": endpoint.method,
+        "path": endpoint.path,
+        "file_path": endpoint.file_path,
+        "language": endpoint.language,
+        "framework": endpoint.framework,
+        "params": endpoint.params,
+        "cookies": endpoint.cookies,
+        "headers": endpoint.headers,
+        "response_type": endpoint.response_type,
+        "auth_required": endpoint.auth_required,
+        "description": endpoint.description,
+        "dependencies": endpoint.dependencies.get_dependencies(endpoint.id),
+        "pending": endpoint.description is None,
+    }
+
+
+class ReconDaemon:
+    """
+    작업 큐를 처리하는 worker 스레드들입니다. 한 프로세스에서 계속 실행되므로 import된 모듈, 컴파일된 패턴,
+    OpenAI 클라이언트, 로컬 서버 풀의 상태, (설정 시) 응답 캐시가 작업 사이에 재사용됩니다.
+    대상마다 고정된 출력 디렉토리를 쓰므로 같은 대상을 다시 제출하면 이전 스냅샷과 비교해 바뀐 엔드포인트만 설명합니다.
+    """
+
+    def __init__(self, state_dir=DAEMON_STATE_DIR, workers=DAEMON_WORKERS):
+        os.makedirs(state_dir, exist_ok=True)
+        self.state_dir = state_dir
+        self.queue = JobQueue(os.path.join(state_dir, JOBS_DB_NAME))
+        self.workers = max(1, workers)
+        self._target_locks = {}
+        self._locks_lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._threads = []
+
+    def start(self):
+        # 첫 작업 전에 파이프라인 단계 모듈을 미리 import (framework는 단계 모듈을 실행 시점에 import함)
+        for name in WARM_MODULES:
+            importlib.import_module(name)
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"recon-worker-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        self._stopping.set()
+        with self.queue.changed:
+            self.queue.changed.notify_all()
+
+    def output_dir(self, target):
+        key = hashlib.sha1(os.path.abspath(target).encode("utf-8")).hexdigest()[:16]
+        return os.path.join(self.state_dir, "targets", key)
+
+    def _target_lock(self, target):
+        # 같은 대상의 작업은 같은 스냅샷을 쓰므로 한 번에 하나만 실행
+        with self._locks_lock:
+            return self._target_locks.setdefault(os.path.abspath(target), threading.Lock())
+
+    def _work(self):
+        while not self._stopping.is_set():
+            job = self.queue.claim()
+            if job is None:
+                self.queue.wait(STREAM_POLL_SECONDS)
+                continue
+            print(f"[Daemon] Job {job['id']} started: {job['target']}")
+            try:
+                summary = self.run_job(job)
+            except Exception as e:
+                traceback.print_exc()
+                self.queue.finish(job["id"], error=f"{type(e).__name__}: {e}")
+                print(f"[Daemon] Job {job['id']} failed: {e}")
+            else:
+                self.queue.finish(job["id"], summary=summary)
+                print(f"[Daemon] Job {job['id']} done: {summary['endpoints']} endpoints")
+
+    def run_job(self, job):
+        import framework
+        from budget import Budget
+        from llm import stream_scope
+        from tokens import TokenLedger, ledger_scope
+
+        options = job["options"]
+        output_dir = self.output_dir(job["target"])
+        streamed = set()
+
+        def on_endpoint(endpoint):
+            streamed.add(endpoint.id)
+            self.queue.add_result(job["id"], endpoint_result(endpoint))
+
+        # 작업마다 장부를 따로 써서 동시에 도는 다른 작업의 사용량이 이 작업의 예산에 합산되지 않게 함.
+        # METRICS는 프로세스 전체가 공유하므로 실행 리포트는 쓰지 않음 (/metrics로 제공)
+        with self._target_lock(job["target"]), stream_scope(job["id"]), ledger_scope(TokenLedger()) as ledger:
+            budget = Budget(options.get("max_tokens"), options.get("max_dollars"), options.get("max_seconds"))
+            service = framework.run_recon(job["target"], bool(options.get("local")), output_dir,
+                                          describe=options.get("describe", True), visualize=False, budget=budget,
+                                          on_endpoint=on_endpoint, reports=False)
+            ledger.write(os.path.join(output_dir, framework.COST_LEDGER_PATH))
+        if service is None:
+            raise RuntimeError("main folder or main source could not be identified")
+        # 이전 실행에서 가져온(설명하지 않은) 엔드포인트와 pending 엔드포인트도 결과에 포함
+        for endpoint in service.endpoints:
+            if endpoint.id not in streamed:
+                self.queue.add_result(job["id"], endpoint_result(endpoint))
+        return {
+            "service": service.name,
+            "framework": service.framework,
+            "languages": service.languages,
+            "endpoints": len(service.endpoints),
+            "pending": sum(1 for endpoint in service.endpoints if endpoint.description is None),
+            "output_dir": output_dir,
+            "usage": ledger.summary()["total"],
+        }
+
+
+class DaemonHandler(BaseHTTPRequestHandler):
+    """
+    POST /jobs                 {"target": "...", "local": false, "describe": true, "max_tokens": ...} -> 202 작업
+    GET  /jobs                 최근 작업 목록
+    GET  /jobs/<id>            작업 상태
+    GET  /jobs/<id>/results    엔드포인트 결과 NDJSON 스트림 (?after=seq부터, 작업이 끝나면 종료)
+    GET  /metrics              Prometheus 텍스트 (daemon 전체 누적)
+    GET  /health
+    """
+
+    daemon = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, body):
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        if urlparse(self.path).path.rstrip("/") != "/jobs":
+            self._send_json(404, {"error": "not found"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+        except (ValueError, json.JSONDecodeError) as e:
+            self._send_json(400, {"error": f"invalid JSON: {e}"})
+            return
+        if not isinstance(request, dict):
+            self._send_json(400, {"error": "request body must be a JSON object"})
+            return
+        target = request.get("target")
+        if not isinstance(target, str) or not os.path.isdir(target):
+            self._send_json(400, {"error": f"target is not a directory: {target!r}"})
+            return
+        try:
+            options = parse_job_options(request)
+        except ValueError as e:
+            self._send_json(400, {"error": str(e)})
+            return
+        self._send_json(202, self.daemon.queue.submit(os.path.abspath(target), options))
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        parts = [part for part in url.path.split("/") if part]
+        queue = self.daemon.queue
+        if parts == ["health"]:
+            self._send_json(200, {"status": "ok", "workers": self.daemon.workers, "jobs": queue.counts()})
+        elif parts == ["metrics"]:
+            from metrics import METRICS
+            data = METRICS.to_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        elif parts == ["jobs"]:
+            self._send_json(200, {"jobs": queue.list()})
+        elif len(parts) == 2 and parts[0] == "jobs":
+            job = queue.get(parts[1])
+            self._send_json(200, job) if job else self._send_json(404, {"error": "unknown job"})
+        elif len(parts) == 3 and parts[0] == "jobs" and parts[2] == "results":
+            after = parse_qs(url.query).get("after", ["0"])[0]
+            self._stream_results(parts[1], int(after) if after.isdigit() else 0)
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def _stream_results(self, job_id, after):
+        """결과를 한 줄에 하나씩 보내고, 작업이 끝나면 마지막 상태 줄을 보낸 뒤 연결을 닫습니다."""
+        queue = self.daemon.queue
+        if queue.get(job_id) is None:
+            self._send_json(404, {"error": "unknown job"})
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.end_headers()
+        try:
+            while True:
+                # 상태를 먼저 읽어야 끝난 작업의 마지막 결과를 놓치지 않음
+                job = queue.get(job_id)
+                rows = queue.results(job_id, after)
+                for seq, data in rows:
+                    self.wfile.write(f'{{"seq": {seq}, "endpoint": {data}}}\n'.encode("utf-8"))
+                    after = seq
+                self.wfile.flush()
+                if job["status"] in FINISHED_STATUSES and not rows:
+                    final = {"status": job["status"], "summary": job["summary"], "error": job["error"]}
+                    self.wfile.write((json.dumps(final, ensure_ascii=False) + "\n").encode("utf-8"))
+                    return
+                if not rows:
+                    queue.wait(STREAM_POLL_SECONDS)
+        except (BrokenPipeError, ConnectionResetError):
+            return
+
+
+def serve(host=DAEMON_HOST, port=DAEMON_PORT, workers=DAEMON_WORKERS, state_dir=DAEMON_STATE_DIR,
+          response_cache=None):
+    """daemon을 실행합니다. response_cache가 주어지면 LLM 응답을 그 파일에 캐시해 작업 사이에 재사용합니다."""
+    if response_cache:
+        import llm
+        llm.use_cassette(response_cache, "auto")
+    daemon = ReconDaemon(state_dir, workers)
+    daemon.start()
+    handler = type("BoundDaemonHandler", (DaemonHandler,), {"daemon": daemon})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    print(f"[Daemon] Listening on http://{host}:{server.server_address[1]} with {daemon.workers} worker(s), "
+          f"state in {state_dir}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        daemon.stop()
+        server.server_close()
+    return 0
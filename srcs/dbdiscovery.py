@@ -0,0 +1,303 @@
+import os
+import re
+
+import model
+
+# 데이터소스 설정 파일 이름
+CONFIG_FILENAMES = {
+    "settings.py", ".env", "database.yml", "knexfile.js", "ormconfig.json", "ormconfig.js",
+    "config.json", "docker-compose.yml", "docker-compose.yaml", "persistence.xml",
+}
+CONFIG_PREFIXES = ("application", "bootstrap", ".env")
+CONFIG_EXTENSIONS = {".properties", ".yml", ".yaml", ".env", ".ini", ".toml", ".conf"}
+ENTITY_EXTENSIONS = {".java", ".kt", ".py", ".js", ".ts", ".cs", ".php", ".rb", ".go"}
+SKIP_DIRS = {".git", "node_modules", "__pycache__", ".venv", "venv", "target", "build", "dist"}
+# 이보다 큰 파일은 인덱싱하지 않음
+MAX_INDEX_FILE_BYTES = 2 * 1024 * 1024
+# init_sql로 보관할 최대 글자 수
+MAX_INIT_SQL_CHARS = 20000
+# LLM에 한 번에 묻는 모호한 엔드포인트 수와 코드 길이
+LLM_BATCH_SIZE = 10
+LLM_SNIPPET_CHARS = 1200
+
+_DB_TYPE_ALIASES = {
+    "postgres": "PostgreSQL", "postgresql": "PostgreSQL", "psycopg2": "PostgreSQL", "pgsql": "PostgreSQL",
+    "mysql": "MySQL", "mariadb": "MariaDB", "sqlite": "SQLite", "sqlite3": "SQLite", "h2": "H2",
+    "oracle": "Oracle", "sqlserver": "SQL Server", "mssql": "SQL Server", "mongodb": "MongoDB",
+    "mongodb+srv": "MongoDB", "redis": "Redis", "hsqldb": "HSQLDB", "derby": "Derby",
+}
+_DB_NAMES = "|".join(sorted((re.escape(name) for name in _DB_TYPE_ALIASES), key=len, reverse=True))
+
+# 연결 문자열 (jdbc:mysql://..., postgres://..., mongodb+srv://...)
+_JDBC_URL = re.compile(r"jdbc:(?P<type>\w+):[^\s\"'<>]+")
+_URL = re.compile(r"(?P<type>" + _DB_NAMES + r")://[^\s\"'<>]+", re.IGNORECASE)
+# Django ENGINE, .env DB_CONNECTION, dialect 설정 등
+_ENGINE = re.compile(
+    r"(?:ENGINE|DB_CONNECTION|DB_DRIVER|dialect|driver|adapter|client|DATABASE_TYPE|type)\s*[:=]\s*"
+    r"[\"']?(?:django\.db\.backends\.)?(?P<type>" + _DB_NAMES + r")\b",
+    re.IGNORECASE,
+)
+
+# ORM 엔티티 / 모델 선언
+_JPA_ENTITY = re.compile(r"@Entity\b(?:\([^)]*\))?[\s\S]{0,300}?\bclass\s+(?P<cls>\w+)")
+_JPA_TABLE = re.compile(r"@Table\s*\(\s*(?:name\s*=\s*)?\"(?P<table>\w+)\"")
+_TYPEORM_ENTITY = re.compile(r"@Entity\s*\(\s*[\"'](?P<table>\w+)[\"']")
+_DJANGO_MODEL = re.compile(r"class\s+(?P<cls>\w+)\s*\([^)]*models\.Model[^)]*\)")
+_DB_TABLE_META = re.compile(r"db_table\s*=\s*[\"'](?P<table>\w+)[\"']")
+_SQLALCHEMY_TABLE = re.compile(r"class\s+(?P<cls>\w+)\s*\([^)]*\)\s*:[\s\S]{0,300}?__tablename__\s*=\s*[\"'](?P<table>\w+)[\"']")
+_SEQUELIZE_DEFINE = re.compile(r"\.define\s*\(\s*[\"'](?P<table>\w+)[\"']")
+_MONGOOSE_MODEL = re.compile(r"mongoose\.model\s*\(\s*[\"'](?P<table>\w+)[\"']")
+_CREATE_TABLE = re.compile(
+    r"CREATE\s+TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?[`\"\[]?(?:\w+[`\"\]]?\.[`\"\[]?)?(?P<table>\w+)", re.IGNORECASE
+)
+
+# 테이블/엔티티 이름이 같아도 단독 단어로는 매칭하지 않는 SQL 키워드
+SQL_KEYWORDS = {
+    "ORDER", "GROUP", "SELECT", "INDEX", "TABLE", "KEY", "VALUES", "WHERE", "FROM", "JOIN", "UPDATE", "DELETE",
+    "INSERT", "LIMIT", "OFFSET", "SET", "CASE", "DESC", "ASC", "COUNT", "SUM", "DISTINCT", "HAVING", "UNION",
+    "VIEW", "CHECK", "COLUMN", "DEFAULT", "PRIMARY", "REFERENCES", "TRIGGER", "SCHEMA",
+}
+# 코드 내 SQL 테이블 참조
+_SQL_TABLE_REF = re.compile(r"\b(?:FROM|JOIN|INTO|UPDATE)\s+[`\"\[]?(?P<table>\w+)", re.IGNORECASE)
+# 테이블 이름을 알 수 없는 DB 접근 신호
+_DB_ACCESS_HINT = re.compile(
+    r"Repository\b|\.objects\.|\.query\b|\.execute\(|jdbcTemplate|EntityManager|session\.(?:add|query|get)|"
+    r"\.find(?:One|All|ById)?\(|\.save\(|\bSELECT\b|\bINSERT\b|\bUPDATE\b|\bDELETE\s+FROM\b",
+)
+
+
+def _is_config_file(filename):
+    name = filename.lower()
+    extension = os.path.splitext(name)[1]
+    return (
+        name in CONFIG_FILENAMES
+        or (name.startswith(CONFIG_PREFIXES) and (extension in CONFIG_EXTENSIONS or name.startswith(".env")))
+    )
+
+
+def index_inventory(root_directory):
+    """
+    디렉토리를 한 번 순회하며 DB 탐색 대상 파일을 분류합니다.
+    반환값: {"config": [...], "entity": [...], "sql": [...]}
+    """
+    inventory = {"config": [], "entity": [], "sql": []}
+    for dirpath, dirnames, filenames in os.walk(root_directory):
+        dirnames[:] = [d for d in dirnames if d not in SKIP_DIRS]
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            extension = os.path.splitext(filename)[1].lower()
+            if _is_config_file(filename):
+                inventory["config"].append(path)
+            elif extension == ".sql":
+                inventory["sql"].append(path)
+            elif extension in ENTITY_EXTENSIONS:
+                inventory["entity"].append(path)
+    return inventory
+
+
+def _read(path):
+    try:
+        if os.path.getsize(path) > MAX_INDEX_FILE_BYTES:
+            return ""
+        with open(path, "r", encoding="utf-8", errors="ignore") as f:
+            return f.read()
+    except OSError:
+        return ""
+
+
+def _normalize_db_type(name):
+    return _DB_TYPE_ALIASES.get(name.lower(), name)
+
+
+def scan_datasources(config_files):
+    """설정 파일에서 (db_type, connection_string, 출처) 목록을 찾습니다."""
+    found = []
+    for path in config_files:
+        text = _read(path)
+        for match in _JDBC_URL.finditer(text):
+            found.append((_normalize_db_type(match.group("type")), match.group(0), path))
+        for match in _URL.finditer(text):
+            found.append((_normalize_db_type(match.group("type")), match.group(0), path))
+        for match in _ENGINE.finditer(text):
+            found.append((_normalize_db_type(match.group("type")), None, path))
+    return found
+
+
+def scan_entities(entity_files):
+    """ORM 엔티티/모델 선언에서 {테이블 이름: 엔티티 클래스 이름(없으면 None)}을 찾습니다."""
+    tables = {}
+    for path in entity_files:
+        text = _read(path)
+        if not text:
+            continue
+        if "@Entity" in text:
+            for match in _JPA_ENTITY.finditer(text):
+                table = _JPA_TABLE.search(text, match.start(), match.end() + 200)
+                tables[table.group("table") if table else match.group("cls").lower()] = match.group("cls")
+            for match in _TYPEORM_ENTITY.finditer(text):
+                tables.setdefault(match.group("table"), None)
+        if "models.Model" in text:
+            for match in _DJANGO_MODEL.finditer(text):
+                meta = _DB_TABLE_META.search(text, match.end(), match.end() + 2000)
+                tables[meta.group("table") if meta else match.group("cls").lower()] = match.group("cls")
+        if "__tablename__" in text:
+            for match in _SQLALCHEMY_TABLE.finditer(text):
+                tables[match.group("table")] = match.group("cls")
+        for pattern in (_SEQUELIZE_DEFINE, _MONGOOSE_MODEL):
+            for match in pattern.finditer(text):
+                tables.setdefault(match.group("table"), None)
+    return tables
+
+
+def scan_migrations(sql_files):
+    """마이그레이션/스키마 SQL에서 테이블 목록과 init_sql을 찾습니다."""
+    tables = []
+    init_sql = []
+    for path in sorted(sql_files):
+        text = _read(path)
+        created = [match.group("table") for match in _CREATE_TABLE.finditer(text)]
+        if created:
+            tables.extend(created)
+            init_sql.append(f"-- {os.path.basename(path)}\n{text.strip()}")
+    return tables, "\n\n".join(init_sql)[:MAX_INIT_SQL_CHARS]
+
+
+def _singular(word):
+    """복수형 이름의 단수형 (orders -> order, categories -> category, addresses -> address, status -> status)."""
+    if word.endswith("ies") and len(word) > 4:
+        return word[:-3] + "y"
+    if word.endswith(("sses", "xes", "ches", "shes")):
+        return word[:-2]
+    if word.endswith("s") and not word.endswith(("ss", "us")):
+        return word[:-1]
+    return word
+
+
+def _camel(word, upper=True):
+    """snake_case 이름을 CamelCase(upper) 또는 camelCase로 바꿉니다 (user_account -> UserAccount)."""
+    parts = [part for part in word.split("_") if part]
+    if not parts:
+        return word
+    camel = "".join(part[:1].upper() + part[1:] for part in parts)
+    return camel if upper else camel[:1].lower() + camel[1:]
+
+
+def _table_matchers(tables):
+    """
+    테이블별로 코드에서 찾을 이름 정규식을 만듭니다. 대소문자를 구분합니다.
+    테이블 이름 그대로, 엔티티 클래스, CamelCase 단수형(Order, UserAccount)은 단독으로도 매칭하고,
+    소문자 단수형(user, userAccount)과 SQL 키워드와 같은 이름(Order, Group)은 Repository/Dao/Mapper가 붙을 때만
+    매칭합니다 (일반 단어나 ORDER BY 같은 SQL 구문에 걸리지 않도록).
+    """
+    matchers = {}
+    for table, entity in tables.items():
+        singular = _singular(table)
+        names = {table, _camel(singular)} | ({entity} if entity else set())
+        standalone = {name for name in names if len(name) > 2 and name.upper() not in SQL_KEYWORDS}
+        suffixed = (names | {singular, _camel(singular, upper=False)}) - standalone
+        alternatives = []
+        if standalone:
+            words = "|".join(map(re.escape, sorted(standalone, key=len, reverse=True)))
+            alternatives.append(r"\b(?:" + words + r")(?:s|Repository|Dao|Mapper)?\b")
+        suffixed = sorted((name for name in suffixed if len(name) > 1), key=len, reverse=True)
+        if suffixed:
+            alternatives.append(r"\b(?:" + "|".join(map(re.escape, suffixed)) + r")(?:Repository|Dao|Mapper)\b")
+        if alternatives:
+            matchers[table] = re.compile("|".join(alternatives))
+    return matchers
+
+
+def link_endpoints_to_tables(service, tables):
+    """
+    엔드포인트 코드에서 테이블 참조를 찾아 {endpoint_id: [table, ...]}을 반환합니다.
+    테이블을 찾지 못했지만 DB 접근 흔적이 있는 엔드포인트는 모호한 것으로 따로 반환합니다.
+    """
+    matchers = _table_matchers(tables)
+    known = {table.lower(): table for table in tables}
+    links = {}
+    ambiguous = []
+    for endpoint in service.endpoints:
+        code = endpoint.code or ""
+        found = [table for table, matcher in matchers.items() if matcher.search(code)]
+        for match in _SQL_TABLE_REF.finditer(code):
+            table = known.get(match.group("table").lower())
+            if table and table not in found:
+                found.append(table)
+        if found:
+            links[endpoint.id] = found
+        elif _DB_ACCESS_HINT.search(code):
+            ambiguous.append(endpoint)
+    return links, ambiguous
+
+
+def _ask_llm_for_leftovers(ambiguous, tables, db_type, use_local):
+    """모호한 엔드포인트를 LLM_BATCH_SIZE개씩 묶어 사용하는 테이블과 DB 종류를 묻습니다."""
+    from cascade import ask_llm
+    from structured import parse_structured
+
+    links = {}
+    for start in range(0, len(ambiguous), LLM_BATCH_SIZE):
+        batch = ambiguous[start:start + LLM_BATCH_SIZE]
+        prompt = {
+            "db_type": db_type,
+            "known_tables": sorted(tables),
+            "endpoints": [
+                {"id": str(index), "method": ep.method, "path": ep.path, "code": (ep.code or "")[:LLM_SNIPPET_CHARS]}
+                for index, ep in enumerate(batch)
+            ],
+        }
+        res = ask_llm("identify_database_usage", str(prompt), use_local=use_local)
+        result, errors, _ = parse_structured("identify_database_usage", res)
+        if errors or not isinstance(result, dict):
+            print(f"[Database] Could not parse LLM answer for batch {start // LLM_BATCH_SIZE}: {errors}")
+            continue
+        if not db_type and result.get("db_type"):
+            db_type = result["db_type"]
+        for index, used in (result.get("endpoints") or {}).items():
+            if index.isdigit() and int(index) < len(batch) and used:
+                links[batch[int(index)].id] = [table for table in used if isinstance(table, str)]
+    return links, db_type
+
+
+def discover_database(service, root_directory=None, use_llm=True, use_local=False):
+    """
+    LLM 없이 설정/엔티티/마이그레이션 파일에서 DB 종류, 테이블, 엔드포인트→테이블 관계를 찾아
+    service.database에 채웁니다. 테이블을 특정할 수 없는 DB 접근 엔드포인트만 LLM에 묶어서 묻습니다.
+    엔드포인트→테이블 엣지는 Database.dependencies에 기록됩니다. 찾은 것이 없으면 None을 반환합니다.
+    """
+    inventory = index_inventory(root_directory or service.root_directory)
+    datasources = scan_datasources(inventory["config"])
+    tables = scan_entities(inventory["entity"])
+    migration_tables, init_sql = scan_migrations(inventory["sql"])
+    for table in migration_tables:
+        tables.setdefault(table, None)
+
+    db_type = next((found[0] for found in datasources if found[0]), None)
+    connection_string = next((found[1] for found in datasources if found[1]), None)
+    links, ambiguous = link_endpoints_to_tables(service, tables)
+    print(f"[Database] type={db_type}, {len(tables)} tables, {len(links)} endpoints linked, "
+          f"{len(ambiguous)} ambiguous")
+
+    if use_llm and ambiguous and (tables or db_type):
+        llm_links, db_type = _ask_llm_for_leftovers(ambiguous, tables, db_type, use_local)
+        for endpoint_id, used in llm_links.items():
+            for table in used:
+                tables.setdefault(table, None)
+            links[endpoint_id] = used
+
+    if not (db_type or tables):
+        return None
+
+    database = model.Database(
+        db_type=db_type or "Unknown",
+        purpose="Discovered from datasource configuration and ORM/migration files",
+        init_sql=init_sql,
+        connection_string=connection_string,
+    )
+    for table in sorted(tables):
+        database.add_table(table)
+    for endpoint_id, used in links.items():
+        for table in used:
+            database.dependencies.add_dependency(endpoint_id, table)
+    service.set_database(database)
+    return database
@@ -0,0 +1,166 @@
+import json
+
+from snapshot import Snapshot, content_hash
+from xref import template_key
+
+
+def _index_service(service):
+    """
+    Service에서 (id, method, template, code_hash, path) 행과 엔드포인트 간 엣지를 만듭니다.
+    키는 LLM이 바꿀 수 있는 path/method가 아니라 코드에서 추출한 경로/메소드로 만듭니다.
+    """
+    rows = []
+    for endpoint in service.endpoints:
+        method, template = template_key(endpoint.source_method, endpoint.source_path)
+        rows.append((endpoint.id, method, template, content_hash(endpoint.code), endpoint.path))
+    edges = [
+        (endpoint.id, dep_id)
+        for endpoint in service.endpoints
+        for dep_id in endpoint.dependencies.get_dependencies(endpoint.id)
+    ]
+    return rows, edges
+
+
+def _index_snapshot(snapshot):
+    """스냅샷에서 코드를 읽지 않고 행과 엣지를 만듭니다."""
+    id_by_row = {}
+    rows = []
+    for row, endpoint_id, method, path, template, code_hash in snapshot.endpoints():
+        id_by_row[row] = endpoint_id
+        rows.append((endpoint_id, method, template, code_hash, path))
+    edges = [(id_by_row[src], id_by_row[dst]) for src, dst in snapshot.edges()]
+    return rows, edges
+
+
+def _index(run):
+    if isinstance(run, Snapshot):
+        return _index_snapshot(run)
+    if isinstance(run, str):
+        with Snapshot(run) as snapshot:
+            return _index_snapshot(snapshot)
+    return _index_service(run)
+
+
+def _assign_keys(rows):
+    """
+    엔드포인트마다 (method, template, n) 키를 붙입니다. n은 같은 템플릿이 여러 번 나올 때의 순번이며,
+    run마다 달라지는 uuid 대신 이 키로 두 run을 비교합니다.
+    """
+    seen = {}
+    keyed = {}
+    for endpoint_id, method, template, code_hash, path in rows:
+        base = (method, template)
+        n = seen.get(base, 0)
+        seen[base] = n + 1
+        keyed[(method, template, n)] = (endpoint_id, code_hash, path)
+    return keyed
+
+
+class RunDiff:
+    """
+    두 run의 엔드포인트/의존성 엣지 차이입니다.
+    paired는 키가 같은 모든 엔드포인트의, matched는 그중 코드가 바뀌지 않은 엔드포인트의 {old id: new id}입니다.
+    """
+
+    def __init__(self):
+        self.added = []
+        self.removed = []
+        self.modified = []
+        self.paired = {}
+        self.matched = {}
+        self.added_edges = []
+        self.removed_edges = []
+
+    def needs_description(self):
+        """새 run에서 다시 설명해야 하는 엔드포인트 id 집합 (추가/변경된 엔드포인트)."""
+        return {item["id"] for item in self.added} | {item["id"] for item in self.modified}
+
+    def to_dict(self):
+        return {
+            "summary": {
+                "added": len(self.added),
+                "removed": len(self.removed),
+                "modified": len(self.modified),
+                "unchanged": len(self.matched),
+                "added_edges": len(self.added_edges),
+                "removed_edges": len(self.removed_edges),
+            },
+            "added": self.added,
+            "removed": self.removed,
+            "modified": self.modified,
+            "edges": {"added": self.added_edges, "removed": self.removed_edges},
+        }
+
+    def write(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2, ensure_ascii=False)
+        return path
+
+
+def diff_runs(old, new):
+    """
+    두 run(Service, Snapshot 또는 스냅샷 경로)을 (method, 경로 템플릿) 키와 코드 해시로 비교합니다.
+    모든 단계가 dict/set 연산이므로 엔드포인트와 엣지 수에 선형입니다.
+    """
+    old_rows, old_edges = _index(old)
+    new_rows, new_edges = _index(new)
+    old_keyed, new_keyed = _assign_keys(old_rows), _assign_keys(new_rows)
+    result = RunDiff()
+
+    key_by_old_id = {}
+    key_by_new_id = {}
+    for key, (new_id, new_hash, path) in new_keyed.items():
+        key_by_new_id[new_id] = key
+        item = {"method": key[0], "path": path, "template": key[1], "id": new_id}
+        if key not in old_keyed:
+            result.added.append(item)
+            continue
+        old_id, old_hash, _ = old_keyed[key]
+        key_by_old_id[old_id] = key
+        result.paired[old_id] = new_id
+        if old_hash != new_hash:
+            result.modified.append({**item, "old_id": old_id})
+        else:
+            result.matched[old_id] = new_id
+    for key, (old_id, _, path) in old_keyed.items():
+        key_by_old_id.setdefault(old_id, key)
+        if key not in new_keyed:
+            result.removed.append({"method": key[0], "path": path, "template": key[1], "id": old_id})
+
+    def edge_keys(edges, key_by_id):
+        return {(key_by_id[src], key_by_id[dst]) for src, dst in edges if src in key_by_id and dst in key_by_id}
+
+    old_edge_keys = edge_keys(old_edges, key_by_old_id)
+    new_edge_keys = edge_keys(new_edges, key_by_new_id)
+
+    def describe_edge(edge):
+        (src_method, src_template, _), (dst_method, dst_template, _) = edge
+        return {"from": f"{src_method} {src_template}", "to": f"{dst_method} {dst_template}"}
+
+    result.added_edges = [describe_edge(edge) for edge in sorted(new_edge_keys - old_edge_keys)]
+    result.removed_edges = [describe_edge(edge) for edge in sorted(old_edge_keys - new_edge_keys)]
+    return result
+
+
+def carry_over(previous, service, run_diff):
+    """
+    바뀌지 않은 엔드포인트에 이전 run(Service)의 설명 결과와 엔드포인트 간 의존성을 옮깁니다.
+    옮긴 엔드포인트 수를 반환합니다.
+    """
+    previous_by_id = {endpoint.id: endpoint for endpoint in previous.endpoints}
+    current_by_id = {endpoint.id: endpoint for endpoint in service.endpoints}
+    for old_id, new_id in run_diff.matched.items():
+        old, new = previous_by_id[old_id], current_by_id[new_id]
+        # 추출된 경로/메소드가 그대로면 LLM이 설명에서 바꾼 경로/메소드도 함께 옮김
+        if (old.source_method, old.source_path) == (new.source_method, new.source_path):
+            new.path = old.path
+            new.method = old.method
+        new.params = old.params
+        new.cookies = old.cookies
+        new.headers = old.headers
+        new.response_type = old.response_type
+        new.description = old.description
+        for dep_id in old.dependencies.get_dependencies(old_id):
+            if dep_id in run_diff.paired:
+                new.dependencies.add_dependency(new_id, run_diff.paired[dep_id])
+    return len(run_diff.matched)
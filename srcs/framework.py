@@ -2,14 +2,21 @@ import os
 import json
 import re
 import sys
-from llm import ask_chatgpt
+from languages import detect_languages, language_of
+from metrics import METRICS
+from structured import parse_structured
+from tokens import PromptTooLarge, count_tokens, current_ledger
 
 import model
 
+# LLM 클라이언트, 클러스터링, DB 탐색, 스냅샷/diff, 그래프 렌더링 모듈은 그 단계를 실행할 때 import합니다.
+# (시각화만 하거나 스냅샷만 읽는 하위 명령은 openai/requests/sqlite 등을 로드하지 않음)
+
 def list_all_dirs(root_dir):
     """Returns a list of all subdirectories and files."""
     all_items = []
     for dirpath, dirnames, filenames in os.walk(root_dir):
+        METRICS.incr("dirs_walked")
         for dirname in dirnames:
             all_items.append(os.path.join(dirpath, dirname))
     return all_items
@@ -18,53 +25,23 @@ def list_all_files(root_dir):
     """Returns a list of all files in all subdirectories."""
     all_items = []
     for dirpath, dirnames, filenames in os.walk(root_dir):
+        METRICS.incr("dirs_walked")
         for filename in filenames:
             all_items.append(os.path.join(dirpath, filename))
     return all_items
 
-def parse_result(res):
-    """ChatGPT의 응답을 파싱하고 JSON 혹은 마크다운 코드 블록을 처리하고, 필요 시 복구합니다."""
-    # 1차: 최상위 JSON 파싱 시도
-    try:
-        parsed0 = json.loads(res)
-    except json.JSONDecodeError:
-        # JSON이 아니면 마크다운 코드 블록 내부 JSON 추출 시도
-        m0 = re.search(r'```json\s*([\s\S]*?)\s*```', res)
-        if m0:
-            inner0 = m0.group(1).strip()
-            try:
-                return json.loads(inner0)
-            except json.JSONDecodeError:
-                return inner0
-        # 그 외 원본 문자열 반환
-        return res.strip()
-
-    # 최상위 JSON 파싱 성공
-    # 'result' 키가 있으면 그 값을 content로 사용
-    if isinstance(parsed0, dict) and "result" in parsed0:
-        result0 = parsed0["result"]
-        # result0이 문자열인 경우 추가 처리
-        if isinstance(result0, str):
-            # 마크다운 코드 블록 처리
-            m1 = re.search(r'```json\s*([\s\S]*?)\s*```', result0)
-            if m1:
-                content = m1.group(1).strip()
-            else:
-                content = result0.strip()
-            # 내부 JSON 파싱 시도
-            try:
-                return json.loads(content)
-            except json.JSONDecodeError:
-                # 복구 로직: 따옴표/공백 정리
-                fixed = content.replace("'", '"').replace("\n", " ").replace("\r", " ").strip()
-                try:
-                    return json.loads(fixed)
-                except Exception:
-                    return content
-        # result0이 dict/list 등 JSON 타입이면 그대로 반환
-        return result0
-    # result 키 없으면 parsed0 반환
-    return parsed0
+def parse_result(res, ask_type=None):
+    """
+    ChatGPT의 응답을 ask_type 스키마(structured.SCHEMAS)에 맞게 한 번에 파싱하고 "result" 값을 반환합니다.
+    마크다운 코드 블록, 앞뒤 설명 텍스트, 잘린 응답은 로컬에서 복구하며, JSON을 찾지 못하면 원본 문자열을 반환합니다.
+    """
+    result, errors, repaired = parse_structured(ask_type, res)
+    if repaired:
+        METRICS.incr("parse_repairs")
+    if errors:
+        METRICS.incr("parse_failures")
+        print(f"[Parse] {ask_type}: {'; '.join(errors[:3])}")
+    return result
 
 def check_path_exists(path):
     """Checks whether a file or directory exists."""
@@ -75,47 +52,57 @@ def check_path_exists(path):
 
 def identify_main_folder(root_directory, use_local=False):
     """identify_main_folder 작업을 수행합니다."""
+    from cascade import ask_llm
     dirs = list_all_dirs(root_directory)
-    res = ask_chatgpt("identify_main_folder", str(dirs), use_local=use_local)
-    return parse_result(res)
+    res = ask_llm("identify_main_folder", str(dirs), use_local=use_local)
+    return parse_result(res, "identify_main_folder")
 
 def identify_main_source(folder_path, temperature=0, use_local=False):
     """identify_main_source 작업을 수행합니다."""
+    from cascade import ask_llm
     files = list_all_files(folder_path)
-    res = ask_chatgpt("identify_main_source", str(files), temperature=temperature, use_local=use_local)
-    return parse_result(res)
+    res = ask_llm("identify_main_source", str(files), temperature=temperature, use_local=use_local)
+    return parse_result(res, "identify_main_source")
 
 def identify_framework(file_path, use_local=False):
     """파일 내용을 읽고 identify_framework 작업을 수행합니다."""
+    from cascade import ask_llm
     if not os.path.exists(file_path):
         raise FileNotFoundError(f"File not found: {file_path}")
     with open(file_path, "r") as file:
         code = file.read()
-    res = ask_chatgpt("identify_framework", code, use_local=use_local)
-    return res
+    METRICS.incr("bytes_read", len(code))
+    res = ask_llm("identify_framework", code, use_local=use_local)
+    return parse_result(res, "identify_framework")
 
 def identify_service_name(folder_path, use_local=False):
     """서비스 이름을 식별합니다."""
+    from cascade import ask_llm
     dirs = list_all_dirs(folder_path)
-    res = ask_chatgpt("identify_service_name", str(dirs), use_local=use_local)
-    return parse_result(res)
+    res = ask_llm("identify_service_name", str(dirs), use_local=use_local)
+    return parse_result(res, "identify_service_name")
 
 def get_endpoint_patterns(file_path, framework, temperature=0, use_local=False):
     """파일 내용을 읽고 엔드포인트 패턴을 식별합니다."""
+    from cascade import ask_llm
     if not os.path.exists(file_path):
         raise FileNotFoundError(f"File not found: {file_path}")
     with open(file_path, "r") as file:
         code = file.read()
+    METRICS.incr("bytes_read", len(code))
     prompt = {
         "file_path": file_path,
         "code": code,
         "framework": framework
     }
     
-    res = ask_chatgpt("how_to_reconginize_endpoint", str(prompt), temperature=temperature, use_local=use_local)
+    res = ask_llm("how_to_reconginize_endpoint", str(prompt), temperature=temperature, use_local=use_local)
     print("ChatGPT response:", res)
     # 파싱 시도
-    patterns = parse_result(res)
+    patterns = parse_result(res, "how_to_reconginize_endpoint")
+    if not isinstance(patterns, dict):
+        print(f"[Warning] Endpoint patterns are not a JSON object, ignoring: {patterns}")
+        patterns = {}
     # 결과가 dict이 아니거나 빈 dict인 경우, Spring 기본 패턴 폴백
     # if not isinstance(patterns, dict) or not patterns:
     #     print(f"[Fallback] Applying built-in endpoint patterns for framework '{framework}'")
@@ -126,64 +113,222 @@ def get_endpoint_patterns(file_path, framework, temperature=0, use_local=False):
     #     }
     return patterns
 
-def get_all_extension_files(root_directory, extensions):
-    """특정 확장자를 가진 모든 파일을 찾습니다."""
-    all_files = []
-    for dirpath, dirnames, filenames in os.walk(root_directory):
-        for filename in filenames:
-            if any(filename.endswith(ext) for ext in extensions):
-                all_files.append(os.path.join(dirpath, filename))
-    return all_files
-
-def validate_regex_patterns(regex_patterns):
-    """정규 표현식 패턴의 유효성을 검사합니다."""
-    valid_patterns = []
-    for pattern in regex_patterns:
-        try:
-            re.compile(pattern)  # 패턴 컴파일 시도
-            valid_patterns.append(pattern)
-        except re.error as e:
-            print(f"Invalid pattern: {pattern} - error: {e}")
-    return valid_patterns
-
-def extract_endpoints(root_directory, extensions, endpoint_patterns):
-    """주어진 디렉토리에서 엔드포인트를 추출합니다."""
-    valid_patterns = {}
+def compile_endpoint_patterns(endpoint_patterns):
+    """메소드별 엔드포인트 패턴을 컴파일합니다. 잘못된 패턴은 건너뜁니다."""
+    compiled = {}
     for method, pattern in endpoint_patterns.items():
         try:
-            re.compile(pattern)  # 패턴 컴파일 시도
-            valid_patterns[method] = pattern
-        except re.error as e:
+            compiled[method] = re.compile(pattern)  # 패턴 컴파일 시도
+        except (re.error, TypeError) as e:
             print(f"Invalid pattern ({method}): {pattern} - error: {e}")
+    return compiled
 
-    if not valid_patterns:
-        print("No valid regex patterns found.")
-        return {}
-
-    all_files = get_all_extension_files(root_directory, extensions)
+def scan_file_endpoints(file_path, compiled_patterns):
+    """파일 하나에서 메소드별로 매칭된 엔드포인트 선언을 찾습니다."""
+    with open(file_path, "r") as file:
+        code = file.read()
+    METRICS.incr("bytes_read", len(code))
+    METRICS.incr("files_scanned")
+    file_endpoints = {}
+    for method, pattern in compiled_patterns.items():
+        # 매칭된 경로만 추출
+        matches = pattern.findall(code)
+        METRICS.incr("regex_matches", len(matches))
+        if matches:
+            file_endpoints.setdefault(method, []).extend(matches)
+    return file_endpoints
+
+def scan_languages(languages):
+    """
+    detect_languages로 찾은 언어들의 파일을 한 번씩만 읽으며, 파일마다 그 언어의 패턴 세트를 적용합니다.
+    디렉토리를 다시 순회하지 않고 언어별 인벤토리를 그대로 사용합니다.
+    """
     endpoints_by_file = {}
-
-    for file_path in all_files:
-        with open(file_path, "r") as file:
-            code = file.read()
-            file_endpoints = {}
-            for method, pattern in valid_patterns.items():
-                # 매칭된 경로만 추출
-                matches = re.findall(pattern, code)
-                if matches:
-                    if method not in file_endpoints:
-                        file_endpoints[method] = []
-                    file_endpoints[method].extend(matches)
-            if file_endpoints:  # 해당 파일에서 엔드포인트가 발견된 경우만 추가
+    for language in languages:
+        valid_patterns = compile_endpoint_patterns(language.patterns)
+        if not valid_patterns:
+            print(f"[Scan] {language.name}: no valid regex patterns")
+            continue
+        for file_path in language.files:
+            file_endpoints = scan_file_endpoints(file_path, valid_patterns)
+            if file_endpoints:
                 endpoints_by_file[file_path] = file_endpoints
-                print(f"Found endpoints in file {file_path}: {file_endpoints}")
-
+                print(f"Found endpoints in file {file_path} ({language.name}): {file_endpoints}")
     return endpoints_by_file
 
-def extract_code_from_endpoint(root_directory, endpoints_by_file):
+# 블록 구조별 언어 분류
+BRACE_BLOCK_EXTENSIONS = {
+    ".java", ".kt", ".kts", ".scala", ".groovy", ".js", ".jsx", ".mjs", ".cjs",
+    ".ts", ".tsx", ".php", ".cs", ".go", ".rs", ".swift", ".c", ".cc", ".cpp",
+}
+INDENT_BLOCK_EXTENSIONS = {".py"}
+
+# describe_endpoint로 전송할 엔드포인트 코드의 최대 토큰 수
+MAX_ENDPOINT_CODE_TOKENS = 1500
+# 의존성 그래프 출력 경로와, 클러스터 렌더러로 전환하는 엔드포인트 수
+GRAPH_HTML_PATH = "dependency_graph.html"
+SCALABLE_GRAPH_THRESHOLD = 500
+# LLM 호출 비용 장부 경로
+COST_LEDGER_PATH = "llm_cost_ledger.json"
+# 실행 리포트 경로
+RUN_REPORT_PATH = "run_report.json"
+PROMETHEUS_TEXTFILE_PATH = "llm_recon.prom"
+# 실행 결과 Service 스냅샷 (snapshot.Snapshot으로 다시 읽을 수 있음)
+SNAPSHOT_PATH = "service_snapshot.db"
+# 설명 없이 스캔만 한 결과 (설명이 있는 스냅샷을 덮어쓰지 않도록 분리)
+SCAN_SNAPSHOT_PATH = "scan_snapshot.db"
+# 이전 실행과의 엔드포인트/의존성 차이
+DIFF_REPORT_PATH = "run_diff.json"
+# 선언부에서 본문 시작까지 탐색할 최대 줄 수
+MAX_BLOCK_HEADER_LINES = 15
+# describe_endpoint 동시 요청 수 (0이면 로컬은 서버 풀의 슬롯 합계, OpenAI는 1)
+DESCRIBE_WORKERS = int(os.environ.get("DESCRIBE_WORKERS", "0"))
+
+def _is_body_brace(line, index):
+    """'{' 가 배열/객체 초기화가 아니라 함수 본문의 시작인지 판단합니다."""
+    prev = line[:index].rstrip()
+    if not prev:
+        return True
+    return prev[-1] not in "=(,[{:?"
+
+def find_brace_block_end(code_lines, start_index):
+    """
+    중괄호 매칭으로 start_index에서 시작하는 핸들러 블록의 끝 줄(exclusive)을 찾습니다.
+    괄호/중괄호의 통합 깊이가 본문 시작 이후 0으로 돌아오는 지점을 블록의 끝으로 봅니다.
+    문자열과 주석 내부의 괄호는 무시하며, 본문을 찾지 못하면 None을 반환합니다.
+    """
+    depth = 0
+    body_started = False
+    in_block_comment = False
+    quote = None
+
+    for line_num in range(start_index, len(code_lines)):
+        if not body_started and line_num - start_index > MAX_BLOCK_HEADER_LINES:
+            return None
+        line = code_lines[line_num]
+        i = 0
+        while i < len(line):
+            ch = line[i]
+            nxt = line[i + 1] if i + 1 < len(line) else ""
+            if in_block_comment:
+                if ch == "*" and nxt == "/":
+                    in_block_comment = False
+                    i += 1
+            elif quote:
+                if ch == "\\":
+                    i += 1
+                elif ch == quote:
+                    quote = None
+            elif ch == "/" and nxt == "/":
+                break
+            elif ch == "#" and not line[:i].strip():
+                # PHP 스타일 주석 (C 전처리기 지시문도 본문 탐색에는 영향이 없음)
+                break
+            elif ch == "/" and nxt == "*":
+                in_block_comment = True
+                i += 1
+            elif ch in "\"'`":
+                quote = ch
+            elif ch in "([":
+                depth += 1
+            elif ch == "{":
+                if not body_started and _is_body_brace(line, i):
+                    body_started = True
+                depth += 1
+            elif ch in ")]}":
+                depth = max(depth - 1, 0)
+                if depth == 0 and body_started:
+                    return line_num + 1
+            i += 1
+        # 템플릿 문자열(`)을 제외한 문자열은 줄 끝에서 닫힌 것으로 간주
+        if quote and quote != "`":
+            quote = None
+    return len(code_lines) if body_started else None
+
+def find_indent_block_end(code_lines, start_index):
+    """
+    들여쓰기로 start_index(데코레이터 또는 def)에서 시작하는 Python 함수 블록의 끝 줄(exclusive)을 찾습니다.
+    def를 찾지 못하면 None을 반환합니다.
+    """
+    def_index = None
+    for line_num in range(start_index, min(len(code_lines), start_index + MAX_BLOCK_HEADER_LINES)):
+        if re.match(r"\s*(async\s+)?def\s", code_lines[line_num]):
+            def_index = line_num
+            break
+    if def_index is None:
+        return None
+
+    def_line = code_lines[def_index]
+    def_indent = len(def_line) - len(def_line.lstrip())
+
+    # 여러 줄에 걸친 시그니처는 ':' 로 끝나는 줄까지를 헤더로 간주
+    body_index = def_index
+    while body_index < len(code_lines) and not code_lines[body_index].split("#", 1)[0].rstrip().endswith(":"):
+        body_index += 1
+
+    end_index = body_index + 1
+    for line_num in range(body_index + 1, len(code_lines)):
+        line = code_lines[line_num]
+        if not line.strip():
+            continue
+        indent = len(line) - len(line.lstrip())
+        if indent <= def_indent:
+            break
+        end_index = line_num + 1
+    return end_index
+
+def find_block_end(code_lines, start_index, file_path):
+    """파일 확장자에 맞는 방식으로 엔드포인트 핸들러 블록의 끝 줄을 찾습니다."""
+    extension = os.path.splitext(file_path)[1].lower()
+    if extension in BRACE_BLOCK_EXTENSIONS:
+        return find_brace_block_end(code_lines, start_index)
+    if extension in INDENT_BLOCK_EXTENSIONS:
+        return find_indent_block_end(code_lines, start_index)
+    return None
+
+def truncate_code(code, max_tokens, file_path=None):
+    """
+    코드가 max_tokens를 넘으면 앞부분(시그니처 포함)과 뒷부분을 남기고 가운데를 생략합니다.
+    앞부분에 예산의 2/3, 뒷부분에 1/3을 배분합니다.
+    """
+    # 공백만 있는 줄을 정리하는 것만으로도 토큰이 줄어듦
+    lines = [line.rstrip() for line in code.splitlines()]
+    lines = [line for i, line in enumerate(lines) if line or (i > 0 and lines[i - 1])]
+    code = "\n".join(lines)
+    if max_tokens is None or count_tokens(code) <= max_tokens:
+        return code
+
+    comment = "#" if file_path and file_path.endswith(".py") else "//"
+    head_budget = max_tokens * 2 // 3
+    tail_budget = max_tokens - head_budget
+
+    head, used = [], 0
+    for line in lines:
+        cost = count_tokens(line + "\n")
+        if used + cost > head_budget:
+            break
+        head.append(line)
+        used += cost
+
+    tail, used = [], 0
+    for line in reversed(lines[len(head):]):
+        cost = count_tokens(line + "\n")
+        if used + cost > tail_budget:
+            break
+        tail.insert(0, line)
+        used += cost
+
+    omitted = len(lines) - len(head) - len(tail)
+    if not head:
+        # 한 줄이 예산보다 큰 경우 (minified 코드 등)
+        return code[:max_tokens * 4] + f"\n{comment} ... truncated ..."
+    return "\n".join(head + [f"{comment} ... {omitted} lines truncated ..."] + tail)
+
+def extract_code_from_endpoint(root_directory, endpoints_by_file, max_tokens=MAX_ENDPOINT_CODE_TOKENS):
     """
     주어진 엔드포인트 정보에 기반해 코드를 추출합니다.
-    추출할 코드의 범위는 현 엔드포인트 선언부부터 다음 선언부 또는 겹치는 선언부까지입니다.
+    추출할 코드의 범위는 현 엔드포인트 선언부부터 핸들러 블록의 끝(중괄호 매칭 또는 들여쓰기 기준)까지이며,
+    블록을 찾지 못하면 다음 선언부 또는 파일 끝까지입니다. 결과는 max_tokens로 잘립니다.
     또한 ALL 메소드는 무시합니다.
     """
     extracted_code_by_file = {}
@@ -195,54 +340,48 @@ def extract_code_from_endpoint(root_directory, endpoints_by_file):
 
         with open(file_path, "r") as file:
             code_lines = file.readlines()
+        METRICS.incr("bytes_read", sum(len(line) for line in code_lines))
 
         extracted_code_by_file[file_path] = {}
 
+        # 모든 엔드포인트 선언부의 시작 위치를 한 번만 계산
+        start_indexes = {}
         for method, endpoint_list in endpoints.items():
             if method == "ALL":  # ALL 메소드는 무시
                 continue
+            for endpoint in endpoint_list:
+                if endpoint in start_indexes:
+                    continue
+                start_indexes[endpoint] = next(
+                    (line_num for line_num, line in enumerate(code_lines) if endpoint in line), None
+                )
+        sorted_starts = sorted(index for index in start_indexes.values() if index is not None)
 
-            extracted_code_by_file[file_path][method] = []
+        for method, endpoint_list in endpoints.items():
+            if method == "ALL":  # ALL 메소드는 무시
+                continue
 
-            # 각 엔드포인트의 선언부와 다음 선언부 사이의 코드 추출
-            for i, endpoint in enumerate(endpoint_list):
-                # 현재 엔드포인트의 시작 위치
-                start_index = None
-                for line_num, line in enumerate(code_lines):
-                    if endpoint in line:
-                        start_index = line_num
-                        break
+            extracted_code_by_file[file_path][method] = []
 
+            for endpoint in endpoint_list:
+                start_index = start_indexes.get(endpoint)
                 if start_index is None:
                     print(f"Endpoint not found: {endpoint}")
                     continue
 
-                # 다음 엔드포인트의 시작 위치를 전체 엔드포인트에서 탐색
-                end_index = len(code_lines)  # 기본적으로 파일 끝까지
-                for other_method, other_endpoint_list in endpoints.items():
-                    if other_method == "ALL":  # ALL 메소드는 무시
-                        continue
+                # 다음 엔드포인트의 시작 위치 (기본적으로 파일 끝까지)
+                end_index = next((index for index in sorted_starts if index > start_index), len(code_lines))
 
-                    for other_endpoint in other_endpoint_list:
-                        if other_endpoint == endpoint:
-                            continue  # 현재 엔드포인트는 건너뜀
-
-                        # 다른 엔드포인트의 시작 위치를 찾음
-                        other_start_index = None
-                        for line_num, line in enumerate(code_lines):
-                            if other_endpoint in line:
-                                other_start_index = line_num
-                                break
-
-                        # 현재 엔드포인트의 끝 범위를 결정
-                        if other_start_index is not None and other_start_index > start_index:
-                            end_index = min(end_index, other_start_index)
+                # 블록 구조를 알 수 있으면 핸들러 본문까지로 제한
+                block_end = find_block_end(code_lines, start_index, file_path)
+                if block_end is not None:
+                    end_index = min(end_index, block_end)
 
                 # 코드 추출
                 extracted_code = "".join(code_lines[start_index:end_index]).strip()
                 extracted_code_by_file[file_path][method].append({
                     "endpoint": endpoint,
-                    "code": extracted_code
+                    "code": truncate_code(extracted_code, max_tokens, file_path)
                 })
 
     return extracted_code_by_file
@@ -304,14 +443,17 @@ def add_endpoint_to_service(service, endpoints_by_file, paths_by_file, endpoints
             if file_path not in paths_by_file or file_path not in endpoints_code_by_file:
                 continue
 
-            for path in paths:
+            for i, path in enumerate(paths):
                 if method not in paths_by_file[file_path]:
                     continue
                 
-                real_path = paths_by_file[file_path][method][0]  # 첫 번째 경로 사용
+                # paths_by_file은 선언부와 같은 순서로 경로를 담고 있음
+                real_path = paths_by_file[file_path][method][i]
 
                 # 엔드포인트 객체 생성
                 endpoint = model.Endpoint(path=real_path, method=method, file_path=file_path)
+                endpoint.language = language_of(file_path)
+                endpoint.framework = service.languages.get(endpoint.language)
                 for code in endpoints_code_by_file[file_path][method]:
                     if code["endpoint"] == path:
                         endpoint.code = code["code"]
@@ -319,20 +461,47 @@ def add_endpoint_to_service(service, endpoints_by_file, paths_by_file, endpoints
                 # Service에 엔드포인트 추가
                 service.add_endpoint(endpoint)
 
-def explain_endpoint(endpoint, use_local=False):
-    """엔드포인트에 대한 설명을 생성합니다."""
+# 스트리밍 중에는 반영하지 않는 필드 (추출된 경로/메소드는 최종 응답으로만 바꿈)
+PARTIAL_UPDATE_EXCLUDED_FIELDS = ("path", "method")
+
+def partial_endpoint_updater(endpoint):
+    """
+    스트리밍 중 완료된 describe_endpoint 필드를 엔드포인트에 바로 반영하는 콜백을 만듭니다.
+    부분 결과에서 아직 받는 중일 수 있는 마지막 객체 값과 경로/메소드는 반영하지 않습니다.
+    """
+    def on_partial(partial):
+        result = partial.get("result") if isinstance(partial, dict) else None
+        desc = result.get("endpoint") if isinstance(result, dict) else None
+        if not isinstance(desc, dict):
+            return
+        fields = {key: value for key, value in desc.items() if key not in PARTIAL_UPDATE_EXCLUDED_FIELDS}
+        last_key = next(reversed(desc), None)
+        if isinstance(desc.get(last_key), dict):
+            fields.pop(last_key, None)
+        update_endpoint(endpoint, fields)
+    return on_partial
+
+def endpoint_prompt(endpoint):
+    """describe_endpoint 프롬프트를 만듭니다."""
+    # 같은 파일의 엔드포인트끼리 공유되는 필드를 앞에, 엔드포인트마다 다른 코드를 마지막에 둠 (프롬프트 캐시 접두사)
     prompt = {
+        "file_path": endpoint.file_path,
         "path": endpoint.path,
         "method": endpoint.method,
-        "file_path": endpoint.file_path,
         "code": endpoint.code
     }
-    res = ask_chatgpt("describe_endpoint", str(prompt), use_local=use_local)
+    return str(prompt)
+
+def explain_endpoint(endpoint, use_local=False, on_partial=None, stream_id="default"):
+    """엔드포인트에 대한 설명을 생성합니다. on_partial은 스트리밍 모드에서 부분 결과를 받습니다."""
+    from cascade import ask_llm
+    res = ask_llm("describe_endpoint", endpoint_prompt(endpoint), use_local=use_local, on_partial=on_partial,
+                  stream_id=stream_id)
     # 파싱 결과 가져오기
-    result = parse_result(res)
+    result = parse_result(res, "describe_endpoint")
     # 'endpoint' 키가 있는 경우 내부 객체 반환
     if isinstance(result, dict) and "endpoint" in result:
-        desc = result["endpoint"]
+        desc = result["endpoint"] or {}
     elif isinstance(result, dict):
         # 이미 사전 형식일 경우 그대로 사용
         desc = result
@@ -342,13 +511,138 @@ def explain_endpoint(endpoint, use_local=False):
         desc = {"description": result}
     return desc
 
-def visualize_dependency_graph(service):
+def describe_endpoints(service, use_local=False, trie=None, workers=DESCRIBE_WORKERS, clusters=None, endpoints=None,
+                       budget=None, on_endpoint=None):
+    """
+    엔드포인트(기본값: 모든 엔드포인트)를 설명하고 결과를 반영합니다.
+    clusters(cluster.cluster_endpoints 결과)가 주어지면 클러스터 대표와 스팟 체크 대상만 LLM으로 설명하고,
+    나머지 멤버는 대표의 설명을 템플릿 치환해 채웁니다.
+    workers가 2 이상이면 엔드포인트마다 별도 stream_id로 동시에 요청합니다.
+    결과는 요청이 끝나는 순서대로 반영되며, 반영될 때마다 on_endpoint(endpoint)가 호출됩니다.
+    LLM 요청은 가치가 높은 엔드포인트부터 보내며, budget(budget.Budget) 한도에 닿으면 남은 엔드포인트는
+    설명하지 않고 pending으로 남깁니다 (description이 None이므로 다음 실행에서 다시 설명됨).
+    pending 엔드포인트 목록을 반환합니다.
+    """
+    import cascade
+    from budget import Budget, endpoint_value, estimate_call, rank_endpoints, run_within_budget
+    from cluster import descriptions_agree, spot_check_sample, templated_description
+    from llm import get_local_pool, reset_stream
+    if workers <= 0:
+        workers = get_local_pool().capacity if use_local or cascade.CASCADE_ENABLED else 1
+    budget = budget or Budget()
+
+    endpoints = service.endpoints if endpoints is None else endpoints
+    value_of = {endpoint.id: endpoint_value(endpoint) for endpoint in endpoints}
+    representative_of = {}
+    spot_checks = set()
+    to_describe = rank_endpoints(endpoints, lambda endpoint: value_of[endpoint.id])
+    if clusters:
+        for group in clusters:
+            for member in group.members:
+                representative_of[member.id] = group.representative
+        # 대표의 설명은 멤버 전체에 쓰이므로 클러스터 전체의 가치로 순위를 매김
+        cluster_value = {
+            group.representative.id: sum(value_of[endpoint.id] for endpoint in [group.representative] + group.members)
+            for group in clusters
+        }
+        sample = spot_check_sample(clusters)
+        spot_checks = {endpoint.id for endpoint in sample}
+        to_describe = (rank_endpoints([group.representative for group in clusters],
+                                      lambda endpoint: cluster_value[endpoint.id])
+                       + rank_endpoints(sample, lambda endpoint: value_of[endpoint.id]))
+
+    def describe(endpoint):
+        stream_id = "default" if workers == 1 else f"describe::{endpoint.id}"
+        try:
+            return explain_endpoint(endpoint, use_local, partial_endpoint_updater(endpoint), stream_id)
+        except PromptTooLarge as e:
+            # 보낼 수 없는 요청은 건너뛰고 엔드포인트를 pending으로 남김
+            print(f"[Tokens] Skipping {endpoint.method} {endpoint.path}: {e}")
+            return None
+        finally:
+            if workers != 1:
+                reset_stream(stream_id)
+
+    def estimate(endpoint):
+        return estimate_call("describe_endpoint", endpoint_prompt(endpoint), use_local)
+
+    members_of = {group.representative.id: group.members for group in clusters} if clusters else {}
+    described = {}
+    applied = set()
+
+    def apply(endpoint, desc):
+        update_endpoint(endpoint, desc)
+        print(f"\n[Description] {endpoint.path}")
+        print(json.dumps(desc, indent=2))
+        update_endpoint_dependencies(service, endpoint, desc.get("dependencies") or [], trie)
+        applied.add(endpoint.id)
+        if on_endpoint:
+            on_endpoint(endpoint)
+
+    def apply_member(member, final=False):
+        # 스팟 체크 대상은 자신의 설명까지 도착해야 반영 (final이면 도착하지 않은 스팟 체크는 건너뜀)
+        representative = representative_of[member.id]
+        if member.id in applied or representative.id not in described:
+            return
+        if member.id in spot_checks and member.id not in described and not final:
+            return
+        desc = templated_description(described[representative.id], representative, member)
+        METRICS.incr("clustered_endpoints")
+        if member.id in described:
+            METRICS.incr("cluster_spot_checks")
+            if not descriptions_agree(desc, described[member.id]):
+                METRICS.incr("cluster_spot_check_mismatches")
+                print(f"[Cluster] Spot check mismatch: {member.method} {member.path} "
+                      f"(representative {representative.method} {representative.path})")
+                desc = described[member.id]
+        apply(member, desc)
+
+    def on_result(index, desc):
+        endpoint = to_describe[index]
+        if desc is None:
+            return
+        described[endpoint.id] = desc
+        if endpoint.id in representative_of:
+            apply_member(endpoint)
+            return
+        apply(endpoint, desc)
+        for member in members_of.get(endpoint.id, []):
+            apply_member(member)
+
+    _, skipped, stop_reason = run_within_budget(describe, to_describe, budget, workers, estimate, on_result)
+    if skipped:
+        print(f"[Budget] {stop_reason} limit reached after {len(described)} LLM descriptions "
+              f"({budget.describe()['spent']}), {len(skipped)} requests not sent")
+
+    pending = []
+    for endpoint in endpoints:
+        if endpoint.id in representative_of:
+            apply_member(endpoint, final=True)
+        if endpoint.id not in applied:
+            pending.append(endpoint)
+
+    METRICS.incr("endpoints_pending", len(pending))
+    for endpoint in pending:
+        print(f"[Pending] {endpoint.method} {endpoint.path} (value {value_of[endpoint.id]:.1f})")
+    return pending
+
+def visualize_dependency_graph(service, output_path=GRAPH_HTML_PATH):
+    """
+    의존성 그래프를 HTML로 저장합니다.
+    엔드포인트가 SCALABLE_GRAPH_THRESHOLD를 넘으면 클러스터/지연 로드 방식의 graph_render를 사용합니다.
+    """
+    from graph_render import render_scalable_graph
+    if len(service.endpoints) > SCALABLE_GRAPH_THRESHOLD:
+        html_path, details_path = render_scalable_graph(service, output_path)
+        print(f"{html_path} generated with collapsed clusters (details: {details_path}).")
+        return
+
     from pyvis.network import Network
-    import os
 
     # 노드와 엣지 초기화
     id_to_label = {}
     id_to_type = {}
+    endpoint_by_id = {endpoint.id: endpoint for endpoint in service.endpoints}
     edges = []
 
     # 서비스 노드 추가
@@ -378,6 +672,20 @@ def visualize_dependency_graph(service):
         for dep_id in endpoint.dependencies.describe().get(endpoint.id, []):
             edges.append((endpoint.id, dep_id))
 
+    # 데이터베이스 및 테이블 노드, 엔드포인트 → 테이블 엣지
+    if service.database:
+        database = service.database
+        id_to_label[database.id] = f"🗄 {database.db_type}"
+        id_to_type[database.id] = "database"
+        edges.append((service.id, database.id))
+        for table in database.tables:
+            id_to_label[f"table::{table}"] = table
+            id_to_type[f"table::{table}"] = "table"
+            edges.append((database.id, f"table::{table}"))
+        for endpoint in service.endpoints:
+            for table in database.dependencies.get_dependencies(endpoint.id):
+                edges.append((endpoint.id, f"table::{table}"))
+
     # 네트워크 생성
     net = Network(height="900px", width="100%", directed=True, notebook=False)
 
@@ -429,7 +737,9 @@ def visualize_dependency_graph(service):
     color_map = {
         "service": "#bbdefb",  # 서비스 노드: 파란색
         "file": "#fff9c4",     # 파일 노드: 노란색
-        "endpoint": "#c8e6c9"  # 엔드포인트 노드: 초록색
+        "endpoint": "#c8e6c9", # 엔드포인트 노드: 초록색
+        "database": "#ffccbc", # 데이터베이스 노드: 주황색
+        "table": "#ffe0b2"     # 테이블 노드: 연주황색
     }
 
     # 노드 추가 (툴팁에 줄바꿈 문자 사용)
@@ -447,8 +757,17 @@ def visualize_dependency_graph(service):
             )
         elif node_type == "file":
             title = f"File: {label}"
+        elif node_type == "database":
+            title = (
+                "Database\n"
+                f"Type: {service.database.db_type}\n"
+                f"Connection: {service.database.connection_string}\n"
+                f"Tables: {len(service.database.tables)}"
+            )
+        elif node_type == "table":
+            title = f"Table: {label}"
         elif node_type == "endpoint":
-            endpoint = next((ep for ep in service.endpoints if ep.id == node_id), None)
+            endpoint = endpoint_by_id.get(node_id)
             if endpoint:
                 desc = getattr(endpoint, 'description', '')
                 if desc:
@@ -477,7 +796,8 @@ def visualize_dependency_graph(service):
             shadow=False,
         )
 
-    for from_id, to_id in edges:
+    # 파일 엣지 중복 제거 (pyvis는 add_edge마다 기존 엣지를 선형 탐색함)
+    for from_id, to_id in dict.fromkeys(edges):
         net.add_edge(
             from_id, to_id,
             color="#90caf9",
@@ -487,13 +807,6 @@ def visualize_dependency_graph(service):
             shadow=False
         )
 
-    net.write_html("dependency_graph.html")
-    
-    # HTML 파일 post-process: 툴팁 스타일 및 자동 줄바꿈 적용
-    html_path = "dependency_graph.html"
-    with open(html_path, "r", encoding="utf-8") as f:
-        html_content = f.read()
-
     custom_css = """
     <style>
     .vis-tooltip {
@@ -507,22 +820,27 @@ def visualize_dependency_graph(service):
     </style>
     """
 
-    html_content = html_content.replace("</head>", custom_css + "\n</head>")
-    with open(html_path, "w", encoding="utf-8") as f:
+    # 툴팁 스타일을 주입한 HTML을 한 번에 저장
+    html_content = net.generate_html(output_path)
+    html_content = html_content.replace("</head>", custom_css + "\n</head>", 1)
+    with open(output_path, "w", encoding="utf-8") as f:
         f.write(html_content)
-    print("dependency_graph.html generated with custom tooltip styling.")
+    print(f"{output_path} generated with custom tooltip styling.")
 
-def lookup_endpoint_id_by_path(service, path):
-    method = path.split(":")[0]
-    path = path.split(":")[1]
-    for endpoint in service.endpoints:
-        if endpoint.method == method and endpoint.path == path:
-            return endpoint.id
-    return None
+def lookup_endpoint_id_by_path(service, path, trie=None):
+    """
+    "METHOD:/path" 형태의 의존성을 엔드포인트 id로 해석합니다.
+    {id}, <int:id>, :id 같은 경로 변수는 RouteTrie로 매칭합니다.
+    """
+    from xref import build_route_trie, parse_dependency
+    method, path = parse_dependency(path)
+    matches = (trie or build_route_trie(service)).match(method, path)
+    return matches[0] if matches else None
     
 def update_endpoint(endpoint, description):
-    endpoint.path = description.get("path", endpoint.path)
-    endpoint.method = description.get("method", endpoint.method)
+    # 스키마 보정으로 채워진 null 값이 추출된 경로/메소드를 덮어쓰지 않도록 함
+    endpoint.path = description.get("path") or endpoint.path
+    endpoint.method = description.get("method") or endpoint.method
     endpoint.cookies = description.get("cookies", endpoint.cookies)
     endpoint.params = description.get("params", endpoint.params)
     endpoint.headers = description.get("headers", endpoint.headers)
@@ -530,49 +848,58 @@ def update_endpoint(endpoint, description):
     endpoint.response_type = description.get("response_type", endpoint.response_type)
     endpoint.description = description.get("description", endpoint.description)
 
-def update_endpoint_dependencies(service, endpoint, dependencies):
+def update_endpoint_dependencies(service, endpoint, dependencies, trie=None):
     """
     엔드포인트의 의존성을 업데이트합니다.
     """
+    from xref import build_route_trie
+    trie = trie or build_route_trie(service)
     for dep in dependencies:
-        method, path = dep.split(":")
-        dep_id = lookup_endpoint_id_by_path(service, dep)
-        if dep_id:
+        if not isinstance(dep, str):
+            continue
+        dep_id = lookup_endpoint_id_by_path(service, dep, trie)
+        if dep_id and dep_id != endpoint.id:
             endpoint.dependencies.add_dependency(endpoint.id, dep_id)
             print(f"[Dependency] {endpoint.method} {endpoint.path} -> {dep}")
 
-def endpoint_patterns_and_extract_endpoints(main_folder, root_directory, main_source, framework_result, extensions, use_local=False):
+def endpoint_patterns_and_extract_endpoints(main_folder, languages, main_language=None, use_local=False):
     """
-    엔드포인트 패턴을 인식하고 엔드포인트 및 경로 정보를 추출합니다.
+    언어별로 엔드포인트 패턴을 인식하고, 모든 언어의 파일을 한 번에 스캔해 엔드포인트 및 경로 정보를 추출합니다.
 
     Parameters:
       main_folder (str): 주요 프로젝트 폴더 경로
-      root_directory (str): 분석할 루트 디렉토리
-      main_source (str): 주요 소스 파일 경로
-      framework_result (str): 식별된 프레임워크 정보
-      extensions (list): 처리할 파일 확장자 리스트
+      languages (dict): detect_languages 결과 {언어: SourceLanguage}
+      main_language (str): main source의 언어 (재시도 시 이 언어는 main source를 다시 식별)
       use_local (bool): LMStudio 사용 여부
 
     Returns:
       tuple: (endpoints_by_file, paths_by_file)
     """
-    patterns = get_endpoint_patterns(main_source, framework_result, use_local=use_local)
-    for method, pattern in patterns.items():
-        print(f"[Pattern] {method}: {pattern}")
+    for language in languages.values():
+        language.patterns = get_endpoint_patterns(language.representative, language.framework, use_local=use_local)
+        for method, pattern in language.patterns.items():
+            print(f"[Pattern] {language.name}/{method}: {pattern}")
 
-    endpoints_by_file = extract_endpoints(root_directory, extensions, patterns)
+    endpoints_by_file = scan_languages(languages.values())
     paths_by_file = parse_path_from_endpoint(endpoints_by_file)
     print("\n[Endpoints] extraction result:")
     print(json.dumps(paths_by_file, indent=2))
 
-    serialized = json.dumps(paths_by_file)
-    if not ('GET' in serialized or 'POST' in serialized):
-        print("[Retry] No GET/POST endpoints found, retrying with temperature=1")
-        main_source = identify_main_source(main_folder, temperature=1, use_local=use_local)
-        framework_result = identify_framework(main_source, use_local=use_local)
-        patterns = get_endpoint_patterns(main_source, framework_result, temperature=1, use_local=use_local)
-        endpoints_by_file = extract_endpoints(root_directory, extensions, patterns)
-        paths_by_file = parse_path_from_endpoint(endpoints_by_file)
+    # 엔드포인트를 하나도 찾지 못한 언어만 temperature=1로 패턴을 다시 묻고 그 언어의 파일만 다시 스캔
+    found = {language_of(file_path) for file_path, paths in paths_by_file.items() if any(paths.values())}
+    missing = [language for language in languages.values() if language.name not in found]
+    if missing:
+        METRICS.incr("retries")
+        for language in missing:
+            print(f"[Retry] No {language.name} endpoints found, retrying with temperature=1")
+            if language.name == main_language:
+                language.representative = identify_main_source(main_folder, temperature=1, use_local=use_local)
+                language.framework = identify_framework(language.representative, use_local=use_local)
+            language.patterns = get_endpoint_patterns(language.representative, language.framework,
+                                                      temperature=1, use_local=use_local)
+        retried = scan_languages(missing)
+        endpoints_by_file.update(retried)
+        paths_by_file.update(parse_path_from_endpoint(retried))
         print("\n[Endpoints] result after retry:")
         print(json.dumps(paths_by_file, indent=2))
 
@@ -588,29 +915,88 @@ def main():
       3. 엔드포인트 패턴 추출 및 처리
       4. 각 엔드포인트 설명 생성
     """
+    import cascade
     # Check for LOCAL argument to use LMStudio
     use_local = False
     if len(sys.argv) > 1 and sys.argv[1].upper() == "LOCAL":
         use_local = True
         print("[Config] LMStudio LOCAL mode enabled: using qwen3-8b-mlx model")
+    # CASCADE: 로컬 모델을 먼저 쓰고 검증에 실패한 요청만 OpenAI로 승격
+    if "CASCADE" in (arg.upper() for arg in sys.argv[1:]):
+        cascade.CASCADE_ENABLED = True
+        print(f"[Config] Cascade enabled: default policy {' -> '.join(cascade.DEFAULT_POLICY)}")
     
-    root_directory = "../target"
+    run_recon("../target", use_local)
 
-    main_folder = identify_main_folder(root_directory, use_local)
+def run_recon(root_directory, use_local=False, output_dir=".", describe=True, visualize=True, budget=None,
+              on_endpoint=None, reports=True):
+    """
+    파이프라인을 실행하고 결과물(스냅샷, 그래프, 리포트)을 output_dir에 저장합니다.
+    output_dir에 이전 실행의 스냅샷이 있으면 바뀐 엔드포인트만 다시 설명합니다.
+    reports=False이면 비용 장부/실행 리포트를 쓰지 않습니다 (여러 실행이 METRICS를 공유하는 daemon용).
+    """
+    from snapshot import Snapshot, SnapshotError, save_snapshot
+    os.makedirs(output_dir, exist_ok=True)
+    snapshot_path = os.path.join(output_dir, SNAPSHOT_PATH if describe else SCAN_SNAPSHOT_PATH)
+    previous_snapshot = None
+    if describe and os.path.exists(snapshot_path):
+        try:
+            previous_snapshot = Snapshot(snapshot_path)
+            print(f"[Snapshot] Comparing against previous run: {snapshot_path}")
+        except SnapshotError as e:
+            print(f"[Snapshot] Ignoring previous snapshot: {e}")
+    try:
+        service = run_pipeline(root_directory, use_local, visualize=visualize, previous_snapshot=previous_snapshot,
+                               describe=describe, output_dir=output_dir, budget=budget, on_endpoint=on_endpoint)
+        if service:
+            save_snapshot(service, snapshot_path)
+            print(f"[Snapshot] {len(service.endpoints)} endpoints -> {snapshot_path}")
+        return service
+    finally:
+        if previous_snapshot is not None:
+            previous_snapshot.close()
+        if reports:
+            write_run_reports(output_dir)
+
+def run_pipeline(root_directory, use_local=False, visualize=True, previous_snapshot=None, describe=True,
+                 output_dir=".", budget=None, on_endpoint=None):
+    """
+    파이프라인의 각 단계를 METRICS 단계 타이머로 감싸 실행하고 Service를 반환합니다.
+    previous_snapshot(snapshot.Snapshot)이 주어지면 추가/변경된 엔드포인트와 이전 실행에서 pending으로 남은
+    엔드포인트만 다시 설명합니다.
+    describe=False이면 엔드포인트 설명(LLM) 없이 스캔/정적 분석까지만 실행합니다.
+    budget(budget.Budget, 기본값: LLM_BUDGET_* 환경 변수)은 실행 전체의 LLM 사용량 한도입니다.
+    on_endpoint(endpoint)는 엔드포인트 설명이 반영될 때마다 호출됩니다.
+    """
+    from budget import Budget
+    from cluster import cluster_endpoints
+    from dbdiscovery import discover_database
+    from diff import carry_over, diff_runs
+    from xref import build_route_trie, link_static_dependencies
+    budget = budget or Budget()
+    with METRICS.stage("identify_main_folder"):
+        main_folder = identify_main_folder(root_directory, use_local)
     if not check_path_exists(main_folder):
-        return
+        return None
     print(f"[Step1] Main folder: {main_folder}")
 
-    main_source = identify_main_source(main_folder, use_local=use_local)
+    with METRICS.stage("identify_main_source"):
+        main_source = identify_main_source(main_folder, use_local=use_local)
     if not check_path_exists(main_source):
-        return
-    extension = main_source.rsplit('.', 1)[-1]
-    extensions = [f".{extension}"]
+        return None
     print(f"[Step2] Main source file: {main_source}")
 
-    framework_result = identify_framework(main_source, use_local)
+    with METRICS.stage("identify_framework"):
+        framework_result = identify_framework(main_source, use_local)
     print(f"[Step3] Framework: {framework_result}")
-    service_name = identify_service_name(main_folder, use_local)
+    # main source의 언어 외에 라우트가 있는 다른 언어도 찾아 같은 스캔에 포함 (polyglot 저장소)
+    with METRICS.stage("detect_languages"):
+        languages = detect_languages(root_directory, main_source, framework_result)
+    METRICS.incr("languages", len(languages))
+    for language in languages.values():
+        print(f"[Language] {language.name}: {language.framework} ({len(language.files)} files)")
+    with METRICS.stage("identify_service_name"):
+        service_name = identify_service_name(main_folder, use_local)
     print(f"[Service] Name: {service_name}")
     service = model.Service(
         name=service_name,
@@ -618,19 +1004,22 @@ def main():
         main_source=main_source,
         framework=framework_result
     )
+    service.languages = {language.name: language.framework for language in languages.values()}
     
     # Retry loop for endpoint extraction
     retry_count = None
     attempts = 0
     while True:
-        endpoints_by_file, paths_by_file = endpoint_patterns_and_extract_endpoints(
-            main_folder, root_directory, main_source, framework_result, extensions, use_local
-        )
+        with METRICS.stage("extract_endpoints"):
+            endpoints_by_file, paths_by_file = endpoint_patterns_and_extract_endpoints(
+                main_folder, languages, language_of(main_source), use_local
+            )
         serialized = json.dumps(paths_by_file)
         # Break if GET or POST endpoints found
         if 'GET' in serialized or 'POST' in serialized:
             break
         attempts += 1
+        METRICS.incr("retries")
         # Break if reached user-defined retry limit
         if retry_count is not None and attempts >= retry_count:
             print(f"[Main] Retry limit reached ({attempts}/{retry_count}), stopping retries.")
@@ -638,27 +1027,88 @@ def main():
         print(f"[Main] No endpoints found, retrying extraction ({attempts}/{retry_count if retry_count is not None else '∞'})")
     
 
-    paths_by_file = concat_endpoint_results(paths_by_file)
-    print("\n[Combined Endpoints]:")
-    print(json.dumps(paths_by_file, indent=2))
-    endpoints_code_by_file = extract_code_from_endpoint(root_directory, endpoints_by_file)
-    print("\n[Endpoint Code]:")
-    print(json.dumps(endpoints_code_by_file, indent=2))
+    with METRICS.stage("extract_code"):
+        paths_by_file = concat_endpoint_results(paths_by_file)
+        print("\n[Combined Endpoints]:")
+        print(json.dumps(paths_by_file, indent=2))
+        endpoints_code_by_file = extract_code_from_endpoint(root_directory, endpoints_by_file)
+        print("\n[Endpoint Code]:")
+        print(json.dumps(endpoints_code_by_file, indent=2))
 
-    add_endpoint_to_service(service, endpoints_by_file, paths_by_file, endpoints_code_by_file)
+    with METRICS.stage("build_service"):
+        add_endpoint_to_service(service, endpoints_by_file, paths_by_file, endpoints_code_by_file)
+    METRICS.incr("endpoints", len(service.endpoints))
     print("\n[Service Endpoints]:")
     print(json.dumps(service.describe(), indent=2))
 
-    for endpoint in service.endpoints:
-        desc = explain_endpoint(endpoint, use_local)
-        update_endpoint(endpoint, desc)
-        print(f"\n[Description] {endpoint.path}")
-        print(json.dumps(desc, indent=2))
-        update_endpoint_dependencies(service, endpoint, desc.get("dependencies", []))
+    # LLM 호출 전에 코드의 링크/리다이렉트/HTTP 호출로 의존성 그래프를 구성
+    with METRICS.stage("xref"):
+        trie = build_route_trie(service)
+        static_edges = link_static_dependencies(service, trie)
+    METRICS.incr("static_dependency_edges", static_edges)
+    print(f"[Xref] {static_edges} static dependency edges")
+
+    # 설정/엔티티/마이그레이션 파일로 DB와 엔드포인트 → 테이블 관계를 구성
+    with METRICS.stage("discover_database"):
+        database = discover_database(service, use_local=use_local)
+    if database:
+        METRICS.incr("database_tables", len(database.tables))
+        print(f"[Database] {database.db_type}: {', '.join(database.tables)}")
+
+    # 이전 run과 비교해 바뀌지 않은 엔드포인트는 이전 설명을 재사용
+    to_describe = service.endpoints
+    if previous_snapshot is not None:
+        with METRICS.stage("diff"):
+            # 여기서는 엔드포인트 단위 차이로 다시 설명할 대상만 고름 (LLM 의존성 엣지는 아직 없음)
+            run_diff = diff_runs(previous_snapshot, service)
+            carried = carry_over(previous_snapshot.load_service(), service, run_diff)
+            pending = run_diff.needs_description()
+            # 예산 때문에 이전 실행에서 설명하지 못한 엔드포인트도 다시 시도
+            to_describe = [endpoint for endpoint in service.endpoints
+                           if endpoint.id in pending or endpoint.description is None]
+        METRICS.incr("endpoints_carried_over", carried)
+
+    if describe:
+        # 엔티티 이름만 다른 핸들러를 묶어 대표만 LLM으로 설명
+        with METRICS.stage("cluster_endpoints"):
+            clusters = cluster_endpoints(to_describe)
+        METRICS.incr("clusters", len(clusters))
+        print(f"[Cluster] {len(to_describe)} endpoints in {len(clusters)} clusters")
+
+        with METRICS.stage("describe_endpoints"):
+            describe_endpoints(service, use_local, trie, clusters=clusters, endpoints=to_describe, budget=budget,
+                               on_endpoint=on_endpoint)
+
+    # 설명과 이전 run에서 옮긴 엣지가 모두 반영된 뒤에 엣지 차이까지 포함한 리포트를 작성
+    if previous_snapshot is not None:
+        with METRICS.stage("diff"):
+            run_diff = diff_runs(previous_snapshot, service)
+        diff_path = run_diff.write(os.path.join(output_dir, DIFF_REPORT_PATH))
+        summary = run_diff.to_dict()["summary"]
+        print(f"[Diff] {summary} -> {diff_path}")
 
     # 시각화
-    visualize_dependency_graph(service)
-
+    if visualize:
+        with METRICS.stage("visualize"):
+            visualize_dependency_graph(service, os.path.join(output_dir, GRAPH_HTML_PATH))
+    return service
+
+def write_run_reports(output_dir="."):
+    """비용 장부, JSON 실행 리포트, Prometheus textfile을 output_dir에 저장합니다."""
+    ledger_path = os.path.join(output_dir, COST_LEDGER_PATH)
+    report_path = os.path.join(output_dir, RUN_REPORT_PATH)
+    prometheus_path = os.path.join(output_dir, PROMETHEUS_TEXTFILE_PATH)
+    ledger = current_ledger().write(ledger_path)
+    total = ledger["summary"]["total"]
+    print(f"[Tokens] {total['calls']} calls, {total['prompt_tokens']} prompt / "
+          f"{total['completion_tokens']} completion / {total['cached_tokens']} cached tokens "
+          f"({total['cached_ratio']:.0%} of prompt), "
+          f"${total['cost_usd']:.4f} -> {ledger_path}")
+
+    report = METRICS.write_json(report_path)
+    METRICS.write_prometheus(prometheus_path)
+    stages = ", ".join(f"{name}={stage['wall_seconds']:.2f}s" for name, stage in report["stages"].items())
+    print(f"[Metrics] {stages} -> {report_path}, {prometheus_path}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,308 @@
+import html
+import json
+import math
+import os
+
+# 레이아웃 간격 (px)
+LEVEL_GAP = 220
+NODE_GAP = 180
+
+# 노드 타입별 색상
+COLOR_MAP = {
+    "service": "#bbdefb",
+    "package": "#e1bee7",
+    "file": "#fff9c4",
+    "endpoint": "#c8e6c9",
+    "database": "#ffccbc",
+    "table": "#ffe0b2",
+}
+
+
+def _package_of(root_directory, file_path):
+    """루트 디렉토리 기준 파일의 상위 디렉토리(패키지)를 반환합니다."""
+    directory = os.path.dirname(file_path or "")
+    try:
+        relative = os.path.relpath(directory, root_directory) if root_directory else directory
+    except ValueError:
+        relative = directory
+    return relative if relative not in ("", ".") else "/"
+
+
+def build_graph_data(service):
+    """
+    Service를 service → package → file → endpoint (와 service → database → table) 트리와
+    엔드포인트 간/엔드포인트 → 테이블 엣지로 변환합니다.
+    노드는 인덱스 기반 배열로, 엣지는 (from, to) 인덱스 쌍으로 표현해 HTML 크기를 줄입니다.
+    """
+    nodes = []
+    index_by_id = {}
+
+    def add_node(node_id, label, node_type, parent):
+        index_by_id[node_id] = len(nodes)
+        nodes.append({"id": node_id, "label": label, "type": node_type, "parent": parent, "children": []})
+        if parent is not None:
+            nodes[parent]["children"].append(index_by_id[node_id])
+        return index_by_id[node_id]
+
+    service_index = add_node(service.id, service.name, "service", None)
+    for endpoint in service.endpoints:
+        package = _package_of(service.root_directory, endpoint.file_path)
+        package_id = f"package::{package}"
+        if package_id not in index_by_id:
+            add_node(package_id, f"📦 {package}", "package", service_index)
+        file_id = f"file::{endpoint.file_path}"
+        if file_id not in index_by_id:
+            add_node(file_id, f"📄 {os.path.basename(endpoint.file_path or '')}", "file", index_by_id[package_id])
+        add_node(endpoint.id, f"{endpoint.method} {endpoint.path}", "endpoint", index_by_id[file_id])
+    database = service.database
+    if database:
+        database_index = add_node(database.id, f"🗄 {database.db_type}", "database", service_index)
+        for table in database.tables:
+            add_node(f"table::{table}", table, "table", database_index)
+
+    edges = []
+    for endpoint in service.endpoints:
+        source = index_by_id[endpoint.id]
+        for dep_id in endpoint.dependencies.get_dependencies(endpoint.id):
+            target = index_by_id.get(dep_id)
+            if target is not None and target != source:
+                edges.append((source, target))
+        if database:
+            for table in database.dependencies.get_dependencies(endpoint.id):
+                target = index_by_id.get(f"table::{table}")
+                if target is not None:
+                    edges.append((source, target))
+    return nodes, edges
+
+
+def compute_layout(nodes):
+    """
+    서버 측에서 겹치지 않는 계층 레이아웃을 계산합니다 (O(N)).
+    엔드포인트는 파일 아래에 정사각형 격자로, 그 외 노드는 자식 서브트리 폭의 가운데에 놓입니다.
+    """
+    width = [0.0] * len(nodes)
+    # 자식이 부모보다 항상 뒤에 추가되므로 역순으로 서브트리 폭 계산
+    for index in range(len(nodes) - 1, -1, -1):
+        node = nodes[index]
+        children = node["children"]
+        if node["type"] == "file":
+            columns = max(1, math.ceil(math.sqrt(len(children))))
+            width[index] = columns * NODE_GAP
+        elif children:
+            width[index] = sum(width[child] for child in children)
+        else:
+            width[index] = NODE_GAP
+
+    positions = [(0.0, 0.0)] * len(nodes)
+    level = {"service": 0, "package": 1, "file": 2, "endpoint": 3, "database": 1, "table": 2}
+    stack = [(0, -width[0] / 2)] if nodes else []
+    while stack:
+        index, left = stack.pop()
+        node = nodes[index]
+        positions[index] = (left + width[index] / 2, level[node["type"]] * LEVEL_GAP)
+        if node["type"] == "file":
+            columns = max(1, math.ceil(math.sqrt(len(node["children"]))))
+            for position, child in enumerate(node["children"]):
+                row, column = divmod(position, columns)
+                positions[child] = (left + (column + 0.5) * NODE_GAP, (3 + row * 0.5) * LEVEL_GAP)
+            continue
+        offset = left
+        for child in node["children"]:
+            stack.append((child, offset))
+            offset += width[child]
+    return positions
+
+
+def build_details(service):
+    """클릭 시 지연 로드되는 엔드포인트 상세 정보를 만듭니다."""
+    details = {
+        service.id: {
+            "Service": service.name,
+            "Root Directory": service.root_directory,
+            "Main Source": service.main_source,
+            "Framework": service.framework,
+            "Endpoints": len(service.endpoints),
+        }
+    }
+    if service.database:
+        details[service.database.id] = {
+            "Database": service.database.db_type,
+            "Connection": service.database.connection_string,
+            "Tables": len(service.database.tables),
+        }
+    for endpoint in service.endpoints:
+        description = endpoint.description or ""
+        if isinstance(description, str):
+            description = description.replace("<br>", "\n")
+        details[endpoint.id] = {
+            "Path": endpoint.path,
+            "Method": endpoint.method,
+            "File": endpoint.file_path,
+            "Params": endpoint.params,
+            "Headers": endpoint.headers,
+            "Cookies": endpoint.cookies,
+            "Response": endpoint.response_type,
+            "Description": description,
+        }
+    return details
+
+
+def render_scalable_graph(service, output_path="dependency_graph.html"):
+    """
+    수천 개 엔드포인트를 위한 HTML을 한 번에 씁니다.
+    레이아웃은 미리 계산되고, package/file 클러스터는 접힌 상태로 시작해 클릭 시 펼쳐지며,
+    노드 상세 정보는 클릭 시 사이드카 파일(<output>.details.js)에서 지연 로드됩니다.
+    file:// 로 열어도 동작하도록 사이드카는 JSON을 담은 스크립트 형태입니다.
+    """
+    nodes, edges = build_graph_data(service)
+    positions = compute_layout(nodes)
+    details_path = os.path.splitext(output_path)[0] + ".details.js"
+
+    data = {
+        "nodes": [
+            [node["id"], node["label"], node["type"], -1 if node["parent"] is None else node["parent"],
+             round(x), round(y)]
+            for node, (x, y) in zip(nodes, positions)
+        ],
+        "edges": edges,
+        "colors": COLOR_MAP,
+        "details": os.path.basename(details_path),
+    }
+    with open(details_path, "w", encoding="utf-8") as f:
+        f.write("window.__graphDetailsLoaded(")
+        json.dump(build_details(service), f, ensure_ascii=False, separators=(",", ":"))
+        f.write(");\n")
+
+    # </script> 조기 종료 방지
+    payload = json.dumps(data, ensure_ascii=False, separators=(",", ":")).replace("</", "<\\/")
+    with open(output_path, "w", encoding="utf-8") as f:
+        # 서비스 이름은 LLM 응답이므로 이스케이프하고, 이름에 자리표시자가 있어도 데이터가 섞이지 않도록 데이터를 먼저 채움
+        title = html.escape(str(service.name or "Dependency Graph"))
+        f.write(HTML_TEMPLATE.replace("__GRAPH_DATA__", payload, 1).replace("<title>__TITLE__</title>",
+                                                                           f"<title>{title}</title>", 1))
+    return output_path, details_path
+
+
+HTML_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>__TITLE__</title>
+<script src="https://unpkg.com/vis-network@9.1.9/standalone/umd/vis-network.min.js"></script>
+<style>
+body { margin: 0; font-family: "Segoe UI", sans-serif; }
+#graph { position: absolute; top: 0; bottom: 0; left: 0; right: 380px; }
+#panel { position: absolute; top: 0; bottom: 0; right: 0; width: 360px; padding: 10px; overflow: auto;
+         border-left: 1px solid #ddd; background: #fafafa; white-space: pre-line; word-break: break-all; font-size: 14px; }
+#panel b { display: inline-block; min-width: 90px; }
+</style>
+</head>
+<body>
+<div id="graph"></div>
+<div id="panel">Click a package or file to expand it, click an endpoint for details.</div>
+<script>
+const DATA = __GRAPH_DATA__;
+const N = DATA.nodes.length;
+const children = Array.from({length: N}, () => []);
+DATA.nodes.forEach((n, i) => { if (n[3] >= 0) children[n[3]].push(i); });
+const expanded = new Uint8Array(N);
+expanded[0] = 1;
+// 패키지가 하나뿐이면 바로 펼침
+if (children[0] && children[0].length === 1) expanded[children[0][0]] = 1;
+
+function isVisible(i) {
+  for (let p = DATA.nodes[i][3]; p >= 0; p = DATA.nodes[p][3]) if (!expanded[p]) return false;
+  return true;
+}
+function representative(i) {
+  // 접힌 조상 중 가장 바깥쪽 노드를 대표 노드로 사용
+  let rep = i;
+  for (let p = DATA.nodes[i][3]; p >= 0; p = DATA.nodes[p][3]) if (!expanded[p]) rep = p;
+  return rep;
+}
+function toVisNode(i) {
+  const n = DATA.nodes[i];
+  const collapsed = children[i].length && !expanded[i];
+  return {
+    id: i, x: n[4], y: n[5], fixed: true,
+    label: collapsed ? n[1] + " (" + children[i].length + ")" : n[1],
+    color: DATA.colors[n[2]] || "#e0e0e0",
+    shape: n[2] === "endpoint" ? "ellipse" : "box",
+    font: {size: 22, color: "#222222"}, borderWidth: collapsed ? 3 : 2
+  };
+}
+function visibleEdges() {
+  const edges = new Map();
+  for (let i = 1; i < N; i++) {
+    if (isVisible(i)) edges.set(DATA.nodes[i][3] + ">" + i, {from: DATA.nodes[i][3], to: i, color: "#90caf9", width: 2});
+  }
+  for (const [a, b] of DATA.edges) {
+    const from = representative(a), to = representative(b);
+    if (from === to) continue;
+    const key = from + "~" + to;
+    const edge = edges.get(key);
+    if (edge) edge.width = Math.min(edge.width + 1, 12);
+    else edges.set(key, {from: from, to: to, color: "#ff9800", width: 1.5, dashes: true});
+  }
+  return Array.from(edges.values(), (e, k) => Object.assign(e, {id: k, arrows: "to"}));
+}
+
+const nodes = new vis.DataSet();
+const edges = new vis.DataSet();
+function refresh() {
+  const visible = [];
+  for (let i = 0; i < N; i++) if (isVisible(i)) visible.push(i);
+  const ids = new Set(visible);
+  nodes.remove(nodes.getIds().filter(id => !ids.has(id)));
+  nodes.update(visible.map(toVisNode));
+  edges.clear();
+  edges.add(visibleEdges());
+}
+refresh();
+const network = new vis.Network(document.getElementById("graph"), {nodes, edges}, {
+  physics: {enabled: false},
+  interaction: {hover: true, navigationButtons: true},
+  edges: {smooth: false}
+});
+
+let details = null, pending = [];
+window.__graphDetailsLoaded = function (d) { details = d; pending.forEach(f => f()); pending = []; };
+function withDetails(f) {
+  if (details) return f();
+  pending.push(f);
+  if (pending.length === 1) {
+    const s = document.createElement("script");
+    s.src = DATA.details;
+    document.body.appendChild(s);
+  }
+}
+function showDetails(i) {
+  const id = DATA.nodes[i][0];
+  withDetails(() => {
+    const d = details[id] || {};
+    const panel = document.getElementById("panel");
+    panel.textContent = "";
+    for (const [k, v] of Object.entries(d)) {
+      const row = document.createElement("div");
+      const key = document.createElement("b");
+      key.textContent = k;
+      row.appendChild(key);
+      row.appendChild(document.createTextNode(" " + (typeof v === "string" ? v : JSON.stringify(v))));
+      panel.appendChild(row);
+    }
+  });
+}
+network.on("click", params => {
+  if (!params.nodes.length) return;
+  const i = params.nodes[0];
+  if (children[i].length && i !== 0) {
+    expanded[i] = expanded[i] ? 0 : 1;
+    refresh();
+  } else {
+    showDetails(i);
+  }
+});
+</script>
+</body>
+</html>
+"""
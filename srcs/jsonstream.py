@@ -0,0 +1,131 @@
+import json
+
+_CLOSERS = {"{": "}", "[": "]"}
+
+
+class IncrementalJSONScanner:
+    """
+    스트리밍 응답 조각을 받아 최상위 JSON 객체가 닫히는 시점을 찾습니다.
+    객체 앞의 텍스트(마크다운 펜스 등)는 건너뛰고, 문자열 내부의 괄호는 무시합니다.
+    각 조각은 한 번만 스캔하므로 전체 비용은 응답 길이에 선형입니다.
+    """
+
+    def __init__(self):
+        self.chunks = []
+        self.length = 0
+        self.stack = []
+        # 열린 컨테이너마다 지금 받고 있는 (미완료) 멤버의 시작 위치
+        self.member_starts = []
+        self.in_string = False
+        self.escape = False
+        self.start = None
+        self.end = None
+        # 값 하나가 끝날 때마다(',' '}' ']') 증가하며, 부분 결과 갱신 시점으로 사용
+        self.events = 0
+
+    @property
+    def complete(self):
+        return self.end is not None
+
+    @property
+    def raw(self):
+        """지금까지 받은 전체 텍스트입니다."""
+        return "".join(self.chunks)
+
+    @property
+    def text(self):
+        """최상위 JSON 객체 텍스트입니다 (완료 전에는 지금까지 받은 부분)."""
+        if self.start is None:
+            return ""
+        raw = self.raw
+        return raw[self.start:self.end] if self.end is not None else raw[self.start:]
+
+    def feed(self, chunk):
+        """조각을 추가하고 최상위 객체가 완료되었으면 True를 반환합니다."""
+        if self.complete or not chunk:
+            return self.complete
+        offset = self.length
+        self.chunks.append(chunk)
+        self.length += len(chunk)
+
+        for i, ch in enumerate(chunk):
+            if self.start is None:
+                if ch == "{":
+                    self.start = offset + i
+                    self.stack.append(ch)
+                    self.member_starts.append(offset + i + 1)
+                continue
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif ch == "\\":
+                    self.escape = True
+                elif ch == '"':
+                    self.in_string = False
+                continue
+            if ch == '"':
+                self.in_string = True
+            elif ch in _CLOSERS:
+                self.stack.append(ch)
+                self.member_starts.append(offset + i + 1)
+            elif ch in "}]":
+                if self.stack:
+                    self.stack.pop()
+                    self.member_starts.pop()
+                if self.member_starts:
+                    # 닫힌 컨테이너로 부모의 현재 멤버가 완료됨
+                    self.member_starts[-1] = offset + i + 1
+                self.events += 1
+                if not self.stack:
+                    self.end = offset + i + 1
+                    return True
+            elif ch == ",":
+                if self.member_starts:
+                    self.member_starts[-1] = offset + i + 1
+                self.events += 1
+        return False
+
+    def partial(self, complete_only=False):
+        """
+        아직 완료되지 않은 객체를 임시로 닫아 파싱한 부분 결과를 반환합니다.
+        파싱할 수 없으면 None을 반환합니다.
+        complete_only이면 완료된 멤버만 남깁니다: 문자열/숫자/배열은 닫힌 뒤에만 나타나고,
+        받는 중인 객체는 그때까지 완료된 멤버만 가진 채로 포함됩니다.
+        """
+        text = self.text
+        if not text:
+            return None
+        if self.complete:
+            try:
+                return json.loads(text)
+            except json.JSONDecodeError:
+                return None
+        if complete_only:
+            return self._complete_members()
+        if self.in_string:
+            text += "\\" if self.escape else ""
+            text += '"'
+        text = text.rstrip()
+        if text.endswith(","):
+            text = text[:-1]
+        elif text.endswith(":"):
+            text += "null"
+        closing = "".join(_CLOSERS[opener] for opener in reversed(self.stack))
+        try:
+            return json.loads(text + closing)
+        except json.JSONDecodeError:
+            return None
+
+    def _complete_members(self):
+        # 바깥부터 받는 중인 멤버가 객체인 동안만 따라 들어가고, 그 밖의 미완료 멤버(값, 배열)에서 잘라냄
+        level = 0
+        while level + 1 < len(self.stack) and self.stack[level + 1] == "{":
+            level += 1
+        text = self.raw[self.start:self.member_starts[level]].rstrip()
+        if text.endswith(","):
+            text = text[:-1]
+        closing = "".join(_CLOSERS[opener] for opener in reversed(self.stack[:level + 1]))
+        try:
+            return json.loads(text + closing)
+        except json.JSONDecodeError:
+            return None
@@ -0,0 +1,177 @@
+import os
+import re
+
+from metrics import METRICS
+
+# 확장자별 언어
+EXTENSION_LANGUAGES = {
+    ".java": "java", ".kt": "kotlin", ".kts": "kotlin", ".scala": "scala", ".groovy": "groovy",
+    ".js": "javascript", ".jsx": "javascript", ".mjs": "javascript", ".cjs": "javascript",
+    ".ts": "typescript", ".tsx": "typescript",
+    ".py": "python", ".php": "php", ".rb": "ruby", ".go": "go", ".cs": "csharp", ".rs": "rust",
+}
+# 탐색하지 않을 디렉토리 (VCS/의존성)
+SKIP_DIRS = {".git", "node_modules", "__pycache__", ".venv", "venv"}
+# 빌드 결과물일 수 있는 디렉토리. 같은 언어의 소스가 다른 곳에 있을 때만 그 언어의 파일에서 제외합니다
+# (dist/나 build/ 아래에 소스를 두는 저장소도 있음).
+BUILD_DIRS = {"target", "build", "dist", "vendor"}
+# 언어마다 라우트 표식을 찾기 위해 읽는 최대 파일 수와 파일 크기
+MAX_SNIFF_FILES = 200
+MAX_SNIFF_FILE_BYTES = 512 * 1024
+# 라우트가 있을 가능성이 높은 파일 이름 (먼저 읽음)
+_ROUTE_FILE_HINT = re.compile(r"controller|route|router|view|api|handler|endpoint|resource|server|app|urls",
+                              re.IGNORECASE)
+
+# 언어별 (프레임워크, 라우트 선언 표식). 앞의 항목이 우선합니다.
+FRAMEWORK_MARKERS = {
+    "java": [
+        ("Spring", re.compile(r"@(?:RestController|Controller|RequestMapping|GetMapping|PostMapping)\b")),
+        ("JAX-RS", re.compile(r"@Path\s*\(")),
+    ],
+    "kotlin": [
+        ("Spring", re.compile(r"@(?:RestController|Controller|RequestMapping|GetMapping|PostMapping)\b")),
+        ("Ktor", re.compile(r"\brouting\s*\{|\b(?:get|post)\s*\(\s*\"/")),
+    ],
+    "javascript": [
+        ("NestJS", re.compile(r"@(?:Controller|Get|Post|Put|Delete)\s*\(")),
+        ("Express", re.compile(r"\b(?:router|app|api)\.(?:get|post|put|patch|delete|all)\s*\(\s*['\"`]/")),
+    ],
+    "typescript": [
+        ("NestJS", re.compile(r"@(?:Controller|Get|Post|Put|Delete)\s*\(")),
+        ("Express", re.compile(r"\b(?:router|app|api)\.(?:get|post|put|patch|delete|all)\s*\(\s*['\"`]/")),
+    ],
+    "python": [
+        ("FastAPI", re.compile(r"@\w+\.(?:get|post|put|patch|delete)\s*\(\s*['\"]/")),
+        ("Flask", re.compile(r"@\w+\.route\s*\(")),
+        ("Django", re.compile(r"\b(?:re_)?path\s*\(\s*r?['\"]")),
+    ],
+    "php": [
+        ("Laravel", re.compile(r"Route::(?:get|post|put|patch|delete|any|match|resource)\s*\(")),
+        ("Symfony", re.compile(r"#\[Route\(|@Route\(")),
+    ],
+    "ruby": [
+        ("Rails", re.compile(r"^\s*(?:get|post|put|patch|delete|resources?)\s+['\":]", re.MULTILINE)),
+    ],
+    "go": [
+        ("Gin", re.compile(r"\.(?:GET|POST|PUT|PATCH|DELETE|Any)\s*\(\s*\"/")),
+        ("net/http", re.compile(r"\bHandleFunc\s*\(\s*\"/")),
+    ],
+    "csharp": [
+        ("ASP.NET", re.compile(r"\[(?:Http(?:Get|Post|Put|Patch|Delete)|Route)\b|\.Map(?:Get|Post|Put|Delete)\s*\(")),
+    ],
+    "rust": [
+        ("Actix", re.compile(r"#\[(?:get|post|put|patch|delete)\s*\(\s*\"/")),
+        ("Axum", re.compile(r"\.route\s*\(\s*\"/")),
+    ],
+}
+
+
+def language_of(file_path):
+    """파일 확장자로 언어 이름을 정합니다. 모르는 확장자는 확장자 자체를 언어 이름으로 씁니다."""
+    extension = os.path.splitext(file_path or "")[1].lower()
+    if not extension:
+        return None
+    return EXTENSION_LANGUAGES.get(extension, extension[1:])
+
+
+class SourceLanguage:
+    """저장소에서 발견된 언어 하나: 소스 파일, 프레임워크, 엔드포인트 패턴 인식에 쓸 대표 파일."""
+
+    def __init__(self, name):
+        self.name = name
+        self.files = []
+        self.framework = None
+        self.representative = None
+        self.marker_hits = 0
+        self.patterns = {}
+
+    def describe(self):
+        return {
+            "language": self.name,
+            "framework": self.framework,
+            "files": len(self.files),
+            "representative": self.representative,
+            "marker_hits": self.marker_hits,
+        }
+
+
+def index_sources(root_directory, extra_extensions=()):
+    """
+    디렉토리를 한 번 순회하며 소스 파일을 언어별로 분류합니다.
+    EXTENSION_LANGUAGES에 없는 확장자는 extra_extensions에 있을 때만 포함합니다.
+    BUILD_DIRS 아래의 파일은 그 언어의 파일이 BUILD_DIRS 밖에 하나도 없을 때만 포함합니다.
+    """
+    extra = {extension.lower() for extension in extra_extensions}
+    languages = {}
+    built = {}
+    for dirpath, dirnames, filenames in os.walk(root_directory):
+        METRICS.incr("dirs_walked")
+        dirnames[:] = [d for d in dirnames if d not in SKIP_DIRS]
+        relative = os.path.relpath(dirpath, root_directory)
+        in_build_dir = any(part in BUILD_DIRS for part in relative.split(os.sep))
+        for filename in filenames:
+            extension = os.path.splitext(filename)[1].lower()
+            if extension not in EXTENSION_LANGUAGES and extension not in extra:
+                continue
+            name = language_of(filename)
+            files = built if in_build_dir else languages
+            files.setdefault(name, SourceLanguage(name)).files.append(os.path.join(dirpath, filename))
+    for name, language in built.items():
+        languages.setdefault(name, language)
+    return languages
+
+
+def _read(path):
+    try:
+        if os.path.getsize(path) > MAX_SNIFF_FILE_BYTES:
+            return ""
+        with open(path, "r", encoding="utf-8", errors="ignore") as f:
+            code = f.read()
+    except OSError:
+        return ""
+    METRICS.incr("bytes_read", len(code))
+    return code
+
+
+def sniff_framework(language, max_files=MAX_SNIFF_FILES):
+    """
+    라우트 표식이 가장 많은 파일을 대표 파일로, 그 표식의 프레임워크를 언어의 프레임워크로 정합니다.
+    라우트가 있을 법한 이름의 파일부터 최대 max_files개를 읽습니다. 표식이 없으면 framework는 None입니다.
+    """
+    markers = FRAMEWORK_MARKERS.get(language.name, [])
+    if not markers:
+        return language
+    files = sorted(language.files, key=lambda path: not _ROUTE_FILE_HINT.search(os.path.basename(path)))
+    best_hits = 0
+    for file_path in files[:max_files]:
+        code = _read(file_path)
+        for framework, marker in markers:
+            hits = len(marker.findall(code))
+            if hits > best_hits:
+                best_hits = hits
+                language.framework, language.representative = framework, file_path
+            if hits:
+                break
+    language.marker_hits = best_hits
+    return language
+
+
+def detect_languages(root_directory, main_source=None, main_framework=None):
+    """
+    저장소의 언어와 언어별 프레임워크를 찾습니다. {언어: SourceLanguage}를 반환합니다.
+    main_source의 언어는 LLM이 식별한 main_framework와 main_source를 그대로 쓰고,
+    나머지 언어는 라우트 표식이 있는 경우에만 포함합니다 (빌드 스크립트, 프론트엔드 코드 등 제외).
+    """
+    main_language = language_of(main_source) if main_source else None
+    extra = [os.path.splitext(main_source)[1]] if main_language else []
+    detected = {}
+    for name, language in index_sources(root_directory, extra).items():
+        if name == main_language:
+            language.framework = main_framework
+            language.representative = main_source
+            detected[name] = language
+            continue
+        sniff_framework(language)
+        if language.framework:
+            detected[name] = language
+    return detected
@@ -1,7 +1,16 @@
+import atexit
+import contextvars
 import os
-import requests
+import threading
+import time
+from contextlib import contextmanager
 import json
-from openai import OpenAI
+from backend_pool import BackendPool, parse_server_list
+from cassette import Cassette, request_key
+from jsonstream import IncrementalJSONScanner
+from metrics import METRICS
+from structured import response_format
+from tokens import PromptTooLarge, count_message_tokens, current_ledger, count_tokens, fit_messages_to_budget, get_budget
 
 LLM_ASK_QUERY_TYPE = {
     "identify_main_folder": '''Your task is to identify and return ONLY ONE path to the folder that most likely contains the main "SOURCE" code of the web service (e.g., *.py, *.java, *.php, etc.). Analyze the provided list of subdirectories and exclude irrelevant folders such as `BOOT-INF/` or other auxiliary directories. Provide your answer in the specified format.''',
@@ -70,6 +79,23 @@ LLM_ASK_QUERY_TYPE = {
 - Do not include any additional text, explanations, or comments outside the JSON structure.
 - If no endpoints are found, return: `{"result": {"endpoint": null}}`.
 '''
+,
+    "identify_database_usage": '''Your task is to determine which database tables each endpoint uses. The user prompt contains the detected database type (may be null), the list of known tables, and a batch of endpoints with an "id", "method", "path" and source "code". Follow these rules:
+1. For each endpoint, list the tables it reads or writes. Prefer names from the known tables; add a new table name only if the code clearly uses it.
+2. If an endpoint does not touch the database, use an empty array.
+3. If the database type is null, guess it from the code (e.g., MySQL, PostgreSQL, SQLite, MongoDB) or use null.
+4. Use the endpoint "id" values exactly as given as keys.
+
+**Response Format**:
+{
+    "result": {
+        "db_type": "MySQL",
+        "endpoints": {"0": ["users"], "1": []}
+    }
+}
+
+Do not include any additional text, explanations, or comments outside the JSON structure.
+'''
 }
 
 SYSTEM_PROMPT_HEADER = '''You are a highly capable AI assistant specializing in information security and software analysis. Your primary task is to assist in the reconnaissance and analysis of authorized web services. You will follow the user's instructions step by step and provide precise, actionable, and concise responses.
@@ -77,10 +103,31 @@ You must respond deterministically. For the same input, your response must alway
 '''
 SYSTEM_PROMPT_FOOTER = '''Your response must strictly follow this format: {"result":"your_answer"}. Do not include any additional text or explanations outside this format.'''
 
-# LMStudio API settings
+# LMStudio API settings (overridable via environment, e.g. to point at bench's mock server)
 #LMSTUDIO_API_URL = "http://localhost:1234/v1/chat/completions"
-LMSTUDIO_API_URL = "http://localhost:1234/v1/chat/completions"
-LMSTUDIO_MODEL = "qwen3-8b"  # Default model name (changed to qwen3-8b-mlx for LOCAL)
+LMSTUDIO_API_URL = os.environ.get("LMSTUDIO_API_URL", "http://localhost:1234/v1/chat/completions")
+LMSTUDIO_MODEL = os.environ.get("LMSTUDIO_MODEL", "qwen3-8b")  # Default model name (changed to qwen3-8b-mlx for LOCAL)
+
+# Several local servers, load-balanced with failover (LMSTUDIO_API_URLS="url#slots,url#slots"; see backend_pool)
+LMSTUDIO_API_URLS = os.environ.get("LMSTUDIO_API_URLS", "")
+LMSTUDIO_TIMEOUT = float(os.environ.get("LMSTUDIO_TIMEOUT", "300"))
+_LOCAL_POOL = None
+_LOCAL_POOL_SOURCE = None
+
+# Stream completions and stop at the end of the top-level JSON object (LLM_STREAM=1)
+STREAM_RESPONSES = os.environ.get("LLM_STREAM", "0") == "1"
+
+# Ask types sent without history as [static system prompt, variable user prompt], so every call shares
+# a byte-identical prefix that provider prompt caches and local KV caches can reuse
+STATELESS_ASK_TYPES = {"describe_endpoint", "identify_database_usage"}
+
+# Requests sharing a prompt_cache_key are routed to the same OpenAI cache shard ("<prefix>:<ask_type>")
+PROMPT_CACHE_KEY_PREFIX = "llm-recon"
+# Ask llama.cpp server to reuse the KV cache of the common prefix (ignored by servers that don't know it)
+LMSTUDIO_CACHE_PROMPT = os.environ.get("LMSTUDIO_CACHE_PROMPT", "1") == "1"
+
+# Backends that get a JSON-schema response_format per ask_type (LLM_STRUCTURED_OUTPUT=openai,local)
+STRUCTURED_OUTPUT_BACKENDS = set(filter(None, os.environ.get("LLM_STRUCTURED_OUTPUT", "openai").split(",")))
 
 def get_openai_api_key():
     """Reads the OpenAI API key from a file or environment variable."""
@@ -94,7 +141,30 @@ def create_openai_client():
     api_key = get_openai_api_key()
     if not api_key:
         raise ValueError("OpenAI API key not found. Ensure 'openai_key' file or environment variable is set.")
-    return OpenAI(api_key=api_key)
+    # Imported on first use: the openai SDK takes hundreds of ms to import and offline commands never need it
+    from openai import OpenAI
+    # OPENAI_BASE_URL lets runs target any OpenAI-compatible server (e.g. bench's mock server)
+    return OpenAI(api_key=api_key, base_url=os.environ.get("OPENAI_BASE_URL"))
+
+# Clients reused across calls (and across jobs in the daemon); building one costs tens of ms
+_OPENAI_CLIENTS = {}
+_HTTP = threading.local()
+_CLIENT_LOCK = threading.Lock()
+
+def get_openai_client():
+    """Returns a shared OpenAI client for the current API key/base URL (the SDK client is thread-safe)."""
+    key = (get_openai_api_key(), os.environ.get("OPENAI_BASE_URL"))
+    with _CLIENT_LOCK:
+        if key not in _OPENAI_CLIENTS:
+            _OPENAI_CLIENTS[key] = create_openai_client()
+        return _OPENAI_CLIENTS[key]
+
+def _http_session():
+    """Returns this thread's keep-alive requests.Session for local servers."""
+    if not hasattr(_HTTP, "session"):
+        import requests
+        _HTTP.session = requests.Session()
+    return _HTTP.session
 
 def ask_lmstudio(ask_type: str, prompt: str, temperature: float=0):
     """Send a request to LMStudio local API and get the response."""
@@ -111,6 +181,7 @@ def ask_lmstudio(ask_type: str, prompt: str, temperature: float=0):
         "max_tokens": 2000
     }
     
+    import requests
     try:
         response = requests.post(LMSTUDIO_API_URL, json=payload)
         response.raise_for_status()  # Raise exception for HTTP errors
@@ -139,61 +210,301 @@ def ask_lmstudio(ask_type: str, prompt: str, temperature: float=0):
 _ASK_CHATGPT_MESSAGES = {}
 _ASK_CHATGPT_LAST_TYPE = {}
 
+def reset_stream(stream_id):
+    """Drops the message history of a stream (and its per-tier "stream_id@tier" variants, see cascade)."""
+    scope = _STREAM_SCOPE.get()
+    if scope:
+        stream_id = f"{scope}/{stream_id}"
+    # Snapshot the keys: other threads add streams while we iterate
+    for key in [k for k in list(_ASK_CHATGPT_MESSAGES) if k == stream_id or k.startswith(f"{stream_id}@")]:
+        _ASK_CHATGPT_MESSAGES.pop(key, None)
+        _ASK_CHATGPT_LAST_TYPE.pop(key, None)
+
+# Stream id prefix of the current context, so pipelines running concurrently in one process keep
+# separate histories (budget.run_within_budget carries it into its worker threads)
+_STREAM_SCOPE = contextvars.ContextVar("stream_scope", default=None)
+
+@contextmanager
+def stream_scope(name):
+    """Prefixes every stream_id used in this context with "name/" and drops those histories on exit."""
+    token = _STREAM_SCOPE.set(name)
+    try:
+        yield
+    finally:
+        _STREAM_SCOPE.reset(token)
+        for key in [k for k in list(_ASK_CHATGPT_MESSAGES) if k.startswith(f"{name}/")]:
+            _ASK_CHATGPT_MESSAGES.pop(key, None)
+            _ASK_CHATGPT_LAST_TYPE.pop(key, None)
+
+# Record/replay cassette (LLM_CASSETTE=path, LLM_CASSETTE_MODE=record|replay|auto)
+_CASSETTE = None
+
+def _close_cassette(cassette):
+    cassette.close()
+    stats = cassette.stats()
+    print(f"[Cassette] {stats['hits']} replayed, {stats['misses']} missed, {stats['entries']} entries in {stats['path']}")
+
+def use_cassette(path, mode="auto"):
+    """Routes ask_chatgpt through a record/replay cassette (see cassette.Cassette). Pass None to disable."""
+    global _CASSETTE
+    if _CASSETTE is not None:
+        _CASSETTE.close()
+    _CASSETTE = Cassette(path, mode) if path else None
+    if _CASSETTE is not None:
+        atexit.register(_close_cassette, _CASSETTE)
+        print(f"[Cassette] {mode} mode: {path} ({len(_CASSETTE.entries)} entries)")
+    return _CASSETTE
+
+if os.environ.get("LLM_CASSETTE"):
+    use_cassette(os.environ["LLM_CASSETTE"], os.environ.get("LLM_CASSETTE_MODE", "auto"))
+
+_SYSTEM_PROMPTS = {}
+
+def get_system_prompt(ask_type):
+    """Returns the system prompt of an ask_type, built once so it stays byte-identical across calls."""
+    if ask_type not in _SYSTEM_PROMPTS:
+        system_prompt_body = LLM_ASK_QUERY_TYPE.get(ask_type, "send me 'Unknown'")
+        _SYSTEM_PROMPTS[ask_type] = SYSTEM_PROMPT_HEADER + system_prompt_body + SYSTEM_PROMPT_FOOTER
+    return _SYSTEM_PROMPTS[ask_type]
+
+def _local_usage(body):
+    """
+    Returns the usage of a local server response. llama.cpp reports reused KV-cache tokens as
+    timings.cache_n instead of usage.prompt_tokens_details.cached_tokens; map it so the ledger sees it.
+    """
+    usage = body.get("usage")
+    cache_n = (body.get("timings") or {}).get("cache_n")
+    if usage and cache_n and not (usage.get("prompt_tokens_details") or {}).get("cached_tokens"):
+        usage = {**usage, "prompt_tokens_details": {"cached_tokens": cache_n}}
+    return usage
+
+def _record_usage(ask_type, model, usage, estimated_prompt_tokens, content, backend):
+    """Records actual token usage from a response, falling back to local counts if usage is missing."""
+    if usage:
+        details = usage.get("prompt_tokens_details") or {}
+        return current_ledger().record(
+            ask_type, model,
+            usage.get("prompt_tokens", estimated_prompt_tokens),
+            usage.get("completion_tokens", count_tokens(content, model)),
+            cached_tokens=details.get("cached_tokens", 0),
+            estimated_prompt_tokens=estimated_prompt_tokens,
+            backend=backend,
+        )
+    return current_ledger().record(
+        ask_type, model, estimated_prompt_tokens, count_tokens(content, model),
+        estimated_prompt_tokens=estimated_prompt_tokens, backend=backend,
+    )
+
+def _consume_stream(deltas, on_partial=None):
+    """
+    Reads (text, usage) deltas from a streaming response through an incremental JSON scanner.
+    Stops (and closes the stream, cancelling generation) as soon as the top-level JSON object is complete.
+    Calls on_partial with the completed members parsed so far (see IncrementalJSONScanner.partial) whenever
+    another value has been completed, and once more with the full object.
+    Returns (content, usage, stopped_early).
+    """
+    scanner = IncrementalJSONScanner()
+    usage = None
+    seen_events = 0
+    stopped_early = False
+    try:
+        for text, chunk_usage in deltas:
+            usage = chunk_usage or usage
+            if not text:
+                continue
+            if scanner.feed(text):
+                stopped_early = True
+                break
+            if on_partial and scanner.events != seen_events:
+                seen_events = scanner.events
+                partial = scanner.partial(complete_only=True)
+                if partial is not None:
+                    on_partial(partial)
+    finally:
+        deltas.close()
+    content = scanner.text if scanner.complete else scanner.raw
+    if on_partial and scanner.complete:
+        on_partial(scanner.partial())
+    return content.strip(), usage, stopped_early
+
+def _lmstudio_stream_deltas(response):
+    """Yields (text, usage) from an OpenAI-compatible SSE stream (LMStudio, llama.cpp server, ...)."""
+    try:
+        for line in response.iter_lines(decode_unicode=True):
+            if not line or not line.startswith("data:"):
+                continue
+            data = line[len("data:"):].strip()
+            if data == "[DONE]":
+                break
+            chunk = json.loads(data)
+            choices = chunk.get("choices") or []
+            text = (choices[0].get("delta") or {}).get("content") if choices else None
+            yield text, _local_usage(chunk)
+    finally:
+        response.close()
+
+def _openai_stream_deltas(response):
+    """Yields (text, usage) from an OpenAI SDK stream."""
+    try:
+        for chunk in response:
+            text = chunk.choices[0].delta.content if chunk.choices else None
+            yield text, chunk.usage.model_dump() if chunk.usage else None
+    finally:
+        response.close()
+
+def get_local_pool():
+    """Returns the pool of local servers, rebuilding it when LMSTUDIO_API_URL(S) changes."""
+    global _LOCAL_POOL, _LOCAL_POOL_SOURCE
+    source = LMSTUDIO_API_URLS or LMSTUDIO_API_URL
+    if _LOCAL_POOL is None or _LOCAL_POOL_SOURCE != source:
+        _LOCAL_POOL = BackendPool(parse_server_list(source))
+        _LOCAL_POOL_SOURCE = source
+    return _LOCAL_POOL
+
+def _call_lmstudio(messages, temperature, max_tokens, stream=False, on_partial=None, schema_format=None):
+    """Sends a chat request to the least-loaded local server. Returns (content, usage, stopped_early)."""
+    payload = {
+        "model": LMSTUDIO_MODEL,
+        "messages": messages,
+        "temperature": temperature,
+        "max_tokens": max_tokens
+    }
+    if schema_format:
+        payload["response_format"] = schema_format
+    if LMSTUDIO_CACHE_PROMPT:
+        payload["cache_prompt"] = True
+    if stream:
+        payload["stream"] = True
+        payload["stream_options"] = {"include_usage": True}
+
+    def request(url):
+        # 스트림 소비까지 포함해야 도중에 끊긴 요청도 다른 서버로 넘어감
+        response = _http_session().post(url, json=payload, stream=stream, timeout=LMSTUDIO_TIMEOUT)
+        response.raise_for_status()
+        if stream:
+            return _consume_stream(_lmstudio_stream_deltas(response), on_partial)
+        response_json = response.json()
+        content = response_json['choices'][0]['message']['content'].strip()
+        return content, _local_usage(response_json), False
+
+    return get_local_pool().run(request)
+
+def _call_openai(model, messages, temperature, max_tokens, stream=False, on_partial=None, schema_format=None,
+                 cache_key=None):
+    """Sends a chat request to OpenAI. Returns (content, usage, stopped_early)."""
+    openai_client = get_openai_client()
+    options = {}
+    if stream:
+        options = {"stream": True, "stream_options": {"include_usage": True}}
+    if schema_format:
+        options["response_format"] = schema_format
+    if cache_key:
+        options["prompt_cache_key"] = cache_key
+    response = openai_client.chat.completions.create(
+        model=model,
+        messages=messages,
+        temperature=temperature,
+        top_p=1,
+        frequency_penalty=0,
+        presence_penalty=0,
+        max_tokens=max_tokens,
+        **options
+    )
+    if stream:
+        return _consume_stream(_openai_stream_deltas(response), on_partial)
+    content = response.choices[0].message.content.strip()
+    return content, response.usage.model_dump() if response.usage else None, False
+
 def ask_chatgpt(
     ask_type: str,
     prompt: str,
     model: str = "gpt-4o-mini-2024-07-18",
-    max_tokens: int = 2000,
+    max_tokens: int = None,
     temperature: float = 0,
     use_local: bool = False,
-    stream_id: str = "default"
+    stream_id: str = "default",
+    stream: bool = None,
+    on_partial=None
 ):
     """
     Unified LLM query stream for both OpenAI and LMStudio.
-    Maintains a message stream per stream_id.
+    Maintains a message stream per stream_id (except for STATELESS_ASK_TYPES, which are sent without history).
     Resets system prompt if ask_type changes.
+    Enforces the per-ask_type token budget (see tokens.ASK_TYPE_BUDGETS) before sending; raises
+    tokens.PromptTooLarge instead of sending when the prompt would have to be cut below tokens.MIN_PROMPT_TOKENS,
+    and records actual usage in the current ledger (tokens.current_ledger).
+    If a cassette is active (see use_cassette), matching requests are replayed without network.
+    With stream=True (default: STREAM_RESPONSES), the completion is streamed and cancelled as soon as
+    the top-level JSON object is closed; on_partial receives partially parsed objects along the way.
     Returns the response content as a string.
     """
     global _ASK_CHATGPT_MESSAGES, _ASK_CHATGPT_LAST_TYPE
 
-    # ask_type이 바뀌면 messages를 리셋
-    if (stream_id not in _ASK_CHATGPT_MESSAGES) or (_ASK_CHATGPT_LAST_TYPE.get(stream_id) != ask_type):
-        system_prompt_body = LLM_ASK_QUERY_TYPE.get(ask_type, "send me 'Unknown'")
-        system_content = SYSTEM_PROMPT_HEADER + system_prompt_body + SYSTEM_PROMPT_FOOTER
-        _ASK_CHATGPT_MESSAGES[stream_id] = [{"role": "system", "content": system_content}]
-        _ASK_CHATGPT_LAST_TYPE[stream_id] = ask_type
+    if stream is None:
+        stream = STREAM_RESPONSES
+    scope = _STREAM_SCOPE.get()
+    if scope:
+        stream_id = f"{scope}/{stream_id}"
 
-    messages = _ASK_CHATGPT_MESSAGES[stream_id]
+    if ask_type in STATELESS_ASK_TYPES:
+        # 기록 없이 고정 system 프롬프트 + 가변 user 프롬프트만 전송 (캐시 가능한 접두사 유지)
+        messages = [{"role": "system", "content": get_system_prompt(ask_type)}]
+    else:
+        # ask_type이 바뀌면 messages를 리셋
+        if (stream_id not in _ASK_CHATGPT_MESSAGES) or (_ASK_CHATGPT_LAST_TYPE.get(stream_id) != ask_type):
+            _ASK_CHATGPT_MESSAGES[stream_id] = [{"role": "system", "content": get_system_prompt(ask_type)}]
+            _ASK_CHATGPT_LAST_TYPE[stream_id] = ask_type
+        messages = _ASK_CHATGPT_MESSAGES[stream_id]
     messages.append({"role": "user", "content": prompt})
 
-    if use_local:
-        payload = {
-            "model": LMSTUDIO_MODEL,
-            "messages": messages,
-            "temperature": temperature,
-            "max_tokens": max_tokens
-        }
-        try:
-            response = requests.post(LMSTUDIO_API_URL, json=payload)
-            response.raise_for_status()
-            response_json = response.json()
-            content = response_json['choices'][0]['message']['content'].strip()
+    # 입력 토큰 예산 적용 (오래된 기록 제거 후 필요 시 프롬프트 자르기)
+    model_name = LMSTUDIO_MODEL if use_local else model
+    budget = get_budget(ask_type, model_name, max_tokens)
+    try:
+        messages[:] = fit_messages_to_budget(messages, budget["input"], model_name)
+    except PromptTooLarge:
+        # 보내지 않은 프롬프트는 대화 기록에 남기지 않음
+        messages.pop()
+        METRICS.incr_llm(ask_type, "prompts_too_large")
+        raise
+    estimated_prompt_tokens = count_message_tokens(messages, model_name)
+
+    start = time.perf_counter()
+    cassette_key = None
+    if _CASSETTE is not None:
+        cassette_key = request_key(ask_type, model_name, messages, temperature)
+        recorded = _CASSETTE.lookup(cassette_key)
+        if recorded is not None:
+            content = recorded["c"]
+            entry = _record_usage(ask_type, model_name, recorded["u"], estimated_prompt_tokens, content, "cassette")
+            METRICS.observe_llm(ask_type, "cassette", time.perf_counter() - start, entry["prompt_tokens"],
+                                entry["completion_tokens"], entry["cached_tokens"])
             messages.append({"role": "assistant", "content": content})
             return content
-        except Exception as e:
-            print(f"Error calling LMStudio API: {str(e)}")
-            return json.dumps({"result": f"Error: {str(e)}"})
-    else:
-        openai_client = create_openai_client()
-        response = openai_client.chat.completions.create(
-            model=model,
-            messages=messages,
-            temperature=temperature,
-            top_p=1,
-            frequency_penalty=0,
-            presence_penalty=0,
-            # max_tokens=max_tokens
-        )
-        content = response.choices[0].message.content.strip()
-        messages.append({"role": "assistant", "content": content})
-        return content
\ No newline at end of file
+
+    backend = "local" if use_local else "openai"
+    schema_format = response_format(ask_type) if backend in STRUCTURED_OUTPUT_BACKENDS else None
+    try:
+        if use_local:
+            content, usage, stopped_early = _call_lmstudio(
+                messages, temperature, budget["output"], stream, on_partial, schema_format)
+        else:
+            content, usage, stopped_early = _call_openai(
+                model, messages, temperature, budget["output"], stream, on_partial, schema_format,
+                cache_key=f"{PROMPT_CACHE_KEY_PREFIX}:{ask_type}")
+    except Exception as e:
+        METRICS.observe_llm(ask_type, backend, time.perf_counter() - start, error=True)
+        if not use_local:
+            raise
+        print(f"Error calling LMStudio API: {str(e)}")
+        return json.dumps({"result": f"Error: {str(e)}"})
+
+    if stopped_early:
+        METRICS.incr("llm_stream_early_stops")
+    entry = _record_usage(ask_type, model_name, usage, estimated_prompt_tokens, content, backend)
+    if cassette_key:
+        _CASSETTE.record(cassette_key, ask_type, content, usage)
+    METRICS.observe_llm(ask_type, backend, time.perf_counter() - start, entry["prompt_tokens"],
+                        entry["completion_tokens"], entry["cached_tokens"])
+    messages.append({"role": "assistant", "content": content})
+    return content
@@ -0,0 +1,182 @@
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+# 지연 시간 백분위수
+LATENCY_PERCENTILES = (50, 90, 95, 99)
+PROMETHEUS_PREFIX = "llm_recon"
+# 백분위수 계산에 쓰는 ask_type별 최근 지연 시간 표본 수 (오래 도는 프로세스에서 메모리를 제한)
+MAX_LATENCY_SAMPLES = int(os.environ.get("METRICS_MAX_LATENCY_SAMPLES", "10000"))
+
+
+def percentile(values, p):
+    """정렬된 값에서 선형 보간으로 p 백분위수를 계산합니다."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * p / 100
+    lower = int(rank)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+
+def _escape_label(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+class Metrics:
+    """파이프라인 단계별 시간, 카운터, LLM 호출 지표를 수집합니다."""
+
+    def __init__(self):
+        # 동시 describe 워커가 카운터를 함께 갱신하므로 잠금으로 보호
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """수집된 지표를 모두 초기화합니다."""
+        self.started_at = time.time()
+        self.counters = defaultdict(float)
+        self.stages = {}
+        self.stage_order = []
+        self.llm_latencies = defaultdict(lambda: deque(maxlen=MAX_LATENCY_SAMPLES))
+        self.llm_latency_totals = defaultdict(float)
+        self.llm_counters = defaultdict(lambda: defaultdict(float))
+
+    @contextmanager
+    def stage(self, name):
+        """with 블록의 실행 시간을 단계 이름으로 기록합니다."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            if name not in self.stages:
+                self.stages[name] = {"calls": 0, "wall_seconds": 0.0}
+                self.stage_order.append(name)
+            self.stages[name]["calls"] += 1
+            self.stages[name]["wall_seconds"] += elapsed
+
+    def incr(self, name, value=1):
+        """카운터를 증가시킵니다 (bytes_read, files_scanned, regex_matches, retries 등)."""
+        with self._lock:
+            self.counters[name] += value
+
+    def observe_llm(self, ask_type, backend, latency, prompt_tokens=0, completion_tokens=0,
+                    cached_tokens=0, error=False):
+        """LLM 호출 한 번의 지연 시간과 토큰 사용량을 기록합니다."""
+        with self._lock:
+            self.llm_latencies[ask_type].append(latency)
+            self.llm_latency_totals[ask_type] += latency
+            counters = self.llm_counters[ask_type]
+            counters["requests"] += 1
+            counters[f"requests_{backend}"] += 1
+            counters["prompt_tokens"] += prompt_tokens
+            counters["completion_tokens"] += completion_tokens
+            counters["cached_tokens"] += cached_tokens
+            if cached_tokens:
+                counters["cache_hits"] += 1
+            if error:
+                counters["errors"] += 1
+
+    def incr_llm(self, ask_type, name, value=1):
+        """ask_type별 LLM 카운터를 증가시킵니다 (cascade 승격 횟수 등)."""
+        with self._lock:
+            self.llm_counters[ask_type][name] += value
+
+    @staticmethod
+    def _cached_ratio(counters):
+        """프롬프트 토큰 중 캐시 적중 토큰의 비율입니다."""
+        prompt_tokens = counters.get("prompt_tokens", 0)
+        return counters.get("cached_tokens", 0) / prompt_tokens if prompt_tokens else 0.0
+
+    def report(self):
+        """실행 결과 리포트를 dict로 반환합니다."""
+        llm = {}
+        all_latencies = []
+        for ask_type, latencies in self.llm_latencies.items():
+            all_latencies.extend(latencies)
+            llm[ask_type] = {
+                **self.llm_counters[ask_type],
+                "latency_seconds": {
+                    f"p{p}": percentile(latencies, p) for p in LATENCY_PERCENTILES
+                },
+                "latency_seconds_total": self.llm_latency_totals[ask_type],
+                "cached_token_ratio": self._cached_ratio(self.llm_counters[ask_type]),
+            }
+        for ask_type, counters in self.llm_counters.items():
+            if counters.get("cascade_requests"):
+                llm.setdefault(ask_type, dict(counters))["escalation_rate"] = (
+                    counters.get("cascade_escalations", 0) / counters["cascade_requests"]
+                )
+        return {
+            "started_at": self.started_at,
+            "finished_at": time.time(),
+            "wall_seconds": time.time() - self.started_at,
+            "stages": {name: self.stages[name] for name in self.stage_order},
+            "counters": dict(self.counters),
+            "llm": {
+                "by_ask_type": llm,
+                "latency_seconds": {
+                    f"p{p}": percentile(all_latencies, p) for p in LATENCY_PERCENTILES
+                },
+            },
+        }
+
+    def write_json(self, path):
+        """JSON 실행 리포트를 저장합니다."""
+        report = self.report()
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        return report
+
+    def to_prometheus(self, labels=None):
+        """Prometheus 텍스트 포맷 문자열을 반환합니다."""
+        base = labels or {}
+
+        def fmt(name, value, extra=None):
+            merged = {**base, **(extra or {})}
+            label_str = ",".join(f'{k}="{_escape_label(v)}"' for k, v in merged.items())
+            return f"{PROMETHEUS_PREFIX}_{name}{{{label_str}}} {value}" if label_str else f"{PROMETHEUS_PREFIX}_{name} {value}"
+
+        lines = [f"# TYPE {PROMETHEUS_PREFIX}_stage_seconds gauge"]
+        for name in self.stage_order:
+            lines.append(fmt("stage_seconds", self.stages[name]["wall_seconds"], {"stage": name}))
+
+        for name, value in sorted(self.counters.items()):
+            lines.append(f"# TYPE {PROMETHEUS_PREFIX}_{name}_total counter")
+            lines.append(fmt(f"{name}_total", value))
+
+        lines.append(f"# TYPE {PROMETHEUS_PREFIX}_llm_request_latency_seconds summary")
+        for ask_type, latencies in sorted(self.llm_latencies.items()):
+            for p in LATENCY_PERCENTILES:
+                lines.append(fmt("llm_request_latency_seconds", percentile(latencies, p),
+                                 {"ask_type": ask_type, "quantile": p / 100}))
+            lines.append(fmt("llm_request_latency_seconds_sum", self.llm_latency_totals[ask_type],
+                             {"ask_type": ask_type}))
+            lines.append(fmt("llm_request_latency_seconds_count", self.llm_counters[ask_type]["requests"],
+                             {"ask_type": ask_type}))
+
+        lines.append(f"# TYPE {PROMETHEUS_PREFIX}_llm_cached_token_ratio gauge")
+        for ask_type, counters in sorted(self.llm_counters.items()):
+            lines.append(fmt("llm_cached_token_ratio", self._cached_ratio(counters), {"ask_type": ask_type}))
+
+        counter_names = sorted({name for counters in self.llm_counters.values() for name in counters})
+        for name in counter_names:
+            lines.append(f"# TYPE {PROMETHEUS_PREFIX}_llm_{name}_total counter")
+            for ask_type, counters in sorted(self.llm_counters.items()):
+                lines.append(fmt(f"llm_{name}_total", counters.get(name, 0), {"ask_type": ask_type}))
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path, labels=None):
+        """node_exporter textfile collector용 파일을 원자적으로 저장합니다."""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.to_prometheus(labels))
+        os.replace(tmp_path, path)
+
+
+# 실행 전체에서 공유하는 지표
+METRICS = Metrics()
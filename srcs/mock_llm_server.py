@@ -0,0 +1,242 @@
+import argparse
+import ast
+import json
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 스트리밍 응답 조각 크기 (글자 수)
+STREAM_CHUNK_CHARS = 16
+
+# system 프롬프트에서 ask_type을 식별하기 위한 문구 (llm.LLM_ASK_QUERY_TYPE 참고)
+ASK_TYPE_MARKERS = {
+    "identify_main_folder": "path to the folder that most likely contains",
+    "identify_main_source": "\"SOURCE\" \"FILE\" path",
+    "identify_framework": "identify the framework of the web service",
+    "identify_service_name": "identify the name of the web service",
+    "how_to_reconginize_endpoint": "each key is an HTTP method",
+    "describe_endpoint": "extract detailed information about a SINGLE endpoint",
+    "identify_database_usage": "which database tables each endpoint uses",
+}
+
+
+def detect_ask_type(messages):
+    """system 메시지 내용으로 ask_type을 추정합니다."""
+    system = next((m.get("content", "") for m in messages if m.get("role") == "system"), "")
+    for ask_type, marker in ASK_TYPE_MARKERS.items():
+        if marker in system:
+            return ask_type
+    return "unknown"
+
+
+def _literal_prompt(prompt):
+    """str(dict) 형태로 전달된 프롬프트를 dict로 복원합니다."""
+    try:
+        value = ast.literal_eval(prompt)
+    except (ValueError, SyntaxError):
+        return {}
+    return value if isinstance(value, dict) else {}
+
+
+def canned_response(responses, ask_type, prompt):
+    """canned 응답을 찾습니다. 값이 dict이면 프롬프트의 file_path 확장자로 고릅니다 (polyglot 타겟)."""
+    response = responses.get(ask_type)
+    if isinstance(response, dict):
+        extension = os.path.splitext(_literal_prompt(prompt).get("file_path") or "")[1]
+        response = response.get(extension)
+    return response
+
+
+def default_response(ask_type, prompt):
+    """canned 응답이 없을 때 프롬프트에서 그럴듯한 응답을 만듭니다."""
+    if ask_type in ("identify_main_folder", "identify_main_source"):
+        try:
+            items = ast.literal_eval(prompt)
+        except (ValueError, SyntaxError):
+            items = []
+        return json.dumps({"result": min(items, key=len) if items else ""})
+    if ask_type == "describe_endpoint":
+        fields = _literal_prompt(prompt)
+        code = fields.get("code") or ""
+        refs = sorted(set(re.findall(r"[\"'](/[A-Za-z0-9_/\-{}]+)[\"']", code)))
+        return json.dumps({"result": {"endpoint": {
+            "path": fields.get("path"),
+            "method": fields.get("method"),
+            "cookies": [],
+            "params": sorted(set(re.findall(r"@RequestParam\s+\w+\s+(\w+)", code))),
+            "headers": [],
+            "dependencies": [f"GET:{ref}" for ref in refs if ref != fields.get("path")],
+            "response_type": "JSON",
+            "description": f"Synthetic handler for {fields.get('method')} {fields.get('path')}",
+        }}})
+    if ask_type == "identify_database_usage":
+        fields = _literal_prompt(prompt)
+        tables = fields.get("known_tables") or []
+        return json.dumps({"result": {
+            "db_type": fields.get("db_type"),
+            "endpoints": {
+                endpoint.get("id"): [t for t in tables if t.lower() in (endpoint.get("code") or "").lower()]
+                for endpoint in fields.get("endpoints") or []
+            },
+        }})
+    return json.dumps({"result": "Unknown"})
+
+
+class MockLLMConfig:
+    """mock 서버의 지연 시간과 canned 응답 설정입니다."""
+
+    def __init__(self, responses=None, latency=0.0, jitter=0.0, seed=0, trailing_text=""):
+        self.responses = responses or {}
+        # 장황한 모델처럼 JSON 뒤에 덧붙이는 텍스트 (스트리밍 조기 종료 측정용)
+        self.trailing_text = trailing_text
+        self.latency = latency
+        self.jitter = jitter
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.cancelled = 0
+
+    def delay(self):
+        with self.lock:
+            self.requests += 1
+            jitter = self.rng.uniform(-self.jitter, self.jitter) if self.jitter else 0.0
+        return max(self.latency + jitter, 0.0)
+
+
+class MockLLMHandler(BaseHTTPRequestHandler):
+    """OpenAI 호환 /v1/chat/completions 엔드포인트를 흉내 냅니다."""
+
+    config = MockLLMConfig()
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/models"):
+            self._send_json(200, {"object": "list", "data": [{"id": "mock-model", "object": "model"}]})
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": "not found"})
+            return
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        messages = request.get("messages", [])
+        ask_type = detect_ask_type(messages)
+        prompt = messages[-1].get("content", "") if messages else ""
+
+        content = (canned_response(self.config.responses, ask_type, prompt)
+                   or default_response(ask_type, prompt)) + self.config.trailing_text
+        prompt_tokens = sum(len(m.get("content", "")) for m in messages) // 4
+        if request.get("stream"):
+            self._stream(request, content, prompt_tokens)
+            return
+        time.sleep(self.config.delay())
+
+        self._send_json(200, {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "mock-model"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": len(content) // 4,
+                "total_tokens": prompt_tokens + len(content) // 4,
+                "prompt_tokens_details": {"cached_tokens": 0},
+            },
+        })
+
+    def _stream(self, request, content, prompt_tokens):
+        """SSE로 응답을 조각내어 전송합니다. 클라이언트가 연결을 끊으면 생성을 중단합니다."""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        pieces = [content[i:i + STREAM_CHUNK_CHARS] for i in range(0, len(content), STREAM_CHUNK_CHARS)]
+        per_piece = self.config.delay() / max(len(pieces), 1)
+        chunk_id = f"chatcmpl-{uuid.uuid4().hex}"
+
+        def event(delta, usage=None):
+            body = {
+                "id": chunk_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": request.get("model", "mock-model"),
+                "choices": [{"index": 0, "delta": delta, "finish_reason": None}] if delta is not None else [],
+                "usage": usage,
+            }
+            self.wfile.write(f"data: {json.dumps(body)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        try:
+            event({"role": "assistant", "content": ""})
+            for piece in pieces:
+                time.sleep(per_piece)
+                event({"content": piece})
+            if (request.get("stream_options") or {}).get("include_usage"):
+                event(None, {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": len(content) // 4,
+                    "total_tokens": prompt_tokens + len(content) // 4,
+                })
+            self.wfile.write(b"data: [DONE]\n\n")
+        except (BrokenPipeError, ConnectionResetError):
+            with self.config.lock:
+                self.config.cancelled += 1
+
+
+def start_mock_server(responses=None, latency=0.0, jitter=0.0, host="127.0.0.1", port=0, trailing_text=""):
+    """백그라운드 스레드에서 mock 서버를 시작하고 (server, base_url)을 반환합니다."""
+    handler = type("BoundMockLLMHandler", (MockLLMHandler,), {
+        "config": MockLLMConfig(responses, latency, jitter, trailing_text=trailing_text)
+    })
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://{host}:{server.server_address[1]}/v1"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="OpenAI-compatible mock LLM server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=1234)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds per request")
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--trailing-words", type=int, default=0,
+                        help="append N words of prose after the JSON answer")
+    parser.add_argument("--responses", help="JSON file mapping ask_type to canned response "
+                                            "(synth_target manifest.json also works)")
+    args = parser.parse_args()
+
+    responses = {}
+    if args.responses:
+        with open(args.responses) as f:
+            loaded = json.load(f)
+        responses = loaded.get("responses", loaded)
+
+    trailing_text = " Explanation:" + " word" * args.trailing_words if args.trailing_words else ""
+    server, base_url = start_mock_server(responses, args.latency, args.jitter, args.host, args.port, trailing_text)
+    print(f"[Mock] Serving {base_url}/chat/completions (LMSTUDIO_API_URL) / {base_url} (OPENAI_BASE_URL)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -8,6 +8,7 @@ class Service:
         self.root_directory = root_directory
         self.main_source = main_source
         self.framework = framework
+        self.languages = {}  # 발견된 언어별 프레임워크 {language: framework}
         self.endpoints = []
         self.database = None
         self.dependencies = DependencyGraph()
@@ -42,6 +43,7 @@ class Service:
             "root_directory": self.root_directory,
             "main_source": self.main_source,
             "framework": self.framework,
+            "languages": self.languages,
             "endpoints": [endpoint.describe() for endpoint in self.endpoints],
             "database": self.database.describe() if self.database else None,
             "dependencies": self.dependencies.describe(),
@@ -93,7 +95,12 @@ class Endpoint:
         self.id = str(uuid.uuid4())  # 고유 ID 생성
         self.path = path
         self.method = method
+        # 코드에서 추출한 경로/메소드 (LLM 설명으로 path/method가 바뀌어도 run 간 비교 키로 사용)
+        self.source_path = path
+        self.source_method = method
         self.file_path = file_path
+        self.language = None  # 소스 언어 (languages.language_of)
+        self.framework = None  # 해당 언어의 프레임워크
         self.params = []
         self.cookies = {}  # 쿠키 정보
         self.headers = {}
@@ -110,6 +117,8 @@ class Endpoint:
             "path": self.path,
             "method": self.method,
             "file_path": self.file_path,
+            "language": self.language,
+            "framework": self.framework,
             "params": self.params,
             "auth_required": self.auth_required,
             "code": self.code,
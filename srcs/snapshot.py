@@ -0,0 +1,320 @@
+import gc
+import hashlib
+import json
+import os
+import sqlite3
+import time
+import zlib
+
+import model
+from xref import template_key
+
+# 스냅샷 포맷 버전 (스키마가 바뀌면 올림)
+SNAPSHOT_VERSION = 3
+COMPRESS_LEVEL = 6
+
+SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE strings (id INTEGER PRIMARY KEY, hash BLOB UNIQUE, data BLOB);
+CREATE TABLE endpoints (
+    row INTEGER PRIMARY KEY,
+    id TEXT,
+    method TEXT,
+    path TEXT,
+    source_method TEXT,
+    source_path TEXT,
+    template TEXT,
+    file_id INTEGER,
+    code_id INTEGER,
+    code_hash TEXT,
+    description_id INTEGER,
+    params TEXT,
+    cookies TEXT,
+    headers TEXT,
+    response_type TEXT,
+    auth_required INTEGER,
+    language TEXT,
+    framework TEXT
+);
+CREATE TABLE edges (src INTEGER, dst INTEGER);
+CREATE TABLE tables (name TEXT PRIMARY KEY);
+CREATE TABLE table_edges (src INTEGER, name TEXT);
+"""
+INDEXES = """
+CREATE INDEX endpoints_template ON endpoints (source_method, template);
+CREATE INDEX edges_src ON edges (src);
+"""
+
+
+class SnapshotError(Exception):
+    """스냅샷을 읽을 수 없을 때 발생합니다."""
+
+
+def content_hash(text):
+    """코드 내용 해시 (run 간 비교용). 코드가 없으면 None입니다."""
+    return hashlib.sha1(text.encode("utf-8")).hexdigest() if text is not None else None
+
+
+class _StringTable:
+    """내용 해시로 중복을 제거하고 zlib으로 압축해 저장하는 문자열 테이블입니다."""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.ids = {}
+
+    def add(self, text):
+        if text is None:
+            return None
+        if not isinstance(text, str):
+            text = json.dumps(text, ensure_ascii=False)
+        raw = text.encode("utf-8")
+        key = hashlib.sha1(raw).digest()
+        string_id = self.ids.get(key)
+        if string_id is None:
+            cursor = self.conn.execute("INSERT INTO strings (hash, data) VALUES (?, ?)",
+                                       (key, zlib.compress(raw, COMPRESS_LEVEL)))
+            string_id = self.ids[key] = cursor.lastrowid
+        return string_id
+
+
+def _json(value):
+    return json.dumps(value, ensure_ascii=False) if value not in (None, [], {}) else None
+
+
+def save_snapshot(service, path):
+    """
+    Service 전체를 SQLite 스냅샷으로 저장합니다.
+    코드/설명/파일 경로는 중복 제거·압축된 strings 테이블에, 엔드포인트 간 의존성은 행 번호 쌍으로 저장합니다.
+    임시 파일에 쓴 뒤 교체하므로 중간에 실패해도 기존 스냅샷은 유지됩니다.
+    """
+    tmp_path = f"{path}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.executescript(SCHEMA)
+        strings = _StringTable(conn)
+        database = service.database
+        meta = {
+            "version": SNAPSHOT_VERSION,
+            "created_at": time.time(),
+            "service": {
+                "id": service.id,
+                "name": service.name,
+                "root_directory": service.root_directory,
+                "main_source": service.main_source,
+                "framework": service.framework,
+                "languages": service.languages,
+            },
+            "database": {
+                "id": database.id,
+                "db_type": database.db_type,
+                "purpose": database.purpose,
+                "connection_string": database.connection_string,
+                "init_sql_id": strings.add(database.init_sql),
+            } if database else None,
+        }
+
+        row_by_id = {}
+        rows = []
+        for row, endpoint in enumerate(service.endpoints, 1):
+            row_by_id[endpoint.id] = row
+            rows.append((
+                row, endpoint.id, endpoint.method, endpoint.path, endpoint.source_method, endpoint.source_path,
+                template_key(endpoint.source_method, endpoint.source_path)[1],
+                strings.add(endpoint.file_path), strings.add(endpoint.code), content_hash(endpoint.code),
+                strings.add(endpoint.description), _json(endpoint.params), _json(endpoint.cookies),
+                _json(endpoint.headers), endpoint.response_type, int(bool(endpoint.auth_required)),
+                endpoint.language, endpoint.framework,
+            ))
+        conn.executemany("INSERT INTO endpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+        edges = []
+        for endpoint in service.endpoints:
+            for dep_id in endpoint.dependencies.get_dependencies(endpoint.id):
+                if dep_id in row_by_id:
+                    edges.append((row_by_id[endpoint.id], row_by_id[dep_id]))
+        conn.executemany("INSERT INTO edges VALUES (?, ?)", edges)
+
+        if database:
+            conn.executemany("INSERT OR IGNORE INTO tables VALUES (?)", [(table,) for table in database.tables])
+            conn.executemany("INSERT INTO table_edges VALUES (?, ?)", [
+                (row_by_id[endpoint.id], table)
+                for endpoint in service.endpoints
+                for table in database.dependencies.get_dependencies(endpoint.id)
+            ])
+
+        conn.executemany("INSERT INTO meta VALUES (?, ?)", [(key, json.dumps(value)) for key, value in meta.items()])
+        conn.executescript(INDEXES)
+        conn.commit()
+    finally:
+        conn.close()
+    os.replace(tmp_path, path)
+    return path
+
+
+class SnapshotEndpoint(model.Endpoint):
+    """코드와 설명을 처음 접근할 때 스냅샷에서 읽어오는 Endpoint입니다."""
+
+    @property
+    def code(self):
+        if "_code" not in self.__dict__:
+            self._code = self._snapshot.get_string(self._code_id)
+        return self._code
+
+    @code.setter
+    def code(self, value):
+        self._code = value
+
+    @property
+    def description(self):
+        if "_description" not in self.__dict__:
+            self._description = self._snapshot.get_string(self._description_id)
+        return self._description
+
+    @description.setter
+    def description(self, value):
+        self._description = value
+
+
+class Snapshot:
+    """
+    스냅샷을 읽습니다. 엔드포인트 목록은 코드/설명 없이 한 번의 쿼리로 읽으며,
+    코드와 설명은 get_string/get_code로 필요할 때만 압축을 풉니다.
+    """
+
+    def __init__(self, path):
+        if not os.path.exists(path):
+            raise SnapshotError(f"Snapshot not found: {path}")
+        self.path = path
+        try:
+            self.conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+        except sqlite3.DatabaseError as e:
+            raise SnapshotError(f"Cannot open snapshot: {path} ({e})")
+        try:
+            self.meta = {key: json.loads(value) for key, value in self.conn.execute("SELECT key, value FROM meta")}
+            version = self.meta.get("version")
+            if not isinstance(version, int) or version > SNAPSHOT_VERSION:
+                raise SnapshotError(f"Unsupported snapshot version {version} (supported: <= {SNAPSHOT_VERSION})")
+        except (sqlite3.DatabaseError, ValueError) as e:
+            self.conn.close()
+            raise SnapshotError(f"Not a snapshot: {path} ({e})")
+        except SnapshotError:
+            self.conn.close()
+            raise
+        # 버전 3 미만 스냅샷에는 추출된 경로/메소드가 따로 없어 path/method로 대신함
+        self._source_columns = ("source_method", "source_path") if version >= 3 else ("method", "path")
+        self._strings = {}
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def get_string(self, string_id):
+        """strings 테이블의 값을 압축 해제해 반환합니다 (캐시됨)."""
+        if string_id is None:
+            return None
+        if string_id not in self._strings:
+            row = self.conn.execute("SELECT data FROM strings WHERE id = ?", (string_id,)).fetchone()
+            self._strings[string_id] = zlib.decompress(row[0]).decode("utf-8") if row else None
+        return self._strings[string_id]
+
+    def endpoints(self):
+        """
+        (row, id, method, path, template, code_hash) 목록을 반환합니다. 코드는 읽지 않습니다.
+        method와 template은 코드에서 추출한 값, path는 LLM 설명이 반영된 표시용 경로입니다.
+        """
+        return self.conn.execute(
+            f"SELECT row, id, {self._source_columns[0]}, path, template, code_hash FROM endpoints ORDER BY row"
+        ).fetchall()
+
+    def edges(self):
+        """엔드포인트 간 의존성 (src row, dst row) 목록입니다."""
+        return self.conn.execute("SELECT src, dst FROM edges").fetchall()
+
+    def find(self, method, path):
+        """(method, 경로 템플릿)이 같은 엔드포인트의 id 목록을 인덱스로 찾습니다."""
+        method, template = template_key(method, path)
+        return [row[0] for row in self.conn.execute(
+            f"SELECT id FROM endpoints WHERE {self._source_columns[0]} = ? AND template = ?", (method, template))]
+
+    def get_code(self, endpoint_id):
+        row = self.conn.execute("SELECT code_id FROM endpoints WHERE id = ?", (endpoint_id,)).fetchone()
+        return self.get_string(row[0]) if row else None
+
+    def load_service(self):
+        """
+        model.Service를 복원합니다. 엔드포인트의 code/description은 접근할 때 읽히는 SnapshotEndpoint입니다.
+        스냅샷이 열려 있는 동안에만 지연 로드가 가능합니다.
+        """
+        # 수만 개 객체를 만드는 동안 순환 GC가 반복 실행되지 않도록 잠시 끔
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            return self._load_service()
+        finally:
+            if gc_enabled:
+                gc.enable()
+
+    def _load_service(self):
+        info = self.meta["service"]
+        service = model.Service.__new__(model.Service)
+        # 버전 1 스냅샷에는 언어 정보가 없음
+        service.__dict__.update({"languages": {}, **info}, endpoints=[], database=None,
+                                dependencies=model.DependencyGraph())
+        language_columns = "language, framework" if self.meta["version"] >= 2 else "NULL, NULL"
+
+        file_paths = {}
+        decoded = {None: None}
+        by_row = {}
+        rows = self.conn.execute(
+            f"SELECT row, id, method, path, {', '.join(self._source_columns)}, file_id, code_id, description_id, "
+            f"params, cookies, headers, response_type, auth_required, {language_columns} FROM endpoints ORDER BY row"
+        )
+        service_graph = service.dependencies.graph.setdefault(service.id, [])
+        for (row, endpoint_id, method, path, source_method, source_path, file_id, code_id, description_id, params,
+             cookies, headers, response_type, auth_required, language, framework) in rows:
+            if file_id not in file_paths:
+                file_paths[file_id] = self.get_string(file_id)
+            # 같은 JSON 값(params 등)은 한 번만 디코딩
+            for value in (params, cookies, headers):
+                if value not in decoded:
+                    decoded[value] = json.loads(value)
+            # __init__의 uuid 생성을 건너뛰어 대량 로드를 빠르게 함
+            endpoint = SnapshotEndpoint.__new__(SnapshotEndpoint)
+            endpoint.__dict__ = {
+                "id": endpoint_id, "path": path, "method": method,
+                "source_path": source_path, "source_method": source_method, "file_path": file_paths[file_id],
+                "language": language, "framework": framework,
+                "params": (decoded[params] or []).copy(),
+                "cookies": (decoded[cookies] or {}).copy(),
+                "headers": (decoded[headers] or {}).copy(),
+                "response_type": response_type, "auth_required": bool(auth_required),
+                "dependencies": model.DependencyGraph(),
+                "_snapshot": self, "_code_id": code_id, "_description_id": description_id,
+            }
+            service.endpoints.append(endpoint)
+            service_graph.append(endpoint_id)
+            by_row[row] = endpoint
+
+        for src, dst in self.edges():
+            source = by_row[src]
+            source.dependencies.graph.setdefault(source.id, []).append(by_row[dst].id)
+
+        database_info = self.meta.get("database")
+        if database_info:
+            database = model.Database(database_info["db_type"], database_info["purpose"],
+                                      self.get_string(database_info["init_sql_id"]),
+                                      database_info["connection_string"])
+            database.id = database_info["id"]
+            for (name,) in self.conn.execute("SELECT name FROM tables ORDER BY name"):
+                database.add_table(name)
+            for src, name in self.conn.execute("SELECT src, name FROM table_edges"):
+                database.dependencies.add_dependency(by_row[src].id, name)
+            service.set_database(database)
+        return service
@@ -0,0 +1,278 @@
+import json
+import re
+
+from jsonstream import IncrementalJSONScanner
+
+# ask_type별 응답 JSON 스키마 (모든 응답은 {"result": ...} 형태)
+_STRING_RESULT = {
+    "type": "object",
+    "properties": {"result": {"type": "string"}},
+    "required": ["result"],
+}
+
+ENDPOINT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "path": {"type": ["string", "null"]},
+        "method": {"type": ["string", "null"]},
+        "cookies": {"type": "array", "items": {"type": "string"}},
+        "params": {"type": "array", "items": {"type": "string"}},
+        "headers": {"type": "array", "items": {"type": "string"}},
+        "dependencies": {"type": "array", "items": {"type": "string"}},
+        "response_type": {"type": ["string", "null"]},
+        "description": {"type": ["string", "null"]},
+    },
+    "required": ["path", "method", "cookies", "params", "headers", "dependencies", "response_type", "description"],
+}
+
+SCHEMAS = {
+    "identify_main_folder": _STRING_RESULT,
+    "identify_main_source": _STRING_RESULT,
+    "identify_framework": _STRING_RESULT,
+    "identify_service_name": _STRING_RESULT,
+    "how_to_reconginize_endpoint": {
+        "type": "object",
+        "properties": {
+            "result": {"type": "object", "additionalProperties": {"type": "string"}},
+        },
+        "required": ["result"],
+    },
+    "describe_endpoint": {
+        "type": "object",
+        "properties": {
+            "result": {
+                "type": "object",
+                "properties": {"endpoint": {**ENDPOINT_SCHEMA, "type": ["object", "null"]}},
+                "required": ["endpoint"],
+            },
+        },
+        "required": ["result"],
+    },
+    "identify_database_usage": {
+        "type": "object",
+        "properties": {
+            "result": {
+                "type": "object",
+                "properties": {
+                    "db_type": {"type": ["string", "null"]},
+                    "endpoints": {"type": "object", "additionalProperties": {"type": "array", "items": {"type": "string"}}},
+                },
+                "required": ["db_type", "endpoints"],
+            },
+        },
+        "required": ["result"],
+    },
+}
+
+# 스키마 타입별 기본값 (누락된 필드 보정용)
+_DEFAULTS = {"array": list, "object": dict, "null": lambda: None, "string": lambda: None}
+
+_PY_LITERALS = {"True": "true", "False": "false", "None": "null"}
+_SMART_QUOTES = str.maketrans({"“": '"', "”": '"', "‘": "'", "’": "'"})
+_TRAILING_COMMA = re.compile(r",(\s*[}\]])")
+
+
+def response_format(ask_type):
+    """백엔드의 JSON 스키마 모드에 넘길 response_format을 반환합니다. 스키마가 없으면 None입니다."""
+    schema = SCHEMAS.get(ask_type)
+    if schema is None:
+        return None
+    return {"type": "json_schema", "json_schema": {"name": ask_type, "schema": schema, "strict": False}}
+
+
+def extract_json(text):
+    """
+    텍스트에서 첫 번째 최상위 JSON 객체를 한 번의 스캔으로 잘라냅니다.
+    앞쪽의 마크다운 펜스나 설명, 뒤쪽의 덧붙인 텍스트는 무시하며,
+    응답이 도중에 잘린 경우 열린 괄호를 닫아 가능한 만큼 복원합니다.
+    """
+    scanner = IncrementalJSONScanner()
+    scanner.feed(text)
+    if scanner.start is None:
+        return None
+    if scanner.complete:
+        return scanner.text
+    # 잘린 응답: 열린 문자열/괄호를 닫음
+    partial = scanner.partial()
+    return json.dumps(partial) if partial is not None else scanner.text
+
+
+def repair_json(text):
+    """
+    흔한 JSON 오류를 문자열 경계를 인식하며 고칩니다.
+    작은따옴표 문자열, 따옴표 없는 키, Python 리터럴(True/False/None), 스마트 따옴표, 후행 쉼표를 처리합니다.
+    큰따옴표 문자열 안의 작은따옴표(아포스트로피)는 건드리지 않습니다.
+    """
+    text = text.translate(_SMART_QUOTES)
+    out = []
+    i = 0
+    n = len(text)
+    while i < n:
+        ch = text[i]
+        if ch == '"' or ch == "'":
+            # 문자열을 통째로 복사 (작은따옴표 문자열은 큰따옴표로 변환)
+            quote = ch
+            j = i + 1
+            buf = []
+            while j < n and text[j] != quote:
+                if text[j] == "\\" and j + 1 < n:
+                    if quote == "'" and text[j + 1] == "'":
+                        buf.append("'")
+                    else:
+                        buf.append(text[j:j + 2])
+                    j += 2
+                    continue
+                if quote == "'" and text[j] == '"':
+                    buf.append('\\"')
+                elif text[j] == "\n":
+                    buf.append("\\n")
+                else:
+                    buf.append(text[j])
+                j += 1
+            out.append('"' + "".join(buf) + '"')
+            i = j + 1
+        elif ch.isalpha() or ch == "_":
+            j = i
+            while j < n and (text[j].isalnum() or text[j] in "_$-"):
+                j += 1
+            word = text[i:j]
+            rest = text[j:].lstrip()
+            if rest.startswith(":"):
+                out.append(f'"{word}"')  # 따옴표 없는 키
+            else:
+                out.append(_PY_LITERALS.get(word, word))
+            i = j
+        else:
+            out.append(ch)
+            i += 1
+    return _TRAILING_COMMA.sub(r"\1", "".join(out))
+
+
+def _type_matches(value, expected):
+    types = expected if isinstance(expected, list) else [expected]
+    checks = {
+        "object": lambda v: isinstance(v, dict),
+        "array": lambda v: isinstance(v, list),
+        "string": lambda v: isinstance(v, str),
+        "null": lambda v: v is None,
+        "number": lambda v: isinstance(v, (int, float)) and not isinstance(v, bool),
+        "boolean": lambda v: isinstance(v, bool),
+    }
+    return any(checks[t](value) for t in types)
+
+
+def validate(value, schema, path="$"):
+    """스키마에서 사용하는 부분(type/properties/required/items/additionalProperties)만 검사해 오류 목록을 반환합니다."""
+    errors = []
+    expected = schema.get("type")
+    if expected and not _type_matches(value, expected):
+        return [f"{path}: expected {expected}, got {type(value).__name__}"]
+    if isinstance(value, dict):
+        for key in schema.get("required", []):
+            if key not in value:
+                errors.append(f"{path}.{key}: missing")
+        properties = schema.get("properties", {})
+        extra = schema.get("additionalProperties")
+        for key, item in value.items():
+            if key in properties:
+                errors.extend(validate(item, properties[key], f"{path}.{key}"))
+            elif isinstance(extra, dict):
+                errors.extend(validate(item, extra, f"{path}.{key}"))
+    elif isinstance(value, list) and "items" in schema:
+        for index, item in enumerate(value):
+            errors.extend(validate(item, schema["items"], f"{path}[{index}]"))
+    return errors
+
+
+def coerce(value, schema):
+    """
+    스키마에 맞도록 값을 보정합니다: 누락된 필수 필드는 기본값으로 채우고,
+    배열이어야 하는 문자열은 한 원소 배열로, 문자열이어야 하는 스칼라는 문자열로 바꿉니다.
+    """
+    expected = schema.get("type")
+    types = expected if isinstance(expected, list) else [expected]
+    if value is None and "null" in types:
+        return None
+    if "array" in types and not isinstance(value, list):
+        value = [] if value in (None, "") else [value]
+    if "string" in types and isinstance(value, (int, float, bool)):
+        value = str(value)
+    if isinstance(value, list) and "items" in schema:
+        value = [coerce(item, schema["items"]) for item in value]
+        if schema["items"].get("type") == "string":
+            # [{"name": "id", ...}] 처럼 객체로 온 항목은 이름만 사용
+            value = [
+                item if isinstance(item, str) else str(item.get("name", json.dumps(item)) if isinstance(item, dict) else item)
+                for item in value if item is not None
+            ]
+    if isinstance(value, dict):
+        properties = schema.get("properties", {})
+        for key in schema.get("required", []):
+            if key not in value and key in properties:
+                prop_type = properties[key].get("type")
+                fallback = prop_type[-1] if isinstance(prop_type, list) else prop_type
+                value[key] = _DEFAULTS.get(fallback, lambda: None)()
+        for key, item in list(value.items()):
+            if key in properties:
+                value[key] = coerce(item, properties[key])
+    return value
+
+
+def _loads(text):
+    """JSON 파싱 후 실패하면 로컬 복구를 한 번 시도합니다. (값, 복구 여부)를 반환합니다."""
+    try:
+        return json.loads(text), False
+    except json.JSONDecodeError:
+        pass
+    try:
+        return json.loads(repair_json(text)), True
+    except json.JSONDecodeError:
+        return None, True
+
+
+def _wrap_result(ask_type, parsed):
+    """{"result": ...} 로 감싸지 않은 응답을 감쌉니다."""
+    if isinstance(parsed, dict) and "result" in parsed:
+        return parsed
+    if ask_type == "describe_endpoint" and isinstance(parsed, dict) and "endpoint" not in parsed:
+        return {"result": {"endpoint": parsed}}
+    return {"result": parsed}
+
+
+def parse_structured(ask_type, text):
+    """
+    LLM 응답을 ask_type 스키마에 맞게 한 번에 파싱합니다.
+    (result 값, 오류 목록, 복구 여부)를 반환하며, JSON을 찾지 못하면 result는 원본 문자열입니다.
+    """
+    text = (text or "").strip()
+    schema = SCHEMAS.get(ask_type)
+    candidate = extract_json(text)
+    if candidate is None:
+        # JSON 객체가 없는 응답: 문자열 결과를 기대하는 ask_type이면 그대로 사용
+        if schema is _STRING_RESULT and text:
+            return text.strip("`\"' \n"), [], True
+        return text, ["no JSON object found"], False
+
+    parsed, repaired = _loads(candidate)
+    if parsed is None:
+        return text, ["unparseable JSON"], repaired
+    wrapped = _wrap_result(ask_type, parsed)
+
+    # result 안에 JSON이 문자열로 한 번 더 들어있는 경우 (```json ... ``` 포함)
+    inner = wrapped["result"]
+    if isinstance(inner, str) and schema is not None and schema is not _STRING_RESULT:
+        inner_candidate = extract_json(inner)
+        if inner_candidate is not None:
+            inner_parsed, inner_repaired = _loads(inner_candidate)
+            if inner_parsed is not None:
+                wrapped = _wrap_result(ask_type, inner_parsed)
+                repaired = repaired or inner_repaired
+
+    if schema is None:
+        return wrapped["result"], [], repaired
+    errors = validate(wrapped, schema)
+    if errors:
+        wrapped = coerce(wrapped, schema)
+        errors = validate(wrapped, schema)
+        repaired = True
+    return wrapped["result"], errors, repaired
@@ -0,0 +1,274 @@
+import argparse
+import json
+import os
+import random
+
+# 프레임워크별 합성 타겟 템플릿
+FLAVORS = {
+    "spring": {
+        "framework": "Spring",
+        "extension": ".java",
+        "patterns": {
+            "ALL": "@RequestMapping\\(\"[^\"]*\"\\)",
+            "GET": "@GetMapping\\(\"[^\"]*\"\\)",
+            "POST": "@PostMapping\\(\"[^\"]*\"\\)",
+        },
+    },
+    "flask": {
+        "framework": "Flask",
+        "extension": ".py",
+        "patterns": {
+            "GET": "@bp\\.route\\('[^']*', methods=\\['GET'\\]\\)",
+            "POST": "@bp\\.route\\('[^']*', methods=\\['POST'\\]\\)",
+        },
+    },
+    # Spring 서비스 + Express 게이트웨이 (한 번의 스캔으로 두 언어를 모두 찾는지 확인용)
+    "polyglot": {
+        "framework": "Spring",
+        "extension": ".java",
+        "gateway": "express",
+    },
+    "express": {
+        "framework": "Express",
+        "extension": ".js",
+        "patterns": {
+            "GET": "router\\.get\\('[^']*'",
+            "POST": "router\\.post\\('[^']*'",
+        },
+    },
+}
+
+ENTITY_NAMES = [
+    "user", "order", "product", "invoice", "account", "payment", "cart", "review",
+    "coupon", "shipment", "category", "address", "ticket", "message", "report", "session",
+]
+
+
+def _entity(index):
+    """인덱스에 대응하는 고유 엔티티 이름을 만듭니다."""
+    base = ENTITY_NAMES[index % len(ENTITY_NAMES)]
+    suffix = index // len(ENTITY_NAMES)
+    return f"{base}{suffix}" if suffix else base
+
+
+def _handler_body(rng, lines):
+    """핸들러 본문을 흉내 내는 문장 목록을 만듭니다."""
+    return [f"int v{i} = {rng.randint(0, 1000)};" for i in range(lines)]
+
+
+def _spring_controller(package, entity, endpoints, rng, body_lines):
+    cls = entity.capitalize()
+    out = [
+        f"package {package}.controller;",
+        "",
+        "import org.springframework.web.bind.annotation.*;",
+        "",
+        "@RestController",
+        f"@RequestMapping(\"/api/{entity}\")",
+        f"public class {cls}Controller {{",
+    ]
+    routes = []
+    for k in range(endpoints):
+        method = "GET" if k % 2 == 0 else "POST"
+        path = f"/{entity}/action{k}" if k else f"/{entity}"
+        annotation = "GetMapping" if method == "GET" else "PostMapping"
+        out.append(f"    @{annotation}(\"{path}\")")
+        out.append(f"    public String {entity}Action{k}(@RequestParam String id) {{")
+        out.extend(f"        {line}" for line in _handler_body(rng, body_lines))
+        if k % 3 == 1:
+            out.append(f"        return \"redirect:/api/{entity}/{entity}\";")
+        else:
+            out.append(f"        return \"{entity}{k}\";")
+        out.append("    }")
+        out.append("")
+        routes.append({"method": method, "path": f"/api/{entity}{path}"})
+    out.append("}")
+    return "\n".join(out) + "\n", routes
+
+
+def _flask_blueprint(entity, endpoints, rng, body_lines):
+    out = [
+        "from flask import Blueprint, request, redirect",
+        "",
+        f"bp = Blueprint('{entity}', __name__, url_prefix='/api/{entity}')",
+        "",
+    ]
+    routes = []
+    for k in range(endpoints):
+        method = "GET" if k % 2 == 0 else "POST"
+        path = f"/{entity}/action{k}" if k else f"/{entity}"
+        out.append(f"@bp.route('{path}', methods=['{method}'])")
+        out.append(f"def {entity}_action{k}():")
+        out.extend(f"    {line.rstrip(';').replace('int ', '')}" for line in _handler_body(rng, body_lines))
+        if k % 3 == 1:
+            out.append(f"    return redirect('/api/{entity}/{entity}')")
+        else:
+            out.append(f"    return '{entity}{k}'")
+        out.append("")
+        routes.append({"method": method, "path": path})
+    return "\n".join(out) + "\n", routes
+
+
+def _express_router(entity, endpoints, rng, body_lines):
+    out = [
+        "const express = require('express');",
+        "const router = express.Router();",
+        "",
+    ]
+    routes = []
+    for k in range(endpoints):
+        method = "GET" if k % 2 == 0 else "POST"
+        path = f"/{entity}/action{k}" if k else f"/{entity}"
+        out.append(f"router.{method.lower()}('{path}', (req, res) => {{")
+        out.extend(f"  {line.replace('int ', 'const ')}" for line in _handler_body(rng, body_lines))
+        if k % 3 == 1:
+            out.append(f"  res.redirect('/{entity}');")
+        else:
+            out.append(f"  res.json({{ name: '{entity}{k}' }});")
+        out.append("});")
+        out.append("")
+        routes.append({"method": method, "path": path})
+    out.append("module.exports = router;")
+    return "\n".join(out) + "\n", routes
+
+
+def _filler(flavor, index, rng, body_lines):
+    """엔드포인트가 없는 보조 소스 파일 내용을 만듭니다."""
+    name = f"Helper{index}"
+    lines = _handler_body(rng, body_lines)
+    if flavor == "spring":
+        return f"public class {name} {{\n    void run() {{\n" + "".join(f"        {l}\n" for l in lines) + "    }\n}\n"
+    if flavor == "flask":
+        return f"def helper_{index}():\n" + "".join(f"    {l.rstrip(';').replace('int ', '')}\n" for l in lines)
+    return f"function helper{index}() {{\n" + "".join(f"  {l.replace('int ', 'const ')}\n" for l in lines) + "}\n"
+
+
+def generate_target(output_dir, flavor="spring", files=50, controllers=10, endpoints=4,
+                    body_lines=8, service_name="synthshop", seed=0):
+    """
+    합성 타겟을 output_dir/target 아래에 생성하고 매니페스트를 반환합니다.
+    files는 컨트롤러를 포함한 전체 소스 파일 수입니다.
+    매니페스트에는 mock LLM 서버가 돌려줄 기대 응답(canned responses)이 포함됩니다.
+    """
+    if flavor not in FLAVORS:
+        raise ValueError(f"Unknown flavor: {flavor}")
+    spec = FLAVORS[flavor]
+    name = flavor
+    gateway = spec.get("gateway")
+    if gateway:
+        # 본 서비스는 Spring flavor와 같게 만들고 게이트웨이 라우터를 따로 추가
+        spec = {**FLAVORS["spring"], "gateway": gateway}
+        flavor = "spring"
+    rng = random.Random(seed)
+    target_root = os.path.join(output_dir, "target")
+    service_root = os.path.join(target_root, service_name)
+
+    if flavor == "spring":
+        package = f"com.example.{service_name}"
+        main_folder = os.path.join(service_root, "src", "main", "java", *package.split("."))
+        controller_dir = os.path.join(main_folder, "controller")
+        util_dir = os.path.join(main_folder, "util")
+        main_source = os.path.join(main_folder, "Application.java")
+        main_code = (
+            f"package {package};\n\n"
+            "@SpringBootApplication\npublic class Application {\n"
+            "    public static void main(String[] args) { SpringApplication.run(Application.class, args); }\n}\n"
+        )
+    elif flavor == "flask":
+        main_folder = os.path.join(service_root, "app")
+        controller_dir = os.path.join(main_folder, "routes")
+        util_dir = os.path.join(main_folder, "util")
+        main_source = os.path.join(main_folder, "main.py")
+        main_code = "from flask import Flask\n\napp = Flask(__name__)\n"
+    else:
+        main_folder = os.path.join(service_root, "src")
+        controller_dir = os.path.join(main_folder, "routes")
+        util_dir = os.path.join(main_folder, "util")
+        main_source = os.path.join(main_folder, "app.js")
+        main_code = "const express = require('express');\nconst app = express();\n"
+
+    os.makedirs(controller_dir, exist_ok=True)
+    os.makedirs(util_dir, exist_ok=True)
+    with open(main_source, "w") as f:
+        f.write(main_code)
+
+    routes = []
+    for c in range(controllers):
+        entity = _entity(c)
+        if flavor == "spring":
+            code, file_routes = _spring_controller(package, entity, endpoints, rng, body_lines)
+            file_path = os.path.join(controller_dir, f"{entity.capitalize()}Controller.java")
+        elif flavor == "flask":
+            code, file_routes = _flask_blueprint(entity, endpoints, rng, body_lines)
+            file_path = os.path.join(controller_dir, f"{entity}.py")
+        else:
+            code, file_routes = _express_router(entity, endpoints, rng, body_lines)
+            file_path = os.path.join(controller_dir, f"{entity}.js")
+        with open(file_path, "w") as f:
+            f.write(code)
+        for route in file_routes:
+            routes.append({**route, "file_path": file_path})
+
+    for i in range(max(files - controllers - 1, 0)):
+        file_path = os.path.join(util_dir, f"helper{i}{spec['extension']}")
+        with open(file_path, "w") as f:
+            f.write(_filler(flavor, i, rng, body_lines))
+
+    patterns = json.dumps({"result": spec["patterns"]})
+    if gateway:
+        gateway_dir = os.path.join(service_root, "gateway", "routes")
+        os.makedirs(gateway_dir, exist_ok=True)
+        with open(os.path.join(service_root, "gateway", "server.js"), "w") as f:
+            f.write("const express = require('express');\nconst app = express();\n")
+        for c in range(max(controllers // 2, 1)):
+            entity = f"gw{_entity(c)}"
+            code, file_routes = _express_router(entity, endpoints, rng, body_lines)
+            file_path = os.path.join(gateway_dir, f"{entity}.js")
+            with open(file_path, "w") as f:
+                f.write(code)
+            routes.extend({**route, "file_path": file_path} for route in file_routes)
+        # mock 서버는 프롬프트의 file_path 확장자로 언어별 패턴을 고름
+        patterns = {
+            spec["extension"]: patterns,
+            FLAVORS[gateway]["extension"]: json.dumps({"result": FLAVORS[gateway]["patterns"]}),
+        }
+
+    # main source는 엔드포인트 패턴 인식에 쓰이므로 첫 컨트롤러를 가리키게 함
+    pattern_source = routes[0]["file_path"] if routes else main_source
+    manifest = {
+        "flavor": name,
+        "framework": spec["framework"],
+        "target_root": target_root,
+        "service_name": service_name,
+        "main_folder": main_folder,
+        "main_source": pattern_source,
+        "files": files,
+        "controllers": controllers,
+        "endpoints_per_controller": endpoints,
+        "routes": routes,
+        "responses": {
+            "identify_main_folder": json.dumps({"result": main_folder}),
+            "identify_main_source": json.dumps({"result": pattern_source}),
+            "identify_framework": json.dumps({"result": spec["framework"]}),
+            "identify_service_name": json.dumps({"result": service_name}),
+            "how_to_reconginize_endpoint": patterns,
+        },
+    }
+    with open(os.path.join(output_dir, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic recon target.")
+    parser.add_argument("output_dir")
+    parser.add_argument("--flavor", choices=sorted(FLAVORS), default="spring")
+    parser.add_argument("--files", type=int, default=50)
+    parser.add_argument("--controllers", type=int, default=10)
+    parser.add_argument("--endpoints", type=int, default=4)
+    parser.add_argument("--body-lines", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    result = generate_target(args.output_dir, args.flavor, args.files, args.controllers,
+                             args.endpoints, args.body_lines, seed=args.seed)
+    print(f"[Synth] {len(result['routes'])} endpoints in {result['target_root']}")
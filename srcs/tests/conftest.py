@@ -0,0 +1,55 @@
+import os
+import socket
+import sys
+
+import pytest
+
+# 모듈들이 srcs/ 에서 평면적으로 import되므로 테스트도 같은 경로에서 import
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import llm  # noqa: E402
+from metrics import METRICS  # noqa: E402
+from mock_llm_server import start_mock_server  # noqa: E402
+from tokens import LEDGER  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def reset_run_state():
+    """테스트마다 프로세스 전역 상태(지표, 장부, 대화 기록, 카세트)를 초기화합니다."""
+    METRICS.reset()
+    LEDGER.reset()
+    llm._ASK_CHATGPT_MESSAGES.clear()
+    llm._ASK_CHATGPT_LAST_TYPE.clear()
+    yield
+    if llm._CASSETTE is not None:
+        llm.use_cassette(None)
+
+
+@pytest.fixture
+def mock_backend(monkeypatch):
+    """
+    mock OpenAI 호환 서버를 띄우고 OpenAI 클라이언트가 그 서버를 가리키게 하는 함수를 반환합니다.
+    start(responses)는 서버의 base URL을 반환합니다.
+    """
+    servers = []
+
+    def start(responses=None, **options):
+        server, base_url = start_mock_server(responses, **options)
+        servers.append(server)
+        monkeypatch.setenv("OPENAI_BASE_URL", base_url)
+        monkeypatch.setenv("OPENAI_API_KEY", "mock")
+        return base_url
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def unused_url():
+    """연결이 거부되는 로컬 URL입니다."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    return f"http://127.0.0.1:{port}/v1"
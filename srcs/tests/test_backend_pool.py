@@ -0,0 +1,169 @@
+import functools
+import threading
+import time
+
+import pytest
+import requests
+
+import backend_pool
+from backend_pool import BackendPool, LocalServer, NoHealthyServer, parse_server_list
+
+
+def http_error(status, headers=None):
+    response = requests.Response()
+    response.status_code = status
+    response.headers.update(headers or {})
+    return requests.HTTPError(f"{status} error", response=response)
+
+
+@pytest.fixture
+def fast_recheck(monkeypatch):
+    monkeypatch.setattr(backend_pool, "EARLY_RECHECK_SECONDS", 0.05)
+
+
+@pytest.fixture
+def no_sleep(monkeypatch):
+    delays = []
+    monkeypatch.setattr(backend_pool.time, "sleep", delays.append)
+    return delays
+
+
+def test_parse_server_list():
+    servers = parse_server_list("http://a/v1/chat/completions#4, http://b/v1/chat/completions")
+    assert [(s.url, s.slots) for s in servers] == [
+        ("http://a/v1/chat/completions", 4),
+        ("http://b/v1/chat/completions", backend_pool.DEFAULT_SLOTS),
+    ]
+    assert servers[0].models_url == "http://a/v1/models"
+
+
+def test_acquire_picks_least_loaded_server():
+    busy, idle = LocalServer("http://busy", slots=2), LocalServer("http://idle", slots=2)
+    pool = BackendPool([busy, idle])
+    busy.in_flight = 1
+    assert pool.acquire() is idle
+    assert pool.acquire() in (busy, idle)
+    assert busy.in_flight + idle.in_flight == 3
+
+
+def test_acquire_waits_for_a_free_slot():
+    server = LocalServer("http://only", slots=1)
+    pool = BackendPool([server])
+    assert pool.acquire() is server
+
+    acquired = []
+    waiter = threading.Thread(target=lambda: acquired.append(pool.acquire()))
+    waiter.start()
+    time.sleep(0.1)
+    assert not acquired
+    pool.release(server)
+    waiter.join(timeout=2)
+    assert acquired == [server]
+    assert server.in_flight == 1
+
+
+def test_acquire_recovers_server_that_comes_back(mock_backend, fast_recheck):
+    base_url = mock_backend()
+    server = LocalServer(f"{base_url}/chat/completions")
+    pool = BackendPool([server])
+    pool.release(pool.acquire(), failed=True)
+    assert not server.healthy
+
+    # 정상 서버가 하나도 없으면 곧바로 다시 확인하고 기다림 (바로 실패하지 않음)
+    started = time.time()
+    assert pool.acquire(wait_seconds=5) is server
+    assert server.healthy
+    assert time.time() - started < 1
+
+
+def test_acquire_gives_up_after_wait_seconds(unused_url, fast_recheck):
+    server = LocalServer(f"{unused_url}/chat/completions")
+    pool = BackendPool([server])
+    pool.release(pool.acquire(), failed=True)
+
+    started = time.time()
+    with pytest.raises(NoHealthyServer):
+        pool.acquire(wait_seconds=0.3)
+    assert 0.3 <= time.time() - started < 3
+
+
+def test_run_fails_over_to_another_server():
+    broken, working = LocalServer("http://broken"), LocalServer("http://working")
+    pool = BackendPool([broken, working])
+    calls = []
+
+    def request(url):
+        calls.append(url)
+        if url == broken.url:
+            raise requests.ConnectionError("refused")
+        return "ok"
+
+    # 첫 요청이 broken으로 가도록 working을 더 바쁘게 만듦
+    working.slots = 2
+    working.in_flight = 1
+    assert pool.run(request) == "ok"
+    assert calls == [broken.url, working.url]
+    assert not broken.healthy and broken.failures == 1
+    assert working.served == 1 and working.in_flight == 1
+
+
+def test_run_retries_transient_failure_on_single_server(mock_backend, fast_recheck):
+    base_url = mock_backend()
+    server = LocalServer(f"{base_url}/chat/completions")
+    pool = BackendPool([server])
+    attempts = []
+
+    def request(url):
+        attempts.append(url)
+        if len(attempts) == 1:
+            raise requests.Timeout("read timed out")
+        return "ok"
+
+    assert pool.run(request) == "ok"
+    assert len(attempts) == 2
+    assert server.healthy and server.failures == 1 and server.served == 1
+
+
+def test_run_backs_off_on_rate_limit_without_marking_unhealthy(no_sleep):
+    server = LocalServer("http://limited")
+    pool = BackendPool([server])
+    responses = [http_error(429, {"Retry-After": "2"}), http_error(429), "ok"]
+
+    def request(url):
+        result = responses.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    assert pool.run(request) == "ok"
+    assert no_sleep == [2.0, backend_pool.RATE_LIMIT_BACKOFF_SECONDS * 2]
+    assert server.healthy and server.failures == 0 and server.in_flight == 0
+
+
+def test_run_raises_client_errors_without_failover():
+    first, second = LocalServer("http://first"), LocalServer("http://second")
+    pool = BackendPool([first, second])
+    calls = []
+
+    def request(url):
+        calls.append(url)
+        raise http_error(400)
+
+    with pytest.raises(requests.HTTPError):
+        pool.run(request)
+    assert len(calls) == 1
+    assert first.healthy and second.healthy
+    assert first.in_flight == second.in_flight == 0
+
+
+def test_run_raises_last_error_when_every_server_stays_down(unused_url, fast_recheck, monkeypatch):
+    server = LocalServer(f"{unused_url}/chat/completions")
+    pool = BackendPool([server])
+    monkeypatch.setattr(pool, "acquire", functools.partial(pool.acquire, wait_seconds=0.2))
+
+    def request(url):
+        raise requests.ConnectionError("refused")
+
+    with pytest.raises(requests.ConnectionError):
+        pool.run(request)
+    assert server.in_flight == 0 and not server.healthy
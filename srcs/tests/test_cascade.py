@@ -0,0 +1,102 @@
+import json
+
+import pytest
+
+import cascade
+import model
+from framework import partial_endpoint_updater
+from metrics import METRICS
+
+
+def describe_answer(**endpoint):
+    return json.dumps({"result": {"endpoint": endpoint}})
+
+
+@pytest.fixture
+def tiers(monkeypatch):
+    """
+    티어별 동작을 {tier: 응답 문자열 또는 예외}로 정하는 가짜 ask_chatgpt를 설치합니다.
+    응답이 문자열이면 on_partial로 그 응답 전체를 부분 결과로 먼저 보냅니다.
+    """
+    behavior = {}
+    calls = []
+
+    def fake_ask_chatgpt(ask_type, prompt, stream_id="default", on_partial=None, **options):
+        tier = stream_id.rsplit("@", 1)[1]
+        calls.append(tier)
+        answer = behavior[tier]
+        if isinstance(answer, Exception):
+            raise answer
+        if on_partial:
+            on_partial(json.loads(answer))
+        return answer
+
+    monkeypatch.setattr(cascade, "CASCADE_ENABLED", True)
+    monkeypatch.setattr(cascade, "ask_chatgpt", fake_ask_chatgpt)
+    monkeypatch.setitem(cascade.POLICIES, "describe_endpoint", ["local", "mini"])
+    return behavior, calls
+
+
+def test_parse_policies():
+    assert cascade.parse_policies("describe_endpoint=local,mini; default=mini") == {
+        "describe_endpoint": ["local", "mini"], "default": ["mini"],
+    }
+    with pytest.raises(ValueError):
+        cascade.parse_policies("describe_endpoint=local,huge")
+
+
+def test_accepts_valid_local_answer_without_escalating(tiers):
+    behavior, calls = tiers
+    behavior["local"] = describe_answer(path="/a", method="GET", description="local answer")
+    assert json.loads(cascade.ask_llm("describe_endpoint", "prompt"))["result"]["endpoint"]["description"] == \
+        "local answer"
+    assert calls == ["local"]
+    assert METRICS.llm_counters["describe_endpoint"]["cascade_accepted_local"] == 1
+
+
+def test_rejected_tier_partials_never_reach_the_endpoint(tiers):
+    behavior, calls = tiers
+    # local 응답은 description이 없어 거부됨 (params/headers는 그 응답에만 있음)
+    behavior["local"] = describe_answer(path="/a", method="GET", params=["secret"], headers={"X-Local": "1"})
+    behavior["mini"] = describe_answer(path="/a", method="GET", description="from mini")
+    endpoint = model.Endpoint("/a", "GET", "A.java")
+
+    content = cascade.ask_llm("describe_endpoint", "prompt", on_partial=partial_endpoint_updater(endpoint))
+    assert calls == ["local", "mini"]
+    assert json.loads(content)["result"]["endpoint"]["description"] == "from mini"
+    assert endpoint.description == "from mini"
+    assert endpoint.params == [] and endpoint.headers == {}
+
+
+def test_accepted_first_tier_partials_are_applied(monkeypatch, tiers):
+    behavior, _ = tiers
+    monkeypatch.setitem(cascade.POLICIES, "describe_endpoint", ["local", "mini", "large"])
+    behavior["local"] = describe_answer(path="/a", method="GET", description="local", params=["id"])
+    endpoint = model.Endpoint("/a", "GET", "A.java")
+    cascade.ask_llm("describe_endpoint", "prompt", on_partial=partial_endpoint_updater(endpoint))
+    assert endpoint.description == "local" and endpoint.params == ["id"]
+
+
+def test_failed_escalation_keeps_the_local_answer(tiers):
+    behavior, calls = tiers
+    local = describe_answer(path="/a", method="GET")
+    behavior["local"] = local
+    behavior["mini"] = ValueError("OpenAI API key not found")
+    assert cascade.ask_llm("describe_endpoint", "prompt") == local
+    assert calls == ["local", "mini"]
+    assert METRICS.llm_counters["describe_endpoint"]["cascade_failed_mini"] == 1
+
+
+def test_failure_of_the_first_tier_is_raised(tiers):
+    behavior, _ = tiers
+    behavior["local"] = ConnectionError("no local server")
+    with pytest.raises(ConnectionError):
+        cascade.ask_llm("describe_endpoint", "prompt")
+
+
+def test_disabled_cascade_uses_one_backend(monkeypatch):
+    calls = []
+    monkeypatch.setattr(cascade, "CASCADE_ENABLED", False)
+    monkeypatch.setattr(cascade, "ask_chatgpt", lambda *args, **kwargs: calls.append(kwargs) or "answer")
+    assert cascade.ask_llm("identify_framework", "code", use_local=True) == "answer"
+    assert calls == [{"use_local": True, "stream_id": "default", "on_partial": None}]
@@ -0,0 +1,44 @@
+import json
+
+import pytest
+
+import framework
+import llm
+from cassette import CassetteMiss
+from synth_target import generate_target
+
+
+def results(service):
+    by_id = {endpoint.id: endpoint for endpoint in service.endpoints}
+    return sorted(
+        (
+            endpoint.method,
+            endpoint.path,
+            json.dumps(endpoint.description, sort_keys=True),
+            sorted(by_id[dep_id].path for dep_id in endpoint.dependencies.get_dependencies(endpoint.id)),
+        )
+        for endpoint in service.endpoints
+    )
+
+
+def test_cassette_replay_reproduces_run_offline(mock_backend, unused_url, monkeypatch, tmp_path):
+    manifest = generate_target(str(tmp_path), "spring", 6, 2, 2)
+    cassette_path = str(tmp_path / "run.cassette.jsonl.gz")
+    mock_backend(manifest["responses"])
+    llm.use_cassette(cassette_path, "record")
+    recorded = framework.run_recon(manifest["target_root"], output_dir=str(tmp_path / "recorded"), visualize=False)
+    llm.use_cassette(None)
+
+    # 백엔드 없이 카세트만으로 같은 결과가 나와야 함
+    monkeypatch.setenv("OPENAI_BASE_URL", unused_url)
+    llm._ASK_CHATGPT_MESSAGES.clear()
+    llm._ASK_CHATGPT_LAST_TYPE.clear()
+    llm.use_cassette(cassette_path, "replay")
+    replayed = framework.run_recon(manifest["target_root"], output_dir=str(tmp_path / "replayed"), visualize=False)
+
+    assert replayed.name == recorded.name
+    assert results(replayed) == results(recorded)
+    stats = llm._CASSETTE.stats()
+    assert stats["hits"] > 0 and stats["misses"] == 0
+    with pytest.raises(CassetteMiss):
+        llm._CASSETTE.lookup("not-recorded")
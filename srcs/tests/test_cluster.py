@@ -0,0 +1,84 @@
+import model
+from cluster import cluster_endpoints, spot_check_sample, substitute, substitution_pairs, templated_description
+
+HANDLER = """
+    @GetMapping("/{entities}/{id}")
+    public ResponseEntity<{Entity}> get{Entity}(@PathVariable Long id) {
+        {Entity} found = {entity}Repository.findById(id).orElseThrow();
+        audit.log("read {entity}", id);
+        if (!found.isVisibleTo(currentUser())) {
+            return ResponseEntity.status(403).build();
+        }
+        return ResponseEntity.ok(found);
+    }
+"""
+OTHER = """
+    @PostMapping("/reports/export")
+    public void export(HttpServletResponse response) throws IOException {
+        response.setContentType("text/csv");
+        for (Row row : reports.stream().filter(Row::active).toList()) {
+            response.getWriter().println(row.toCsv());
+        }
+    }
+"""
+
+
+def crud_endpoint(entity, method="GET"):
+    code = HANDLER.replace("{entities}", entity + "s").replace("{Entity}", entity.capitalize()) \
+        .replace("{entity}", entity)
+    endpoint = model.Endpoint(f"/{entity}s/{{id}}", method, f"{entity.capitalize()}Controller.java")
+    endpoint.code = code
+    return endpoint
+
+
+def test_handlers_that_differ_only_by_entity_share_a_cluster():
+    product, order, invoice = crud_endpoint("product"), crud_endpoint("order"), crud_endpoint("invoice")
+    export = model.Endpoint("/reports/export", "GET", "ReportController.java")
+    export.code = OTHER
+    posted = crud_endpoint("customer", method="POST")
+
+    clusters = cluster_endpoints([product, order, export, invoice, posted], threshold=0.9)
+    by_representative = {cluster.representative.path: cluster for cluster in clusters}
+    assert sorted(by_representative) == ["/customers/{id}", "/products/{id}", "/reports/export"]
+    assert by_representative["/products/{id}"].members == [order, invoice]
+    # 다른 HTTP 메소드는 코드가 같아도 묶지 않음
+    assert by_representative["/customers/{id}"].members == []
+    assert sum(len(cluster) for cluster in clusters) == 5
+
+
+def test_zero_threshold_disables_clustering():
+    endpoints = [crud_endpoint("product"), crud_endpoint("order")]
+    assert [len(cluster) for cluster in cluster_endpoints(endpoints, threshold=0)] == [1, 1]
+
+
+def test_substitute_replaces_whole_words_only():
+    pairs = {"users": "orders", "user": "order"}
+    text = "Returns the User for GET /users/{id}; userId, user_id, getUser() but not username, superuser, USERNAME."
+    assert substitute(text, pairs) == \
+        "Returns the Order for GET /orders/{id}; orderId, order_id, getOrder() but not username, superuser, USERNAME."
+    assert substitute({"params": ["userId", "username"], "n": 1}, pairs) == {"params": ["orderId", "username"], "n": 1}
+
+
+def test_templated_description_uses_member_path_and_entity():
+    product, order = crud_endpoint("product"), crud_endpoint("order")
+    pairs = substitution_pairs(product, order)
+    assert {old: new.lower() for old, new in pairs.items()} == {"products": "orders", "product": "order"}
+    description = {
+        "path": product.path, "method": "GET", "params": ["productId"],
+        "description": "Returns one Product; products are filtered by productionDate.",
+    }
+    templated = templated_description(description, product, order)
+    assert templated == {
+        "path": "/orders/{id}", "method": "GET", "params": ["orderId"],
+        "description": "Returns one Order; orders are filtered by productionDate.",
+    }
+
+
+def test_spot_check_sample_takes_at_least_one_member_per_cluster():
+    clusters = cluster_endpoints([crud_endpoint(name) for name in ("product", "order", "invoice", "payment")],
+                                 threshold=0.9)
+    assert len(clusters) == 1 and len(clusters[0].members) == 3
+    assert spot_check_sample(clusters, rate=0) == []
+    sample = spot_check_sample(clusters, rate=0.1)
+    assert len(sample) == 1 and sample[0] in clusters[0].members
+    assert spot_check_sample(clusters, rate=0.1) == sample
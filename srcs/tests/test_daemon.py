@@ -0,0 +1,66 @@
+import json
+import os
+
+import pytest
+
+import framework
+from daemon import JobQueue, ReconDaemon, parse_job_options
+from synth_target import generate_target
+from tokens import LEDGER
+
+
+def test_parse_job_options_coerces_numbers():
+    options = parse_job_options({"target": "/repo", "local": True, "max_tokens": "5000", "max_dollars": 0.5})
+    assert options == {"local": True, "max_tokens": 5000, "max_dollars": 0.5}
+
+
+@pytest.mark.parametrize("request_body", [
+    {"local": "false"},
+    {"describe": 1},
+    {"max_tokens": "lots"},
+    {"max_tokens": True},
+    {"max_dollars": -1},
+    {"max_seconds": "nan"},
+    {"max_seconds": [10]},
+    {"max_token": 100},
+])
+def test_parse_job_options_rejects_bad_values(request_body):
+    with pytest.raises(ValueError):
+        parse_job_options(request_body)
+
+
+def test_job_queue_requeues_interrupted_jobs(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    queue = JobQueue(path)
+    first = queue.submit("/a", {})
+    second = queue.submit("/b", {"max_tokens": 10})
+    assert queue.claim()["id"] == first["id"]
+    queue.add_result(first["id"], {"path": "/partial"})
+
+    # 재시작하면 실행 중이던 작업은 부분 결과 없이 다시 대기열로
+    reopened = JobQueue(path)
+    assert reopened.counts() == {"queued": 2}
+    assert reopened.results(first["id"]) == []
+    assert reopened.claim()["id"] == first["id"]
+    claimed = reopened.claim()
+    assert claimed["id"] == second["id"] and claimed["options"] == {"max_tokens": 10}
+    reopened.finish(second["id"], summary={"endpoints": 0})
+    assert reopened.get(second["id"])["status"] == "done"
+    assert reopened.claim() is None
+
+
+def test_run_job_streams_results_and_keeps_its_own_ledger(mock_backend, tmp_path):
+    manifest = generate_target(str(tmp_path), "spring", 4, 2, 2)
+    mock_backend(manifest["responses"])
+    daemon = ReconDaemon(state_dir=str(tmp_path / "state"), workers=1)
+    job = daemon.queue.submit(manifest["target_root"], {"max_tokens": 1_000_000})
+
+    summary = daemon.run_job(daemon.queue.claim())
+    results = [json.loads(data) for _, data in daemon.queue.results(job["id"])]
+    assert summary["endpoints"] == len(results) > 0
+    assert all(result["description"] and not result["pending"] for result in results)
+    # 작업의 사용량은 작업 장부에만 기록되고 프로세스 전역 장부에는 남지 않음
+    assert summary["usage"]["calls"] > 0
+    assert LEDGER.total["calls"] == 0
+    with open(os.path.join(summary["output_dir"], framework.COST_LEDGER_PATH), encoding="utf-8") as f:
+        assert json.load(f)["summary"]["total"]["calls"] == summary["usage"]["calls"]
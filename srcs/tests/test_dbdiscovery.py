@@ -0,0 +1,64 @@
+import model
+from dbdiscovery import _singular, discover_database, link_endpoints_to_tables
+
+
+def make_service(root, codes):
+    service = model.Service("svc", str(root), "App.java", "Spring")
+    for index, code in enumerate(codes):
+        endpoint = model.Endpoint(f"/e{index}", "GET", "App.java")
+        endpoint.code = code
+        service.add_endpoint(endpoint)
+    return service
+
+
+def linked_tables(tables, code):
+    service = make_service("/repo", [code])
+    links, ambiguous = link_endpoints_to_tables(service, tables)
+    return sorted(links.get(service.endpoints[0].id, [])), bool(ambiguous)
+
+
+def test_singular_keeps_words_ending_in_ss_and_us():
+    assert [_singular(word) for word in ("orders", "addresses", "address", "status", "class", "categories", "boxes")] \
+        == ["order", "address", "address", "status", "class", "category", "box"]
+
+
+def test_entity_and_repository_references_link_tables():
+    tables = {"orders": "Order", "user_accounts": "UserAccount", "addresses": "Address"}
+    assert linked_tables(tables, "return orderRepository.findAll();") == (["orders"], False)
+    assert linked_tables(tables, "UserAccount account = accounts.get(id);") == (["user_accounts"], False)
+    assert linked_tables(tables, "return userAccountDao.load(id);") == (["user_accounts"], False)
+    assert linked_tables(tables, "List<Address> found = List.of();") == (["addresses"], False)
+    assert linked_tables(tables, 'jdbc.query("SELECT * FROM orders o JOIN addresses a")') == \
+        (["addresses", "orders"], False)
+
+
+def test_sql_keywords_and_plain_words_do_not_link_tables():
+    tables = {"orders": "Order", "users": None, "groups": "Group"}
+    # ORDER BY / GROUP BY는 orders/groups 테이블 참조가 아님
+    assert linked_tables(tables, 'db.execute("SELECT name FROM items ORDER BY name")') == ([], True)
+    assert linked_tables(tables, 'db.execute("SELECT kind FROM items GROUP BY kind")') == ([], True)
+    # 일반 단어 user는 users 테이블 참조가 아님
+    assert linked_tables(tables, 'String user = request.getParameter("user");') == ([], False)
+    assert linked_tables(tables, "return userRepository.findById(id);") == (["users"], False)
+    assert linked_tables(tables, "return groupDao.all();") == (["groups"], False)
+
+
+def test_discover_database_reads_config_entities_and_migrations(tmp_path):
+    (tmp_path / "application.properties").write_text("spring.datasource.url=jdbc:postgresql://db:5432/shop\n")
+    (tmp_path / "Order.java").write_text('@Entity\n@Table(name = "orders")\npublic class Order { Long id; }\n')
+    (tmp_path / "schema.sql").write_text("CREATE TABLE IF NOT EXISTS addresses (id INT);\n")
+    service = make_service(tmp_path, [
+        "return orderRepository.findAll();",
+        'jdbc.update("UPDATE addresses SET line = ?")',
+        "return ok;",
+    ])
+
+    database = discover_database(service, use_llm=False)
+    assert database.db_type == "PostgreSQL"
+    assert database.connection_string == "jdbc:postgresql://db:5432/shop"
+    assert service.database is database
+    assert "CREATE TABLE" in database.init_sql
+    first, second, third = service.endpoints
+    assert database.dependencies.get_dependencies(first.id) == ["orders"]
+    assert database.dependencies.get_dependencies(second.id) == ["addresses"]
+    assert database.dependencies.get_dependencies(third.id) == []
@@ -0,0 +1,177 @@
+import glob
+import json
+import os
+
+import pytest
+
+import framework
+import model
+from diff import carry_over, diff_runs
+from snapshot import Snapshot, save_snapshot
+from synth_target import generate_target
+
+
+def make_service(routes):
+    """[(method, path, code), ...]로 Service를 만듭니다."""
+    service = model.Service("svc", "/repo", "Main.java", "Spring")
+    for method, path, code in routes:
+        endpoint = model.Endpoint(path, method, "Controller.java")
+        endpoint.code = code
+        service.add_endpoint(endpoint)
+    return service
+
+
+def find(service, method, path):
+    return next(e for e in service.endpoints if e.method == method and e.path == path)
+
+
+def link(service, source, target):
+    source = find(service, *source)
+    source.dependencies.add_dependency(source.id, find(service, *target).id)
+
+
+def edge_paths(service):
+    by_id = {endpoint.id: endpoint for endpoint in service.endpoints}
+    return {
+        (endpoint.method, endpoint.path, by_id[dep_id].method, by_id[dep_id].path)
+        for endpoint in service.endpoints
+        for dep_id in endpoint.dependencies.get_dependencies(endpoint.id)
+    }
+
+
+@pytest.fixture
+def runs():
+    old = make_service([
+        ("GET", "/users/{id}", "return users.find(id);"),
+        ("POST", "/users", "users.save(body);"),
+        ("GET", "/orders", "return orders.all();"),
+        ("DELETE", "/legacy", "legacy.drop();"),
+    ])
+    new = make_service([
+        ("GET", "/users/<int:uid>", "return users.find(id);"),
+        ("POST", "/users", "audit(body); users.save(body);"),
+        ("GET", "/orders", "return orders.all();"),
+        ("GET", "/health", "return ok;"),
+    ])
+    link(old, ("GET", "/orders"), ("GET", "/users/{id}"))
+    link(old, ("GET", "/orders"), ("DELETE", "/legacy"))
+    link(new, ("GET", "/orders"), ("GET", "/users/<int:uid>"))
+    link(new, ("GET", "/health"), ("POST", "/users"))
+    return old, new
+
+
+def test_diff_runs_classifies_endpoints_and_edges(runs):
+    old, new = runs
+    run_diff = diff_runs(old, new)
+    summary = run_diff.to_dict()["summary"]
+    assert summary == {
+        "added": 1, "removed": 1, "modified": 1, "unchanged": 2, "added_edges": 1, "removed_edges": 1,
+    }
+    assert [item["path"] for item in run_diff.added] == ["/health"]
+    assert [item["path"] for item in run_diff.removed] == ["/legacy"]
+    assert [item["path"] for item in run_diff.modified] == ["/users"]
+    assert run_diff.added_edges == [{"from": "GET /health", "to": "POST /users"}]
+    assert run_diff.removed_edges[0]["to"] == "DELETE /legacy"
+    # 경로 변수 이름이 달라도 같은 템플릿이면 같은 엔드포인트
+    assert run_diff.matched[find(old, "GET", "/users/{id}").id] == find(new, "GET", "/users/<int:uid>").id
+    assert run_diff.needs_description() == {find(new, "POST", "/users").id, find(new, "GET", "/health").id}
+
+
+def test_diff_against_snapshot_matches_diff_against_service(runs, tmp_path):
+    old, new = runs
+    path = str(tmp_path / "old.db")
+    save_snapshot(old, path)
+    expected = diff_runs(old, new).to_dict()
+    assert diff_runs(path, new).to_dict() == expected
+    with Snapshot(path) as snapshot:
+        assert diff_runs(snapshot, new).to_dict() == expected
+        assert edge_paths(snapshot.load_service()) == edge_paths(old)
+
+
+def test_carry_over_copies_unchanged_results_only(runs):
+    old, new = runs
+    for endpoint in old.endpoints:
+        endpoint.description = f"described {endpoint.path}"
+        endpoint.params = {"id": "int"}
+    run_diff = diff_runs(old, new)
+    assert carry_over(old, new, run_diff) == 2
+
+    assert find(new, "GET", "/users/<int:uid>").description == "described /users/{id}"
+    assert find(new, "GET", "/orders").params == {"id": "int"}
+    assert find(new, "POST", "/users").description is None
+    assert find(new, "GET", "/health").description is None
+    # 옮긴 엣지는 짝이 있는 엔드포인트로만 이어짐 (삭제된 /legacy로 가는 엣지는 버림)
+    assert ("GET", "/orders", "GET", "/users/<int:uid>") in edge_paths(new)
+    assert ("GET", "/orders", "DELETE", "/legacy") not in edge_paths(new)
+
+
+@pytest.fixture
+def target(tmp_path):
+    """
+    LLM 설명에서만 찾을 수 있는 의존성을 가진 합성 대상입니다.
+    정적 참조 스캔은 변수에 담긴 경로를 따라가지 못하지만, mock 서버의 describe_endpoint 응답은
+    코드 안의 모든 경로 문자열을 의존성으로 돌려줍니다.
+    """
+    manifest = generate_target(str(tmp_path), "spring", 6, 2, 2)
+    for path in glob.glob(os.path.join(manifest["target_root"], "**", "*Controller.java"), recursive=True):
+        with open(path, encoding="utf-8") as f:
+            code = f.read()
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(code.replace("int v0 =", 'String next = "/api/order/order"; int v0 =', 1))
+    return manifest
+
+
+def describe_calls():
+    from tokens import current_ledger
+    return current_ledger().summary()["by_ask_type"].get("describe_endpoint", {}).get("calls", 0)
+
+
+def test_rerun_of_unchanged_target_keeps_described_edges(target, mock_backend, tmp_path):
+    mock_backend(target["responses"])
+    output_dir = str(tmp_path / "out")
+
+    first = framework.run_recon(target["target_root"], output_dir=output_dir, visualize=False)
+    described = describe_calls()
+    assert described == len(first.endpoints)
+    second = framework.run_recon(target["target_root"], output_dir=output_dir, visualize=False)
+
+    # 두 번째 실행은 아무것도 다시 설명하지 않고, 설명에서 나온 엣지를 그대로 유지해야 함
+    assert describe_calls() == described
+    assert edge_paths(second) == edge_paths(first)
+    with open(os.path.join(output_dir, framework.DIFF_REPORT_PATH), encoding="utf-8") as f:
+        summary = json.load(f)["summary"]
+    assert summary == {
+        "added": 0, "removed": 0, "modified": 0, "unchanged": len(first.endpoints),
+        "added_edges": 0, "removed_edges": 0,
+    }
+
+
+def test_rerun_keys_on_extracted_path_when_llm_rewrites_it(target, mock_backend, monkeypatch, tmp_path):
+    import mock_llm_server
+
+    default_response = mock_llm_server.default_response
+
+    def rewriting_response(ask_type, prompt):
+        # 설명 응답이 추출된 경로 대신 게이트웨이 접두사가 붙은 경로를 돌려줌
+        answer = default_response(ask_type, prompt)
+        if ask_type == "describe_endpoint":
+            answer = json.loads(answer)
+            answer["result"]["endpoint"]["path"] = "/gateway" + answer["result"]["endpoint"]["path"]
+            answer = json.dumps(answer)
+        return answer
+
+    monkeypatch.setattr(mock_llm_server, "default_response", rewriting_response)
+    mock_backend(target["responses"])
+    output_dir = str(tmp_path / "out")
+
+    first = framework.run_recon(target["target_root"], output_dir=output_dir, visualize=False)
+    assert all(endpoint.path.startswith("/gateway/") for endpoint in first.endpoints)
+    described = describe_calls()
+    second = framework.run_recon(target["target_root"], output_dir=output_dir, visualize=False)
+
+    assert describe_calls() == described
+    assert sorted(e.path for e in second.endpoints) == sorted(e.path for e in first.endpoints)
+    with open(os.path.join(output_dir, framework.DIFF_REPORT_PATH), encoding="utf-8") as f:
+        summary = json.load(f)["summary"]
+    assert (summary["added"], summary["removed"], summary["modified"]) == (0, 0, 0)
+    assert summary["unchanged"] == len(first.endpoints)
@@ -0,0 +1,89 @@
+import json
+
+from jsonstream import IncrementalJSONScanner
+
+ANSWER = {
+    "path": "/api/orders/{id}",
+    "method": "GET",
+    "params": {"id": "int", "expand": {"items": "bool", "note": "a } and a { in \"quotes\""}},
+    "dependencies": ["GET:/api/users/{id}", "POST:/api/audit"],
+    "description": "returns one order, braces {like [these]} are ignored",
+    "retries": 3,
+}
+RESPONSE = "Sure, here it is:\n```json\n" + json.dumps(ANSWER, indent=2) + "\n```\nLet me know if you need more."
+
+
+def feed_in_chunks(text, size):
+    scanner = IncrementalJSONScanner()
+    for i in range(0, len(text), size):
+        scanner.feed(text[i:i + size])
+    return scanner
+
+
+def is_prefix_of(partial, final):
+    """partial의 모든 멤버가 final의 값과 같거나, 객체이면 그 일부인지 확인합니다."""
+    for key, value in partial.items():
+        if key not in final:
+            return False
+        if isinstance(value, dict) and isinstance(final[key], dict):
+            if not is_prefix_of(value, final[key]):
+                return False
+        elif value != final[key]:
+            return False
+    return True
+
+
+def test_scanner_finds_object_regardless_of_chunking():
+    for size in (1, 2, 7, 64, len(RESPONSE)):
+        scanner = feed_in_chunks(RESPONSE, size)
+        assert scanner.complete
+        assert json.loads(scanner.text) == ANSWER
+        assert scanner.partial() == ANSWER
+
+
+def test_scanner_stops_at_closing_brace():
+    scanner = IncrementalJSONScanner()
+    assert not scanner.feed('prefix {"a": "}", "b": [1, {"c": "]"}]')
+    assert scanner.feed('} trailing {"ignored": true}')
+    assert json.loads(scanner.text) == {"a": "}", "b": [1, {"c": "]"}]}
+    # 완료된 뒤의 조각은 무시
+    assert scanner.feed('{"more": 1}')
+    assert scanner.text.endswith("]}")
+
+
+def test_scanner_handles_escaped_quotes():
+    scanner = IncrementalJSONScanner()
+    scanner.feed('{"a": "say \\"}\\" now", "b": 1}')
+    assert scanner.complete
+    assert json.loads(scanner.text) == {"a": 'say "}" now', "b": 1}
+
+
+def test_best_effort_partial_closes_open_string_and_containers():
+    scanner = IncrementalJSONScanner()
+    scanner.feed('{"path": "/api/ord')
+    assert scanner.partial() == {"path": "/api/ord"}
+    scanner.feed('ers", "params": {"id": ')
+    assert scanner.partial() == {"path": "/api/orders", "params": {"id": None}}
+    assert not scanner.complete
+
+
+def test_complete_only_partial_never_shows_truncated_values():
+    scanner = IncrementalJSONScanner()
+    previous = {}
+    for ch in RESPONSE:
+        scanner.feed(ch)
+        partial = scanner.partial(complete_only=True)
+        if partial is None:
+            continue
+        assert is_prefix_of(partial, ANSWER), partial
+        # 멤버는 한 번 나타나면 사라지지 않음
+        assert is_prefix_of(previous, partial)
+        previous = partial
+    assert previous == ANSWER
+
+
+def test_partial_before_object_starts_is_none():
+    scanner = IncrementalJSONScanner()
+    scanner.feed("```json\n")
+    assert scanner.partial() is None
+    assert scanner.partial(complete_only=True) is None
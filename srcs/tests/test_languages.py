@@ -0,0 +1,63 @@
+import os
+
+from languages import detect_languages, index_sources, language_of
+
+SPRING = """
+@RestController
+public class UserController {
+    @GetMapping("/users")
+    public List<User> list() { return users.findAll(); }
+}
+"""
+FLASK = """
+@app.route("/health")
+def health():
+    return "ok"
+"""
+EXPRESS = """
+router.get('/items', (req, res) => res.json(items));
+"""
+
+
+def write(root, relative, code=""):
+    path = os.path.join(str(root), *relative.split("/"))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(code)
+    return path
+
+
+def relative_files(root, language):
+    return sorted(os.path.relpath(path, str(root)).replace(os.sep, "/") for path in language.files)
+
+
+def test_language_of_uses_the_extension():
+    assert language_of("src/App.kt") == "kotlin"
+    assert language_of("web/index.TSX") == "typescript"
+    assert language_of("templates/page.vue") == "vue"
+    assert language_of("Makefile") is None
+
+
+def test_build_dirs_are_skipped_only_when_sources_exist_elsewhere(tmp_path):
+    write(tmp_path, "src/main/java/UserController.java", SPRING)
+    write(tmp_path, "target/generated/UserController.java", SPRING)
+    # 이 저장소의 JavaScript 소스는 dist/ 아래에만 있음
+    write(tmp_path, "dist/server/routes.js", EXPRESS)
+    write(tmp_path, "node_modules/express/index.js", EXPRESS)
+    write(tmp_path, ".git/hooks/pre-commit.py", FLASK)
+
+    languages = index_sources(str(tmp_path))
+    assert sorted(languages) == ["java", "javascript"]
+    assert relative_files(tmp_path, languages["java"]) == ["src/main/java/UserController.java"]
+    assert relative_files(tmp_path, languages["javascript"]) == ["dist/server/routes.js"]
+
+
+def test_detect_languages_keeps_languages_with_route_markers(tmp_path):
+    main_source = write(tmp_path, "src/main/java/UserController.java", SPRING)
+    write(tmp_path, "build/app/server.py", FLASK)
+    write(tmp_path, "scripts/build.js", "console.log('bundling');")
+
+    detected = detect_languages(str(tmp_path), main_source, "Spring")
+    assert {name: language.framework for name, language in detected.items()} == {"java": "Spring", "python": "Flask"}
+    assert detected["java"].representative == main_source
+    assert relative_files(tmp_path, detected["python"]) == ["build/app/server.py"]
@@ -0,0 +1,96 @@
+import json
+import sqlite3
+
+import pytest
+
+import model
+from snapshot import SNAPSHOT_VERSION, Snapshot, SnapshotError, save_snapshot
+
+
+def make_service():
+    service = model.Service("shop", "/repo", "/repo/App.java", "Spring")
+    service.languages = {"java": "Spring", "python": "Flask"}
+    endpoints = []
+    for index, (method, path) in enumerate([("GET", "/users/{id}"), ("POST", "/users"), ("GET", "/health")]):
+        endpoint = model.Endpoint(path, method, "/repo/UserController.java")
+        endpoint.code = f"handler {index} " * 50
+        endpoint.description = f"does thing {index}" if index < 2 else None
+        endpoint.params = ["id"] if index == 0 else []
+        endpoint.headers = {"Authorization": "Bearer"} if index == 1 else {}
+        endpoint.response_type = "JSON"
+        endpoint.auth_required = index == 1
+        endpoint.language, endpoint.framework = "java", "Spring"
+        service.add_endpoint(endpoint)
+        endpoints.append(endpoint)
+    endpoints[1].dependencies.add_dependency(endpoints[1].id, endpoints[0].id)
+    database = model.Database("PostgreSQL", "orders", "CREATE TABLE users (id INT);", "jdbc:postgresql://db/shop")
+    database.add_table("users")
+    database.dependencies.add_dependency(endpoints[0].id, "users")
+    service.set_database(database)
+    return service
+
+
+def endpoint_fields(endpoint):
+    return (endpoint.id, endpoint.method, endpoint.path, endpoint.file_path, endpoint.code, endpoint.description,
+            endpoint.params, endpoint.headers, endpoint.cookies, endpoint.response_type, endpoint.auth_required,
+            endpoint.language, endpoint.framework, endpoint.dependencies.get_dependencies(endpoint.id))
+
+
+def test_round_trip_restores_service(tmp_path):
+    service = make_service()
+    path = save_snapshot(service, str(tmp_path / "run.db"))
+    with Snapshot(path) as snapshot:
+        loaded = snapshot.load_service()
+        assert (loaded.id, loaded.name, loaded.main_source, loaded.framework, loaded.languages) == \
+            (service.id, service.name, service.main_source, service.framework, service.languages)
+        assert [endpoint_fields(e) for e in loaded.endpoints] == [endpoint_fields(e) for e in service.endpoints]
+        database = loaded.database
+        assert loaded.dependencies.get_dependencies(loaded.id) == [e.id for e in service.endpoints] + [database.id]
+        assert (database.id, database.db_type, database.init_sql, database.tables) == \
+            (service.database.id, "PostgreSQL", "CREATE TABLE users (id INT);", ["users"])
+        assert database.dependencies.get_dependencies(service.endpoints[0].id) == ["users"]
+
+
+def test_snapshot_reads_code_lazily_and_finds_by_template(tmp_path):
+    service = make_service()
+    path = save_snapshot(service, str(tmp_path / "run.db"))
+    with Snapshot(path) as snapshot:
+        loaded = snapshot.load_service()
+        # 파일 경로 등은 로드할 때 읽지만 코드는 접근할 때까지 읽지 않음
+        assert service.endpoints[0].code not in snapshot._strings.values()
+        assert loaded.endpoints[0].code == service.endpoints[0].code
+        assert service.endpoints[0].code in snapshot._strings.values()
+        assert service.endpoints[1].code not in snapshot._strings.values()
+        assert snapshot.find("get", "/users/<int:uid>") == [service.endpoints[0].id]
+        assert snapshot.get_code(service.endpoints[1].id) == service.endpoints[1].code
+        assert [row[1] for row in snapshot.endpoints()] == [e.id for e in service.endpoints]
+
+
+def test_saving_replaces_previous_snapshot(tmp_path):
+    path = str(tmp_path / "run.db")
+    save_snapshot(make_service(), path)
+    service = make_service()
+    service.endpoints.pop()
+    save_snapshot(service, path)
+    with Snapshot(path) as snapshot:
+        assert len(snapshot.endpoints()) == 2
+    assert not (tmp_path / "run.db.tmp").exists()
+
+
+def test_unreadable_snapshots_raise_snapshot_error(tmp_path):
+    with pytest.raises(SnapshotError):
+        Snapshot(str(tmp_path / "missing.db"))
+
+    garbage = tmp_path / "garbage.db"
+    garbage.write_bytes(b"not a database" * 100)
+    with pytest.raises(SnapshotError):
+        Snapshot(str(garbage))
+
+    newer = str(tmp_path / "newer.db")
+    save_snapshot(make_service(), newer)
+    conn = sqlite3.connect(newer)
+    conn.execute("UPDATE meta SET value = ? WHERE key = 'version'", (json.dumps(SNAPSHOT_VERSION + 1),))
+    conn.commit()
+    conn.close()
+    with pytest.raises(SnapshotError):
+        Snapshot(newer)
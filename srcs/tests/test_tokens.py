@@ -0,0 +1,72 @@
+import pytest
+
+import llm
+import tokens
+from metrics import METRICS
+from tokens import LEDGER, MIN_PROMPT_TOKENS, PromptTooLarge, count_message_tokens, fit_messages_to_budget
+
+
+def conversation(turns, words=200):
+    messages = [{"role": "system", "content": "system prompt"}]
+    for turn in range(turns):
+        messages.append({"role": "user", "content": f"question {turn} " + "word " * words})
+        messages.append({"role": "assistant", "content": f"answer {turn}"})
+    messages.append({"role": "user", "content": "last question " + "word " * words})
+    return messages
+
+
+def test_fit_drops_oldest_history_first():
+    messages = conversation(3)
+    budget = count_message_tokens(messages) - 100
+    fitted = fit_messages_to_budget(messages, budget)
+    assert count_message_tokens(fitted) <= budget
+    assert fitted[0] == messages[0] and fitted[-1] == messages[-1]
+    assert len(fitted) < len(messages)
+    assert len(messages) == 8
+
+
+def test_fit_truncates_last_prompt_when_history_is_gone():
+    messages = conversation(0, words=2000)
+    budget = count_message_tokens(messages) // 2
+    fitted = fit_messages_to_budget(messages, budget)
+    assert count_message_tokens(fitted) <= budget
+    assert "truncated" in fitted[-1]["content"]
+    assert fitted[-1]["content"].startswith("last question")
+
+
+def test_fit_refuses_to_send_an_empty_prompt():
+    messages = [{"role": "system", "content": "rules " * 500}, {"role": "user", "content": "code " * 500}]
+    system_only = count_message_tokens(messages[:1]) + 10
+    with pytest.raises(PromptTooLarge):
+        fit_messages_to_budget(messages, system_only)
+    with pytest.raises(PromptTooLarge):
+        fit_messages_to_budget(messages, system_only + MIN_PROMPT_TOKENS - 20)
+    assert fit_messages_to_budget(messages, system_only + MIN_PROMPT_TOKENS + 20)[-1]["content"]
+
+
+def test_ask_chatgpt_does_not_send_prompt_that_cannot_fit(mock_backend, monkeypatch):
+    mock_backend()
+    # identify_framework의 입력 예산을 system 프롬프트만 겨우 들어가는 크기로 줄임
+    system_tokens = count_message_tokens([{"role": "system", "content": llm.get_system_prompt("identify_framework")}])
+    monkeypatch.setitem(tokens.ASK_TYPE_BUDGETS, "identify_framework", {"input": system_tokens + 8, "output": 100})
+    with pytest.raises(PromptTooLarge):
+        llm.ask_chatgpt("identify_framework", "code " * 500, stream_id="tight")
+    # 보내지 않았으므로 사용량도, 대화 기록의 프롬프트도 남지 않음
+    assert LEDGER.total["calls"] == 0
+    assert [m["role"] for m in llm._ASK_CHATGPT_MESSAGES["tight"]] == ["system"]
+    assert METRICS.llm_counters["identify_framework"]["prompts_too_large"] == 1
+
+
+
+def test_describe_leaves_endpoints_pending_when_prompt_cannot_fit(mock_backend, monkeypatch, tmp_path):
+    import framework
+    from synth_target import generate_target
+    manifest = generate_target(str(tmp_path), "spring", 2, 1, 2)
+    mock_backend(manifest["responses"])
+    system_tokens = count_message_tokens([{"role": "system", "content": llm.get_system_prompt("describe_endpoint")}])
+    monkeypatch.setitem(tokens.ASK_TYPE_BUDGETS, "describe_endpoint", {"input": system_tokens + 8, "output": 800})
+
+    service = framework.run_recon(manifest["target_root"], output_dir=str(tmp_path / "out"), visualize=False)
+    assert service.endpoints
+    assert all(endpoint.description is None for endpoint in service.endpoints)
+    assert METRICS.llm_counters["describe_endpoint"]["prompts_too_large"] == len(service.endpoints)
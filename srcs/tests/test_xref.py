@@ -0,0 +1,54 @@
+from xref import RouteTrie, is_external, parse_dependency, scan_references, template_key
+
+
+def build_trie():
+    trie = RouteTrie()
+    trie.insert("GET", "/users/{id}", "get-user")
+    trie.insert("GET", "/users/me", "get-me")
+    trie.insert("POST", "/users", "create-user")
+    trie.insert("DELETE", "/users/<int:uid>", "delete-user")
+    return trie
+
+
+def test_template_key_ignores_variable_syntax():
+    assert template_key("get", "/users/{id}/") == template_key("GET", "/users/<int:uid>") == ("GET", "/users/{}")
+    assert template_key("GET", "http://localhost:8080/users?page=2") == ("GET", "/users")
+
+
+def test_trie_prefers_literal_segments_and_matching_method():
+    trie = build_trie()
+    assert trie.match("GET", "/users/me") == ["get-me"]
+    assert trie.match("GET", "/users/42") == ["get-user"]
+    assert trie.match("DELETE", "/users/42") == ["delete-user"]
+    assert trie.match("POST", "/users/") == ["create-user"]
+    assert trie.match("GET", "/orders") == []
+
+
+def test_trie_matches_only_service_hosts():
+    trie = build_trie()
+    assert trie.match("GET", "http://localhost:8080/users/me") == ["get-me"]
+    assert trie.match("GET", "https://api.github.com/users/me") == []
+    assert trie.match("GET", "//cdn.example.com/users/me") == []
+
+
+def test_is_external():
+    assert is_external("https://example.com/users")
+    assert not is_external("http://127.0.0.1/users")
+    assert not is_external("/users")
+    assert not is_external("https://internal.svc/users", hosts={"internal.svc"})
+
+
+def test_scan_references_skips_other_hosts():
+    code = '''
+        restTemplate.getForObject("/users/" + id, User.class);
+        fetch("https://api.github.com/users/me");
+        axios.post("/users", body);
+        <form action="/users" method="post"></form>
+    '''
+    assert sorted(scan_references(code)) == [("GET", "/users/{}"), ("POST", "/users")]
+
+
+def test_parse_dependency_keeps_colons_in_path():
+    assert parse_dependency("GET:/a:b") == ("GET", "/a:b")
+    assert parse_dependency("post /users") == ("POST", "/users")
+    assert parse_dependency("/health") == (None, "/health")
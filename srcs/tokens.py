@@ -0,0 +1,263 @@
+import contextvars
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# ask_type별 입력/출력 토큰 예산
+DEFAULT_BUDGET = {"input": 12000, "output": 1000}
+ASK_TYPE_BUDGETS = {
+    "identify_main_folder": {"input": 8000, "output": 200},
+    "identify_main_source": {"input": 12000, "output": 200},
+    "identify_framework": {"input": 6000, "output": 100},
+    "identify_service_name": {"input": 8000, "output": 100},
+    "how_to_reconginize_endpoint": {"input": 8000, "output": 600},
+    "describe_endpoint": {"input": 4000, "output": 800},
+    "identify_database_usage": {"input": 6000, "output": 400},
+}
+
+# 모델별 컨텍스트 윈도우 크기
+DEFAULT_CONTEXT_WINDOW = 32768
+MODEL_CONTEXT_WINDOWS = {
+    "gpt-4o-mini": 128000,
+    "gpt-4o": 128000,
+    "qwen3-8b": 32768,
+}
+
+# 모델별 1M 토큰당 가격 (USD): input, cached input, output
+MODEL_PRICES = {
+    "gpt-4o-mini": {"input": 0.15, "cached": 0.075, "output": 0.60},
+    "gpt-4o": {"input": 2.50, "cached": 1.25, "output": 10.00},
+}
+
+# 메시지마다 붙는 role/구분자 토큰
+MESSAGE_OVERHEAD_TOKENS = 4
+REPLY_PRIMING_TOKENS = 3
+# 예산에 맞추려고 자른 user 프롬프트가 이보다 짧아지면 보내지 않음
+MIN_PROMPT_TOKENS = 64
+
+
+class PromptTooLarge(ValueError):
+    """system 프롬프트 등 고정 부분만으로 입력 예산이 차서 user 프롬프트를 쓸모 있게 남길 수 없을 때 발생합니다."""
+
+
+_ENCODERS = {}
+# tiktoken 모듈 (처음 토큰을 셀 때 import, 없으면 None)
+_TIKTOKEN = False
+
+
+def _lookup_by_prefix(table, model, default):
+    """가장 길게 일치하는 모델 이름 prefix로 값을 찾습니다 (gpt-4o-mini-2024-07-18 -> gpt-4o-mini)."""
+    matches = [name for name in table if model and model.startswith(name)]
+    if not matches:
+        return default
+    return table[max(matches, key=len)]
+
+
+def _get_encoder(model):
+    """모델에 맞는 tiktoken 인코더를 캐시해서 반환합니다."""
+    global _TIKTOKEN
+    if _TIKTOKEN is False:
+        try:
+            import tiktoken
+            _TIKTOKEN = tiktoken
+        except ImportError:  # tiktoken이 없으면 글자 수 기반 추정으로 대체
+            _TIKTOKEN = None
+    tiktoken = _TIKTOKEN
+    if tiktoken is None:
+        return None
+    if model not in _ENCODERS:
+        try:
+            _ENCODERS[model] = tiktoken.encoding_for_model(model)
+        except KeyError:
+            _ENCODERS[model] = tiktoken.get_encoding("o200k_base")
+    return _ENCODERS[model]
+
+
+def count_tokens(text, model="gpt-4o-mini"):
+    """텍스트의 토큰 수를 셉니다. tiktoken이 없으면 약 4글자당 1토큰으로 추정합니다."""
+    if not text:
+        return 0
+    encoder = _get_encoder(model)
+    if encoder is None:
+        return (len(text) + 3) // 4
+    return len(encoder.encode(text, disallowed_special=()))
+
+
+def count_message_tokens(messages, model="gpt-4o-mini"):
+    """chat 메시지 리스트의 입력 토큰 수를 셉니다."""
+    total = REPLY_PRIMING_TOKENS
+    for message in messages:
+        total += MESSAGE_OVERHEAD_TOKENS + count_tokens(message.get("content", ""), model)
+    return total
+
+
+def get_budget(ask_type, model, max_tokens=None):
+    """ask_type과 모델 컨텍스트 윈도우를 고려한 입력/출력 토큰 예산을 반환합니다."""
+    budget = dict(ASK_TYPE_BUDGETS.get(ask_type, DEFAULT_BUDGET))
+    if max_tokens is not None:
+        budget["output"] = max_tokens
+    window = _lookup_by_prefix(MODEL_CONTEXT_WINDOWS, model, DEFAULT_CONTEXT_WINDOW)
+    budget["input"] = min(budget["input"], window - budget["output"])
+    return budget
+
+
+def truncate_to_tokens(text, max_tokens, model="gpt-4o-mini"):
+    """텍스트를 max_tokens 이하로 자릅니다. 앞부분 2/3, 뒷부분 1/3을 남깁니다."""
+    total = count_tokens(text, model)
+    if total <= max_tokens:
+        return text
+    marker = "\n... truncated ...\n"
+    # 토큰 비율로 글자 수를 근사한 뒤 예산 안에 들어올 때까지 줄임
+    keep_chars = int(len(text) * max_tokens / total)
+    while keep_chars > 0:
+        head = keep_chars * 2 // 3
+        tail = keep_chars - head
+        candidate = text[:head] + marker + (text[-tail:] if tail else "")
+        if count_tokens(candidate, model) <= max_tokens:
+            return candidate
+        keep_chars = int(keep_chars * 0.9)
+    return ""
+
+
+def fit_messages_to_budget(messages, max_input_tokens, model="gpt-4o-mini"):
+    """
+    메시지가 입력 예산을 넘으면 오래된 대화 기록부터 제거하고, 그래도 넘으면 마지막 user 메시지를 자릅니다.
+    system 메시지와 마지막 user 메시지는 항상 유지됩니다. 새 리스트를 반환합니다.
+    잘린 user 메시지가 MIN_PROMPT_TOKENS보다 짧아지면 내용 없는 요청에 비용을 쓰지 않도록 PromptTooLarge를 올립니다.
+    """
+    fitted = list(messages)
+    while count_message_tokens(fitted, model) > max_input_tokens and len(fitted) > 2:
+        del fitted[1]
+
+    overflow = count_message_tokens(fitted, model) - max_input_tokens
+    if overflow > 0:
+        last = fitted[-1]
+        content = last.get("content", "")
+        allowed = count_tokens(content, model) - overflow
+        if allowed < MIN_PROMPT_TOKENS:
+            raise PromptTooLarge(f"input budget of {max_input_tokens} tokens leaves {max(allowed, 0)} tokens "
+                                 f"for the prompt (minimum {MIN_PROMPT_TOKENS})")
+        print(f"[Tokens] Prompt exceeds input budget by {overflow} tokens, truncating")
+        fitted[-1] = {**last, "content": truncate_to_tokens(content, allowed, model)}
+    return fitted
+
+
+# 장부가 개별 호출을 보관하는 최대 개수. 넘으면 오래된 호출부터 ask_type별 합계로 접어 넣음 (0이면 제한 없음)
+MAX_LEDGER_ENTRIES = int(os.environ.get("LLM_LEDGER_MAX_ENTRIES", "10000"))
+_TOTAL_KEYS = ("calls", "prompt_tokens", "completion_tokens", "cached_tokens", "cost_usd")
+
+
+def _empty_totals():
+    return {key: 0 for key in _TOTAL_KEYS}
+
+
+def _add_entry(totals, entry):
+    totals["calls"] += 1
+    for key in _TOTAL_KEYS[1:]:
+        totals[key] += entry[key]
+
+
+class TokenLedger:
+    """LLM 호출별 토큰 사용량과 비용을 기록합니다."""
+
+    def __init__(self, max_entries=0):
+        self.max_entries = max_entries
+        # 동시 describe 워커가 함께 기록하므로 잠금으로 보호
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """기록된 사용량을 모두 초기화합니다."""
+        self.started_at = time.time()
+        self.entries = []
+        # 생성 이후 전체 합계와, entries에서 밀려난 호출의 ask_type별 합계
+        self.total = _empty_totals()
+        self.rolled_up = {}
+
+    def record(self, ask_type, model, prompt_tokens, completion_tokens, cached_tokens=0,
+               estimated_prompt_tokens=None, backend="openai"):
+        """응답의 usage 필드로 실제 사용량을 기록합니다."""
+        entry = {
+            "ask_type": ask_type,
+            "model": model,
+            "backend": backend,
+            "prompt_tokens": prompt_tokens or 0,
+            "completion_tokens": completion_tokens or 0,
+            "cached_tokens": cached_tokens or 0,
+            "estimated_prompt_tokens": estimated_prompt_tokens,
+        }
+        entry["cost_usd"] = self.cost(entry)
+        with self._lock:
+            self.entries.append(entry)
+            _add_entry(self.total, entry)
+            overflow = len(self.entries) - self.max_entries if self.max_entries else 0
+            if overflow > 0:
+                for old in self.entries[:overflow]:
+                    _add_entry(self.rolled_up.setdefault(old["ask_type"], _empty_totals()), old)
+                del self.entries[:overflow]
+        return entry
+
+    @staticmethod
+    def cost(entry):
+        """엔트리 하나의 비용(USD)을 계산합니다. 로컬 모델은 0입니다."""
+        if entry["backend"] != "openai":
+            return 0.0
+        price = _lookup_by_prefix(MODEL_PRICES, entry["model"], None)
+        if price is None:
+            return 0.0
+        uncached = entry["prompt_tokens"] - entry["cached_tokens"]
+        return (
+            uncached * price["input"]
+            + entry["cached_tokens"] * price["cached"]
+            + entry["completion_tokens"] * price["output"]
+        ) / 1_000_000
+
+    def summary(self):
+        """ask_type별 및 전체 합계를 반환합니다 (entries에서 밀려난 호출 포함)."""
+        with self._lock:
+            by_type = {ask_type: dict(totals) for ask_type, totals in self.rolled_up.items()}
+            for entry in self.entries:
+                _add_entry(by_type.setdefault(entry["ask_type"], _empty_totals()), entry)
+            total = dict(self.total)
+        # 프롬프트 중 캐시에서 재사용된 토큰 비율
+        for totals in list(by_type.values()) + [total]:
+            totals["cached_ratio"] = totals["cached_tokens"] / totals["prompt_tokens"] if totals["prompt_tokens"] else 0.0
+        return {"by_ask_type": by_type, "total": total}
+
+    def write(self, path):
+        """실행 단위의 비용 장부를 JSON 파일로 저장합니다."""
+        report = {
+            "started_at": self.started_at,
+            "finished_at": time.time(),
+            "summary": self.summary(),
+            "calls": list(self.entries),
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        return report
+
+
+# 실행 전체에서 공유하는 장부
+LEDGER = TokenLedger(MAX_LEDGER_ENTRIES)
+# 현재 실행(daemon 작업 등)의 장부. 설정되지 않으면 LEDGER에 기록
+_RUN_LEDGER = contextvars.ContextVar("run_ledger", default=None)
+
+
+def current_ledger():
+    """현재 컨텍스트의 실행 장부를, 없으면 LEDGER를 반환합니다."""
+    return _RUN_LEDGER.get() or LEDGER
+
+
+@contextmanager
+def ledger_scope(ledger):
+    """
+    with 블록 안의 LLM 사용량을 ledger에 기록합니다. 한 프로세스에서 동시에 도는 실행이 서로의 사용량을
+    예산에 합산하지 않도록 실행마다 따로 씁니다 (스레드 풀로는 budget.run_within_budget이 컨텍스트를 넘겨줌).
+    """
+    token = _RUN_LEDGER.set(ledger)
+    try:
+        yield ledger
+    finally:
+        _RUN_LEDGER.reset(token)
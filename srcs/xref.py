@@ -0,0 +1,201 @@
+import os
+import re
+
+HTTP_METHODS = ("GET", "POST", "PUT", "DELETE", "PATCH", "HEAD", "OPTIONS")
+
+# 경로 템플릿 변수를 나타내는 정규화 토큰
+PARAM = "{}"
+
+# {id}, {id:\d+}, <int:id>, <id>, :id, ${id}, * 형태의 경로 변수
+_PARAM_SEGMENT = re.compile(r"^(\{[^/]*\}|<[^/>]*>|:[A-Za-z_]\w*\??|\$\{[^/]*\}|\*)$")
+_SCHEME_HOST = re.compile(r"^(?:[a-zA-Z][a-zA-Z0-9+.-]*:)?//[^/]*")
+# scheme 또는 "//"로 시작하는 URL의 host (userinfo, port 제외)
+_URL_HOST = re.compile(r"^(?:[a-zA-Z][a-zA-Z0-9+.-]*:)?//(?:[^/@]*@)?(?P<host>\[[^\]]*\]|[^/:?#]*)")
+# 분석 대상 서비스 자신으로 보는 host. 이 밖의 host를 가리키는 절대 URL은 의존성으로 보지 않음
+# (XREF_SERVICE_HOSTS="api.example.com,www.example.com"으로 서비스의 공개 host를 추가)
+SERVICE_HOSTS = {"localhost", "127.0.0.1", "0.0.0.0", "[::1]"} | {
+    host.strip().lower() for host in os.environ.get("XREF_SERVICE_HOSTS", "").split(",") if host.strip()
+}
+_THYMELEAF = re.compile(r"^@\{(.*)\}$")
+_STRING_LITERAL = r"""(?P<q>["'`])(?P<path>(?:https?://[^"'`\s/]+)?/[^"'`\s]*)(?P=q)"""
+
+# (method, regex) 목록. method가 None이면 정규식의 method 그룹 또는 문맥으로 결정
+REFERENCE_PATTERNS = [
+    # HTML / 템플릿 링크
+    ("GET", re.compile(r"""\bhref\s*=\s*["'](?P<path>[^"'#\s][^"'\s]*)["']""")),
+    ("GET", re.compile(r"""\bth:href\s*=\s*["'](?P<path>@\{[^"']*\})["']""")),
+    ("GET", re.compile(r"""\b(?:window\.)?location(?:\.href)?\s*=\s*""" + _STRING_LITERAL)),
+    # 리다이렉트
+    ("GET", re.compile(r"""["']redirect:(?P<path>/[^"'\s]*)["']""")),
+    ("GET", re.compile(r"""\b(?:redirect|sendRedirect|RedirectView|RedirectResponse|HttpResponseRedirect)\s*\(\s*""" + _STRING_LITERAL)),
+    ("GET", re.compile(r"""\bres\.redirect\s*\(\s*(?:\d+\s*,\s*)?""" + _STRING_LITERAL)),
+    # HTTP 클라이언트 호출
+    (None, re.compile(r"""(?<![\w$.])(?:axios|\$|http|request|requests|client|this\.http)\.(?P<method>get|post|put|delete|patch)\s*\(\s*""" + _STRING_LITERAL)),
+    (None, re.compile(r"""\brestTemplate\.(?P<method>get|post|put|delete|patch)\w*\s*\(\s*""" + _STRING_LITERAL, re.IGNORECASE)),
+    (None, re.compile(r"""\.uri\s*\(\s*""" + _STRING_LITERAL)),
+    (None, re.compile(r"""\bfetch\s*\(\s*""" + _STRING_LITERAL + r"""(?:\s*,\s*\{[^}]*?method\s*:\s*["'](?P<method>\w+)["'])?""")),
+]
+
+_FORM = re.compile(r"""<form\b[^>]*>""", re.IGNORECASE)
+_FORM_ACTION = re.compile(r"""\b(?:th:)?action\s*=\s*["'](?P<path>[^"']*)["']""", re.IGNORECASE)
+_FORM_METHOD = re.compile(r"""\bmethod\s*=\s*["'](?P<method>\w+)["']""", re.IGNORECASE)
+# '/users/' + id 처럼 문자열 결합으로 끝나는 경로
+_CONCAT_TAIL = re.compile(r"""\s*\+""")
+
+
+def normalize_path(path):
+    """
+    경로를 비교 가능한 형태로 정규화해 세그먼트 목록을 반환합니다.
+    (같은 서비스를 가리키는 URL의) scheme/host, query/fragment, 중복/후행 슬래시를 제거하고 모든 경로 변수는 PARAM으로 바꿉니다.
+    """
+    if not path:
+        return []
+    path = path.strip()
+    thymeleaf = _THYMELEAF.match(path)
+    if thymeleaf:
+        path = re.sub(r"\(.*\)$", "", thymeleaf.group(1))
+    path = _SCHEME_HOST.sub("", path)
+    path = re.split(r"[?#]", path, maxsplit=1)[0]
+    segments = []
+    for segment in path.split("/"):
+        if not segment:
+            continue
+        if _PARAM_SEGMENT.match(segment) or "${" in segment or "{" in segment:
+            segments.append(PARAM)
+        else:
+            segments.append(segment)
+    return segments
+
+
+def is_external(path, hosts=None):
+    """절대 URL이 서비스 밖(hosts에 없는 host)을 가리키면 True입니다. 상대 경로는 False입니다."""
+    match = _URL_HOST.match((path or "").strip())
+    if not match:
+        return False
+    return match.group("host").lower() not in (SERVICE_HOSTS if hosts is None else hosts)
+
+
+def template_key(method, path):
+    """(method, 정규화된 경로 템플릿) 키를 만듭니다. 예: ("GET", "/users/{}")"""
+    return (method or "").upper(), "/" + "/".join(normalize_path(path))
+
+
+def parse_dependency(dep):
+    """
+    "GET:/a:b", "GET /a", "/a" 형태의 의존성 문자열을 (method, path)로 나눕니다.
+    경로 안의 ':'는 보존하며, method가 없으면 None입니다.
+    """
+    dep = (dep or "").strip()
+    for separator in (":", " "):
+        head, sep, tail = dep.partition(separator)
+        if sep and head.upper() in HTTP_METHODS:
+            return head.upper(), tail.strip()
+    return None, dep
+
+
+class RouteTrie:
+    """
+    경로 세그먼트 단위의 트라이입니다. 리터럴 세그먼트를 경로 변수보다 우선하여 매칭하며,
+    매칭 비용은 엔드포인트 수가 아니라 경로 깊이에 비례합니다.
+    """
+
+    def __init__(self):
+        self.root = {"children": {}, "routes": {}}
+        self.size = 0
+
+    def insert(self, method, path, endpoint_id):
+        node = self.root
+        for segment in normalize_path(path):
+            node = node["children"].setdefault(segment, {"children": {}, "routes": {}})
+        node["routes"].setdefault((method or "").upper(), []).append(endpoint_id)
+        self.size += 1
+
+    def _match(self, node, segments, index):
+        if index == len(segments):
+            yield node
+            return
+        segment = segments[index]
+        children = node["children"]
+        if segment == PARAM:
+            # 참조 쪽이 변수이면 어떤 세그먼트와도 매칭
+            for child in children.values():
+                yield from self._match(child, segments, index + 1)
+            return
+        if segment in children:
+            yield from self._match(children[segment], segments, index + 1)
+        if PARAM in children:
+            yield from self._match(children[PARAM], segments, index + 1)
+
+    def match(self, method, path):
+        """
+        참조 경로에 맞는 엔드포인트 id 목록을 반환합니다.
+        method가 일치하는 라우트를 우선하고, 없으면 method와 무관하게 첫 매칭 노드의 라우트를 반환합니다.
+        다른 host를 가리키는 절대 URL은 경로가 같아도 매칭하지 않습니다.
+        """
+        if is_external(path):
+            return []
+        method = (method or "").upper()
+        fallback = []
+        for node in self._match(self.root, normalize_path(path), 0):
+            if not node["routes"]:
+                continue
+            if method and method in node["routes"]:
+                return list(node["routes"][method])
+            if not fallback:
+                fallback = [endpoint_id for ids in node["routes"].values() for endpoint_id in ids]
+        return fallback
+
+
+def build_route_trie(service):
+    """Service의 모든 엔드포인트로 RouteTrie를 만듭니다."""
+    trie = RouteTrie()
+    for endpoint in service.endpoints:
+        trie.insert(endpoint.method, endpoint.path, endpoint.id)
+    return trie
+
+
+def _reference_path(match, code):
+    """매칭된 경로 문자열을 꺼내고, 문자열 결합으로 이어지면 끝에 경로 변수를 붙입니다."""
+    path = match.group("path")
+    if _CONCAT_TAIL.match(code, match.end()) and path.endswith("/"):
+        path += PARAM
+    return path
+
+
+def scan_references(code):
+    """코드에서 다른 엔드포인트를 가리키는 (method, path) 참조를 찾습니다. 다른 host로의 URL은 제외합니다."""
+    references = []
+    if not code:
+        return references
+    for method, pattern in REFERENCE_PATTERNS:
+        for match in pattern.finditer(code):
+            found = match.groupdict().get("method") or method
+            path = _reference_path(match, code)
+            if is_external(path):
+                continue
+            if normalize_path(path) or path.startswith("/"):
+                references.append(((found or "GET").upper(), path))
+    for form in _FORM.finditer(code):
+        action = _FORM_ACTION.search(form.group(0))
+        if action and not is_external(action.group("path")):
+            method = _FORM_METHOD.search(form.group(0))
+            references.append(((method.group("method") if method else "GET").upper(), action.group("path")))
+    # href/th:href, redirect(/res.redirect( 처럼 겹치는 패턴의 중복 제거
+    return list(dict.fromkeys(references))
+
+
+def link_static_dependencies(service, trie=None):
+    """
+    LLM 호출 없이 각 엔드포인트 코드의 참조를 RouteTrie로 해석해 의존성 엣지를 추가합니다.
+    추가된 엣지 수를 반환합니다.
+    """
+    trie = trie or build_route_trie(service)
+    added = 0
+    for endpoint in service.endpoints:
+        for method, path in scan_references(endpoint.code):
+            for dep_id in trie.match(method, path):
+                if dep_id == endpoint.id or dep_id in endpoint.dependencies.get_dependencies(endpoint.id):
+                    continue
+                endpoint.dependencies.add_dependency(endpoint.id, dep_id)
+                added += 1
+    return added